@@ -141,6 +141,9 @@ def create_app(config_name=None):
 
     register_error_handlers(app)
     
+    from app.cli import register_cli
+    register_cli(app)
+    
     # Register timezone template filters
     from app.utils.timezone import format_local_datetime, format_local_date, format_local_time
     
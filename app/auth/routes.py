@@ -7,6 +7,8 @@ from app.auth.forms import LoginForm, RegistrationForm, ForgotPasswordForm, Rese
 from app.models import User, Tenant
 from app import db, limiter
 from app.services.email_service import EmailService
+from app.services.tenant_cache import tenant_cache
+from app.services.principal_service import invalidate_principal
 import random
 import string
 from datetime import datetime
@@ -42,6 +44,8 @@ def login():
         login_user(user, remember=form.remember_me.data)
         user.last_login = datetime.utcnow()
         db.session.commit()
+        # Login baru selalu mulai dari snapshot yang segar
+        invalidate_principal(user.id)
         
         session['login_time'] = datetime.utcnow().isoformat()
         
@@ -92,6 +96,8 @@ def register():
             
             db.session.add(user)
             db.session.commit()
+            # Subdomain baru mungkin sudah ter-cache sebagai "tidak ada"
+            tenant_cache.invalidate(tenant)
             
             print("Registration successful!")
             flash('Registration successful! Please login to your account.', 'success')
@@ -0,0 +1,107 @@
+import time
+import click
+from flask.cli import AppGroup
+
+stock_cli = AppGroup('stock', help='Inventory ledger maintenance.')
+rollups_cli = AppGroup('rollups', help='Daily sales rollup maintenance.')
+sketches_cli = AppGroup('sketches', help='Approximate top-seller sketches.')
+customers_cli = AppGroup('customers', help='Customer statistics maintenance.')
+
+
+@stock_cli.command('compact')
+@click.option('--batch-size', default=1000, show_default=True, help='Movements folded per transaction.')
+@click.option('--loop', is_flag=True, help='Keep running as a background compactor.')
+@click.option('--interval', default=30, show_default=True, help='Seconds to sleep between passes with --loop.')
+def compact_stock(batch_size, loop, interval):
+    """Fold pending stock movements into Product.stock_quantity."""
+    from app.services.stock_ledger_service import compact_movements
+
+    while True:
+        total = 0
+        while True:
+            folded = compact_movements(batch_size)
+            total += folded
+            if folded < batch_size:
+                break
+        if total or not loop:
+            click.echo(f'Compacted {total} stock movements')
+        if not loop:
+            return
+        time.sleep(interval)
+
+
+@rollups_cli.command('rebuild')
+@click.option('--tenant', 'tenant_id', default=None, help='Only rebuild this tenant id.')
+def rebuild_rollups(tenant_id):
+    """Backfill or rebuild the daily rollup tables from raw sales."""
+    from app.services.rollup_service import rebuild_rollups as rebuild
+
+    count = rebuild(tenant_id)
+    click.echo(f'Rebuilt rollups from {count} sales')
+
+
+@rollups_cli.command('apply-timezones')
+@click.option('--tenant', 'tenant_id', default=None, help='Only apply this tenant id.')
+@click.option('--loop', is_flag=True, help='Keep running and pick up new changes.')
+@click.option('--interval', default=30, show_default=True, help='Seconds to sleep between passes with --loop.')
+def apply_timezones(tenant_id, loop, interval):
+    """Apply pending tenant timezone changes and rebuild their rollups."""
+    from app.services.rollup_service import apply_pending_timezones
+
+    while True:
+        switched = apply_pending_timezones(tenant_id)
+        if switched or not loop:
+            click.echo(f'Switched {switched} tenants to their new timezone')
+        if not loop:
+            return
+        time.sleep(interval)
+
+
+@rollups_cli.command('set-timezone')
+@click.option('--tenant', 'tenant_id', required=True, help='Tenant id.')
+@click.option('--timezone', required=True, help='IANA timezone name, e.g. Asia/Jakarta.')
+def set_timezone(tenant_id, timezone):
+    """Change a tenant's timezone and rebuild its rollups in one transaction."""
+    import pytz
+    from app.models import Tenant, db
+    from app.services.rollup_service import apply_pending_timezones
+
+    if timezone not in pytz.all_timezones_set:
+        raise click.BadParameter(f'Unknown timezone {timezone}', param_hint='--timezone')
+    tenant = db.session.get(Tenant, tenant_id)
+    if tenant is None:
+        raise click.BadParameter(f'Unknown tenant {tenant_id}', param_hint='--tenant')
+    tenant.pending_timezone = timezone
+    tenant.timezone_error = None
+    db.session.commit()
+    if not apply_pending_timezones(tenant_id):
+        raise click.ClickException(db.session.get(Tenant, tenant_id).timezone_error or 'Timezone not applied')
+    click.echo(f'Switched tenant {tenant_id} to {timezone}')
+
+
+@sketches_cli.command('seed')
+@click.option('--tenant', 'tenant_id', default=None, help='Only seed this tenant id.')
+@click.option('--days', default=35, show_default=True, help='Days of history to load from the rollups.')
+def seed_sketches(tenant_id, days):
+    """Seed the top-seller sketches from the daily product rollups."""
+    from app.services.top_sellers_service import seed_top_sellers
+
+    count = seed_top_sellers(days, tenant_id)
+    click.echo(f'Seeded top-seller sketches for {count} tenants')
+
+
+@customers_cli.command('recompute-stats')
+@click.option('--tenant', 'tenant_id', default=None, help='Only recompute this tenant id.')
+def recompute_customer_stats(tenant_id):
+    """Rebuild total_spent / sales_count / first & last sale from raw sales."""
+    from app.services.customer_stats_service import recompute_customer_stats as recompute
+
+    count = recompute(tenant_id)
+    click.echo(f'Recomputed stats for {count} customers')
+
+
+def register_cli(app):
+    app.cli.add_command(stock_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(sketches_cli)
+    app.cli.add_command(customers_cli)
@@ -3,8 +3,17 @@ from flask_login import login_required, current_user
 from app.customers import bp
 from app.customers.forms import CustomerForm, CustomerSearchForm
 from app.models import Customer, db
+from app.services.customer_search import CustomerTypeahead
 from sqlalchemy import or_
 
+CUSTOMER_SORTS = {
+    'name': (Customer.name,),
+    'total_spent': (Customer.total_spent.desc(),),
+    'sales_count': (Customer.sales_count.desc(),),
+    'last_sale': (Customer.last_sale_at.desc().nullslast(),),
+    'newest': (Customer.created_at.desc(),),
+}
+
 @bp.route('/customers')
 @login_required
 def index():
@@ -12,30 +21,37 @@ def index():
     page = request.args.get('page', 1, type=int)
     search_form = CustomerSearchForm()
     
+    # Statistik sudah berupa kolom, jadi sort/filter tidak butuh query per baris
+    sort = request.args.get('sort', 'name')
+    if sort not in CUSTOMER_SORTS:
+        sort = 'name'
+    min_spent = request.args.get('min_spent', type=float)
+    
+    query = Customer.query.filter(Customer.tenant_id == current_user.tenant_id)
+    
     # Handle search
     search_query = request.args.get('search', '')
     if search_query:
-        customers = Customer.query.filter(
-            Customer.tenant_id == current_user.tenant_id,
+        query = query.filter(
             or_(
                 Customer.name.ilike(f'%{search_query}%'),
                 Customer.email.ilike(f'%{search_query}%'),
                 Customer.phone.ilike(f'%{search_query}%')
             )
-        ).order_by(Customer.name).paginate(
-            page=page, per_page=10, error_out=False
         )
         search_form.search.data = search_query
-    else:
-        customers = Customer.query.filter_by(
-            tenant_id=current_user.tenant_id
-        ).order_by(Customer.name).paginate(
-            page=page, per_page=10, error_out=False
-        )
+    if min_spent:
+        query = query.filter(Customer.total_spent >= min_spent)
+    
+    customers = query.order_by(*CUSTOMER_SORTS[sort], Customer.id).paginate(
+        page=page, per_page=10, error_out=False
+    )
     
     return render_template('customers/index.html', 
                          customers=customers,
                          search_form=search_form,
+                         sort=sort,
+                         min_spent=min_spent,
                          title='Customers')
 
 @bp.route('/customers/create', methods=['GET', 'POST'])
@@ -94,6 +110,7 @@ def edit(customer_id):
         customer.address = form.address.data
         
         db.session.commit()
+        CustomerTypeahead(current_user.tenant_id).forget(customer.id)
         
         flash(f'Customer {customer.name} has been updated successfully!', 'success')
         return redirect(url_for('customers.detail', customer_id=customer.id))
@@ -113,8 +130,10 @@ def delete(customer_id):
     ).first_or_404()
     
     customer_name = customer.name
+    customer_id = customer.id
     db.session.delete(customer)
     db.session.commit()
+    CustomerTypeahead(current_user.tenant_id).forget(customer_id)
     
     flash(f'Customer {customer_name} has been deleted successfully!', 'success')
     return redirect(url_for('customers.index'))
@@ -123,31 +142,12 @@ def delete(customer_id):
 @bp.route('/api/customers')
 @login_required
 def api_customers():
-    """API endpoint for customers data (for select2, etc)"""
-    search = request.args.get('q', '')
-    
-    if search:
-        customers = Customer.query.filter(
-            Customer.tenant_id == current_user.tenant_id,
-            or_(
-                Customer.name.ilike(f'%{search}%'),
-                Customer.phone.ilike(f'%{search}%')
-            )
-        ).limit(10).all()
-    else:
-        customers = Customer.query.filter_by(
-            tenant_id=current_user.tenant_id
-        ).limit(10).all()
-    
-    results = [{
-        'id': customer.id,
-        'text': f"{customer.name} ({customer.phone})" if customer.phone else customer.name,
-        'name': customer.name,
-        'phone': customer.phone,
-        'email': customer.email
-    } for customer in customers]
-    
-    return jsonify({'results': results})
+    """API endpoint for customers data (typeahead POS, select2, etc)"""
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    results, next_cursor = CustomerTypeahead(current_user.tenant_id).search(
+        request.args.get('q', ''), limit, request.args.get('cursor')
+    )
+    return jsonify({'results': results, 'next': next_cursor})
 
 @bp.route('/api/customers/<int:customer_id>')
 @login_required
@@ -1,9 +1,13 @@
-from flask import redirect, render_template, jsonify, request, url_for
+from flask import Response, current_app, redirect, render_template, jsonify, request, url_for
 from flask_login import login_required, current_user
 from app.dashboard import bp
-from app.models import Sale, Product, SaleItem, Customer, db
+from app.utils.timezone import now_local, get_local_timezone
+from app.services.timeseries_service import GRANULARITIES, MAX_HOUR_RANGE_DAYS, cached_series
+from app.services.live_events import live_events
+from app.services.dashboard_service import DashboardSummary
+from app.services.top_sellers_service import MAX_RECENT_HOURS
+import json
 from datetime import datetime, timedelta
-from sqlalchemy import func, extract
 
 @bp.route('/')
 @login_required
@@ -11,136 +15,139 @@ def index():
     """Dashboard utama dengan statistik real-time"""
     if current_user.role == 'cashier':
         return redirect(url_for('sales.pos'))
-    # Today's statistics
-    today = datetime.now().date()
-    today_start = datetime.combine(today, datetime.min.time())
-    today_end = datetime.combine(today, datetime.max.time())
+    # KPI, series, top products dan aktivitas ikut di render pertama,
+    # jadi halaman tidak perlu request JSON tambahan saat dibuka
+    summary = DashboardSummary(current_user.tenant_id, get_local_timezone()).payload()
     
-    today_sales = Sale.query.filter(
-        Sale.tenant_id == current_user.tenant_id,
-        Sale.created_at >= today_start,
-        Sale.created_at <= today_end
-    ).all()
-    
-    today_revenue = sum(sale.total_amount for sale in today_sales)
-    today_transactions = len(today_sales)
-    
-    # Low stock products
-    low_stock_products = Product.query.filter(
-        Product.tenant_id == current_user.tenant_id,
-        Product.stock_quantity <= Product.stock_alert,
-        Product.is_active == True
-    ).count()
-    
-    # Total products
-    total_products = Product.query.filter_by(
-        tenant_id=current_user.tenant_id,
-        is_active=True
-    ).count()
-    
-    # Recent sales for activity feed
-    recent_sales = Sale.query.filter_by(
-        tenant_id=current_user.tenant_id
-    ).order_by(Sale.created_at.desc()).limit(5).all()
-    
-    return render_template('dashboard/index.html',
-                         today_revenue=today_revenue,
-                         today_transactions=today_transactions,
-                         low_stock_products=low_stock_products,
-                         total_products=total_products,
-                         recent_sales=recent_sales)
+    return render_template('dashboard/index.html', summary=summary, **summary['kpis'])
 
 @bp.route('/sales-data')
 @login_required
 def sales_data():
-    """API data untuk dashboard charts"""
-    days = int(request.args.get('days', 7))
-    
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
+    """API data untuk dashboard charts (harian, format lama)"""
+    days = max(1, min(int(request.args.get('days', 7)), 366))
     
-    # Daily sales data
-    daily_sales = db.session.query(
-        func.date(Sale.created_at).label('date'),
-        func.sum(Sale.total_amount).label('revenue'),
-        func.count(Sale.id).label('transactions')
-    ).filter(
-        Sale.tenant_id == current_user.tenant_id,
-        Sale.created_at >= start_date,
-        Sale.created_at <= end_date
-    ).group_by(func.date(Sale.created_at)).order_by('date').all()
+    end_day = now_local().date()
+    start_day = end_day - timedelta(days=days - 1)
+    points = cached_series(current_user.tenant_id, get_local_timezone(), 'day', start_day, end_day, max_points=0)
     
-    # Format data untuk charts
-    dates = []
-    revenues = []
-    transactions = []
-    
-    # Fill in missing dates
-    for i in range(days):
-        current_date = (end_date - timedelta(days=days-1-i)).date()
-        date_str = current_date.strftime('%Y-%m-%d')
-        
-        # Find data for this date
-        data = next((x for x in daily_sales if x.date == current_date), None)
-        
-        dates.append(current_date.strftime('%m/%d'))
-        revenues.append(float(data.revenue) if data else 0)
-        transactions.append(int(data.transactions) if data else 0)
+    return jsonify({
+        'dates': [point['label'] for point in points],
+        'revenues': [point['revenue'] for point in points],
+        'transactions': [point['transactions'] for point in points]
+    })
+
+@bp.route('/api/timeseries')
+@login_required
+def timeseries():
+    """Time series penjualan: ?granularity=hour|day|week|month&days=N
+    atau ?start=YYYY-MM-DD&end=YYYY-MM-DD, dengan &max_points=N"""
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f'granularity must be one of {", ".join(GRANULARITIES)}'}), 400
+    
+    try:
+        end_day = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else now_local().date()
+        if request.args.get('start'):
+            start_day = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        else:
+            start_day = end_day - timedelta(days=int(request.args.get('days', 7)) - 1)
+        max_points = int(request.args.get('max_points', 120))
+    except ValueError:
+        return jsonify({'error': 'Invalid date range'}), 400
+    
+    if start_day > end_day or (end_day - start_day).days > 3660:
+        return jsonify({'error': 'Invalid date range'}), 400
+    if granularity == 'hour' and (end_day - start_day).days >= MAX_HOUR_RANGE_DAYS:
+        return jsonify({'error': f'Hourly series are limited to {MAX_HOUR_RANGE_DAYS} days'}), 400
+    
+    points = cached_series(current_user.tenant_id, get_local_timezone(), granularity,
+                           start_day, end_day, max(0, min(max_points, 1000)))
     
     return jsonify({
-        'dates': dates,
-        'revenues': revenues,
-        'transactions': transactions
+        'granularity': granularity,
+        'start': start_day.isoformat(),
+        'end': end_day.isoformat(),
+        'points': points,
+        # Bentuk yang sama dengan /sales-data untuk chart lama
+        'dates': [point['label'] for point in points],
+        'revenues': [point['revenue'] for point in points],
+        'transactions': [point['transactions'] for point in points]
     })
 
 @bp.route('/top-products')
 @login_required
 def top_products():
-    """API untuk produk terlaris"""
+    """API untuk produk terlaris; ``hours`` = beberapa jam terakhir (window per jam)"""
     limit = int(request.args.get('limit', 10))
     days = int(request.args.get('days', 30))
+    hours = request.args.get('hours', type=int)
     
-    start_date = datetime.now() - timedelta(days=days)
-    
-    top_products = db.session.query(
-        Product.name,
-        func.sum(SaleItem.quantity).label('total_sold'),
-        func.sum(SaleItem.total_price).label('revenue')
-    ).join(SaleItem, Product.id == SaleItem.product_id)\
-     .join(Sale, SaleItem.sale_id == Sale.id)\
-     .filter(
-         Sale.tenant_id == current_user.tenant_id,
-         Sale.created_at >= start_date
-     ).group_by(Product.id, Product.name)\
-     .order_by(func.sum(SaleItem.quantity).desc())\
-     .limit(limit).all()
-    
-    products_data = []
-    for product in top_products:
-        products_data.append({
-            'name': product.name,
-            'sold': int(product.total_sold),
-            'revenue': float(product.revenue)
-        })
-    
-    return jsonify(products_data)
+    summary = DashboardSummary(current_user.tenant_id, get_local_timezone())
+    if hours:
+        return jsonify(summary.recent_top_products(max(1, min(hours, MAX_RECENT_HOURS)), limit))
+    return jsonify(summary.top_products(days, limit))
 
 @bp.route('/recent-activity')
 @login_required
 def recent_activity():
     """API untuk aktivitas terbaru"""
-    recent_sales = Sale.query.filter_by(
-        tenant_id=current_user.tenant_id
-    ).order_by(Sale.created_at.desc()).limit(10).all()
-    
-    activity_data = []
-    for sale in recent_sales:
-        activity_data.append({
-            'type': 'sale',
-            'title': f'New Sale - {sale.receipt_number}',
-            'description': f'${sale.total_amount:.2f} • {sale.payment_method}',
-            'time': sale.created_at.strftime('%H:%M'),
-            'icon': 'bi-cart-check'
-        })
-    
-    return jsonify(activity_data)
\ No newline at end of file
+    summary = DashboardSummary(current_user.tenant_id, get_local_timezone())
+    return jsonify(summary.recent_activity())
+
+@bp.route('/api/summary')
+@login_required
+def summary():
+    """KPI, chart series, top products dan aktivitas terbaru dalam satu
+    response: ?granularity=day&days=7&max_points=120"""
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f'granularity must be one of {", ".join(GRANULARITIES)}'}), 400
+    try:
+        days = int(request.args.get('days', 7))
+        max_points = int(request.args.get('max_points', 120))
+    except ValueError:
+        return jsonify({'error': 'Invalid date range'}), 400
+    if not 1 <= days <= 3660 or (granularity == 'hour' and days > MAX_HOUR_RANGE_DAYS):
+        return jsonify({'error': 'Invalid date range'}), 400
+    
+    top_limit = min(request.args.get('top_limit', 5, type=int), 50)
+    
+    summary = DashboardSummary(current_user.tenant_id, get_local_timezone())
+    return jsonify(summary.payload(granularity, days, max(0, min(max_points, 1000)), top_limit=top_limit))
+
+@bp.route('/stream')
+@login_required
+def stream():
+    """Server-Sent Events: event ``sale`` setiap checkout tenant ini commit.
+
+    Koneksi ditutup setelah LIVE_STREAM_LIFETIME detik; EventSource otomatis
+    reconnect, jadi worker tidak tertahan selamanya oleh satu dashboard.
+    Paling banyak LIVE_STREAM_MAX koneksi per worker; selebihnya 503 dan
+    dashboard memakai polling.
+    """
+    if not live_events.open_stream(current_app.config.get('LIVE_STREAM_MAX', 8)):
+        return Response('Too many live connections', status=503, headers={'Retry-After': '60'})
+    tenant_id = current_user.tenant_id
+    events = live_events.subscribe(
+        tenant_id,
+        redis_client=current_app.redis,
+        lifetime=current_app.config.get('LIVE_STREAM_LIFETIME', 300)
+    )
+    
+    def generate():
+        yield 'retry: 5000\n\n'
+        for message in events:
+            if message is None:
+                yield ': keep-alive\n\n'
+                continue
+            payload = json.loads(message)
+            yield f"event: {payload['event']}\ndata: {json.dumps(payload['data'])}\n\n"
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Dipanggil saat respons ditutup, juga jika generator belum sempat jalan
+    response.call_on_close(live_events.close_stream)
+    return response
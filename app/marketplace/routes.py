@@ -6,9 +6,12 @@ import os
 from datetime import datetime
 from . import bp
 from .forms import MarketplaceItemForm, RestockOrderForm, RestockVerificationForm, PaymentMethodForm,TenantAddressForm
-from ..models import MarketplaceItem, Product, db, PaymentMethod,RestockOrder, RestockStatus, Tenant
+from ..models import MarketplaceItem, Product, db, PaymentMethod,RestockOrder, RestockStatus, Tenant, StockMovement
 from ..superadmin.routes import superadmin_required
 from app.services.s3_service import S3Service  # Import S3Service
+from app.services.stock_ledger_service import StockLedger
+from app.services.tenant_cache import tenant_cache
+from app.services.principal_service import invalidate_tenant_principals
 
 # --- Rute untuk Tenant ---
 @bp.route('/')
@@ -196,6 +199,9 @@ def my_address():
             tenant.updated_at = datetime.utcnow()
             
             db.session.commit()
+            # Alamat/telepon ikut di snapshot tenant (header struk)
+            tenant_cache.invalidate(tenant)
+            invalidate_tenant_principals(tenant.id)
             flash('Alamat berhasil diperbarui!', 'success')
             return redirect(url_for('marketplace.my_address'))
             
@@ -422,8 +428,10 @@ def verify_restock_order(order_id):
                     name=restock_order.marketplace_item.name
                 ).first()
                 
+                ledger = StockLedger(restock_order.tenant_id, current_user.id)
                 if existing_product:
-                    existing_product.stock_quantity += restock_order.quantity
+                    ledger.add(existing_product, restock_order.quantity,
+                               StockMovement.RESTOCK, restock_order.id)
                 else:
                     new_product = Product(
                         id=str(uuid.uuid4()),
@@ -436,6 +444,11 @@ def verify_restock_order(order_id):
                         image_url=restock_order.marketplace_item.image_url
                     )
                     db.session.add(new_product)
+                    db.session.flush()
+                    ledger.record([ledger.movement_row(
+                        new_product.id, restock_order.quantity,
+                        StockMovement.RESTOCK, restock_order.id, applied=True
+                    )])
                 
                 # Kurangi stok dari marketplace item
                 restock_order.marketplace_item.stock -= restock_order.quantity
@@ -1,26 +1,32 @@
 from flask import request, g
-from app.models import Tenant
 from app import db
+from app.services.tenant_cache import tenant_cache
 
 def tenant_middleware():
-    """Middleware untuk menangani multi-tenancy berdasarkan subdomain atau header"""
+    """Middleware untuk menangani multi-tenancy berdasarkan subdomain atau header.
+
+    ``g.tenant`` adalah ``TenantSnapshot`` dari ``tenant_cache`` (termasuk
+    hasil negatif), jadi request dengan cache hangat tidak melakukan query.
+    """
     g.tenant = None
+    if request.endpoint == 'static':
+        return
     
     # Cek subdomain untuk identifikasi tenant
     host_parts = request.host.split('.')
     if len(host_parts) > 2:
         subdomain = host_parts[0]
         if subdomain and subdomain != 'www':
-            g.tenant = Tenant.query.filter_by(subdomain=subdomain, is_active=True).first()
+            g.tenant = tenant_cache.by_subdomain(subdomain)
     
     # Fallback: cek header X-Tenant-ID
     if not g.tenant and request.headers.get('X-Tenant-ID'):
         tenant_id = request.headers.get('X-Tenant-ID')
-        g.tenant = Tenant.query.filter_by(id=tenant_id, is_active=True).first()
+        g.tenant = tenant_cache.by_id(tenant_id)
     
     # Fallback: tenant default untuk development
     if not g.tenant:
-        g.tenant = Tenant.query.filter_by(is_default=True).first()
+        g.tenant = tenant_cache.default()
 
 def switch_tenant_schema(tenant_id):
     """Switch database schema berdasarkan tenant"""
@@ -1,13 +1,47 @@
 from app import db, login_manager
+from flask import current_app, has_app_context
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import validates
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
 import uuid
 import json
 from enum import Enum
+from app.utils.ids import ID_STRATEGIES
+from app.utils.customer_keys import name_key, phone_key
 
 def generate_uuid():
-    return str(uuid.uuid4())
+    """New primary key; ID_STRATEGY picks time-ordered uuid7 (default) or random uuid4"""
+    strategy = current_app.config.get('ID_STRATEGY', 'uuid7') if has_app_context() else 'uuid7'
+    return str(ID_STRATEGIES.get(strategy, ID_STRATEGIES['uuid7'])())
+
+class GUID(TypeDecorator):
+    """UUID stored natively (16 bytes) on PostgreSQL and as String(36) elsewhere.
+
+    Values are always exchanged as strings, so models and routes keep
+    treating ids as plain ``str``.
+    """
+    impl = db.String(36)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        return dialect.type_descriptor(db.String(36))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return str(uuid.UUID(str(value)))
+        except ValueError:
+            # Id malformed dari URL: tidak akan cocok dengan baris manapun
+            return None
+
+    def process_result_value(self, value, dialect):
+        return str(value) if value is not None else None
 
 def utc_now():
     """Always store in UTC, display will be converted by timezone utils"""
@@ -24,6 +58,10 @@ class Tenant(db.Model):
     city = db.Column(db.String(100))
     postal_code = db.Column(db.String(20))
     subdomain = db.Column(db.String(50), unique=True)
+    timezone = db.Column(db.String(50))  # IANA name; kosong = Config.TIMEZONE
+    pending_timezone = db.Column(db.String(50))  # Zona waktu baru, diterapkan bersama rebuild rollup oleh `flask rollups apply-timezones`
+    timezone_error = db.Column(db.Text)  # Error terakhir saat menerapkan pending_timezone (dicoba lagi tiap putaran)
+    catalog_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Naik tiap perubahan produk/kategori
     is_active = db.Column(db.Boolean, default=True)
     is_default = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=utc_now)
@@ -44,7 +82,7 @@ class Tenant(db.Model):
 class MarketplaceItem(db.Model):
     __tablename__ = 'marketplace_item'
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Float, nullable=False)
@@ -65,7 +103,7 @@ class RestockStatus(Enum):
 class RestockOrder(db.Model):
     __tablename__ = 'restock_orders'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), nullable=False)
     marketplace_item_id = db.Column(db.String(36), db.ForeignKey('marketplace_item.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
@@ -96,7 +134,7 @@ class RestockOrder(db.Model):
 class PaymentMethod(db.Model):
     __tablename__ = 'payment_methods'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     name = db.Column(db.String(100), nullable=False)
     account_number = db.Column(db.String(100))
     account_name = db.Column(db.String(100))
@@ -148,6 +186,7 @@ class Category(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=utc_now)
+    catalog_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Foreign keys
     tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), nullable=False)
@@ -157,6 +196,11 @@ class Category(db.Model):
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Satu barcode = satu produk per tenant (NULL boleh berulang)
+        db.UniqueConstraint('tenant_id', 'barcode', name='uq_products_tenant_barcode'),
+        db.Index('ix_products_tenant_catalog_version', 'tenant_id', 'catalog_version'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     name = db.Column(db.String(200), nullable=False)
@@ -173,6 +217,7 @@ class Product(db.Model):
     image_url = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=utc_now)
     updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+    catalog_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Versi katalog tenant saat terakhir berubah
     
     # Foreign keys
     tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), nullable=False)
@@ -180,6 +225,7 @@ class Product(db.Model):
     
     # Relationships
     sale_items = db.relationship('SaleItem', backref='product', lazy='dynamic')
+    stock_movements = db.relationship('StockMovement', backref='product', lazy='dynamic', passive_deletes='all')
     
     def to_dict(self):
         return {
@@ -192,8 +238,60 @@ class Product(db.Model):
             'barcode': self.barcode
         }
 
+class CatalogTombstone(db.Model):
+    """Produk/kategori yang dihapus, supaya sync delta katalog POS ikut menghapusnya"""
+    __tablename__ = 'catalog_tombstones'
+    __table_args__ = (
+        db.Index('ix_catalog_tombstones_tenant_version', 'tenant_id', 'version'),
+    )
+    
+    PRODUCT = 'product'
+    CATEGORY = 'category'
+    
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    object_id = db.Column(db.String(36), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=utc_now)
+
+class StockMovement(db.Model):
+    """Ledger append-only untuk setiap perubahan stok produk.
+
+    ``Product.stock_quantity`` adalah snapshot; baris dengan ``applied=False``
+    adalah delta yang belum dilipat ke snapshot oleh compactor.
+    """
+    __tablename__ = 'stock_movements'
+    __table_args__ = (
+        db.Index('ix_stock_movements_pending', 'applied', 'product_id'),
+        db.Index('ix_stock_movements_product_created', 'product_id', 'created_at'),
+    )
+    
+    SALE = 'sale'
+    RESTOCK = 'restock'
+    ADJUSTMENT = 'adjustment'
+    EDIT = 'edit'
+    
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    quantity = db.Column(db.Integer, nullable=False)  # Delta bertanda: negatif = keluar
+    reason = db.Column(db.String(20), nullable=False)  # sale, restock, adjustment, edit
+    reference_id = db.Column(db.String(36))  # sale id / restock order id
+    applied = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=utc_now)
+    
+    # Foreign keys
+    tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), nullable=False)
+    product_id = db.Column(db.String(36), db.ForeignKey('products.id'), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'))
+
 class Customer(db.Model):
     __tablename__ = 'customers'
+    __table_args__ = (
+        # Typeahead POS: prefix nama / nomor HP + keyset (key, id)
+        db.Index('ix_customers_tenant_name_key', 'tenant_id', 'name_key', 'id'),
+        db.Index('ix_customers_tenant_phone_key', 'tenant_id', 'phone_key', 'id'),
+        db.Index('ix_customers_tenant_total_spent', 'tenant_id', 'total_spent'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     name = db.Column(db.String(100), nullable=False)
@@ -202,6 +300,14 @@ class Customer(db.Model):
     address = db.Column(db.Text)
     loyalty_points = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=utc_now)
+    name_key = db.Column(db.String(100))  # Nama lowercase, diisi otomatis dari name
+    phone_key = db.Column(db.String(20))  # Digit HP tanpa 0/+62, diisi otomatis dari phone
+    
+    # Statistik pembelian, diperbarui saat checkout (CustomerStats)
+    total_spent = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    sales_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    first_sale_at = db.Column(db.DateTime)
+    last_sale_at = db.Column(db.DateTime)
     
     # Foreign keys
     tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), nullable=False)
@@ -209,35 +315,36 @@ class Customer(db.Model):
     # Relationships
     sales = db.relationship('Sale', backref='customer', lazy='dynamic')
     
-    @property
-    def last_sale_date(self):
-        """Get the date of the last sale for this customer"""
-        last_sale = self.sales.order_by(Sale.created_at.desc()).first()
-        return last_sale.created_at if last_sale else None
+    @validates('name', 'phone')
+    def _update_search_keys(self, key, value):
+        if key == 'name':
+            self.name_key = name_key(value)
+        else:
+            self.phone_key = phone_key(value)
+        return value
     
     @property
-    def total_spent(self):
-        """Calculate total amount spent by customer"""
-        return db.session.query(db.func.sum(Sale.total_amount))\
-            .filter(Sale.customer_id == self.id)\
-            .scalar() or 0
-    
-    @property 
-    def sales_count(self):
-        """Get total number of sales"""
-        return self.sales.count()
+    def last_sale_date(self):
+        """Date of the last sale for this customer"""
+        return self.last_sale_at
 
 class Sale(db.Model):
     __tablename__ = 'sales'
-    
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    receipt_number = db.Column(db.String(50), unique=True, nullable=False)
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'receipt_number', name='uq_sales_tenant_receipt_number'),
+        db.UniqueConstraint('tenant_id', 'client_ref', name='uq_sales_tenant_client_ref'),
+        db.Index('ix_sales_tenant_created', 'tenant_id', 'created_at', 'id'),
+    )
+    
+    id = db.Column(GUID, primary_key=True, default=generate_uuid)
+    receipt_number = db.Column(db.String(50), nullable=False)
     total_amount = db.Column(db.Float, nullable=False)
     tax_amount = db.Column(db.Float, default=0)
     discount_amount = db.Column(db.Float, default=0)
     payment_method = db.Column(db.String(20), nullable=False)  # cash, card, transfer
     payment_status = db.Column(db.String(20), default='completed')
     notes = db.Column(db.Text)
+    client_ref = db.Column(db.String(64))  # Idempotency key dari terminal POS
     created_at = db.Column(db.DateTime, default=utc_now)
     
     # Foreign keys
@@ -254,22 +361,74 @@ class Sale(db.Model):
         subtotal = sum(item.total_price for item in self.items)
         self.total_amount = subtotal + self.tax_amount - self.discount_amount
 
+class ReceiptSequence(db.Model):
+    """High-water mark nomor struk per tenant per hari (lokal).
+
+    Worker mengambil blok nomor sekaligus (hi-lo), jadi tabel ini hanya
+    disentuh sekali per blok, bukan per penjualan.
+    """
+    __tablename__ = 'receipt_sequences'
+    
+    tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), primary_key=True)
+    day = db.Column(db.String(8), primary_key=True)  # YYYYMMDD
+    next_value = db.Column(db.Integer, nullable=False, default=1)
+
 class SaleItem(db.Model):
     __tablename__ = 'sale_items'
+    __table_args__ = (
+        db.Index('ix_sale_items_sale_id', 'sale_id'),
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(GUID, primary_key=True, default=generate_uuid)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)
     total_price = db.Column(db.Float, nullable=False)
     
     # Foreign keys
-    sale_id = db.Column(db.String(36), db.ForeignKey('sales.id'), nullable=False)
+    sale_id = db.Column(GUID, db.ForeignKey('sales.id'), nullable=False)
     product_id = db.Column(db.String(36), db.ForeignKey('products.id'), nullable=False)
     
     @property
     def product_name(self):
         return self.product.name
 
+class DailySalesRollup(db.Model):
+    """Total penjualan per tenant per hari (lokal), diperbarui saat checkout"""
+    __tablename__ = 'daily_sales_rollups'
+    
+    tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    tax_amount = db.Column(db.Float, nullable=False, default=0)
+    discount_amount = db.Column(db.Float, nullable=False, default=0)
+    transactions = db.Column(db.Integer, nullable=False, default=0)
+    items_sold = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyProductRollup(db.Model):
+    """Kuantitas & omzet per produk per tenant per hari (lokal)"""
+    __tablename__ = 'daily_product_rollups'
+    
+    tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.String(36), db.ForeignKey('products.id'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    
+    product = db.relationship('Product')
+
+class DailyPaymentRollup(db.Model):
+    """Omzet per metode pembayaran dan kasir per tenant per hari (lokal)"""
+    __tablename__ = 'daily_payment_rollups'
+    
+    tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    payment_method = db.Column(db.String(20), primary_key=True)
+    user_id = db.Column(db.String(36), primary_key=True, default='')  # '' jika kasir tidak diketahui
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    transactions = db.Column(db.Integer, nullable=False, default=0)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(user_id)
\ No newline at end of file
+    # Snapshot dari cache; ORM User hanya dimuat jika route membutuhkannya
+    from app.services.principal_service import load_principal
+    return load_principal(user_id)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, FloatField, IntegerField, SelectField, TextAreaField, BooleanField, SubmitField
+from wtforms import StringField, FloatField, IntegerField, SelectField, TextAreaField, BooleanField, SubmitField, HiddenField
 from wtforms.validators import DataRequired, NumberRange, Length, Optional
 from flask_wtf.file import FileField, FileAllowed
 
@@ -11,6 +11,7 @@ class ProductForm(FlaskForm):
     price = FloatField('Price', validators=[DataRequired(), NumberRange(min=0)])
     cost_price = FloatField('Cost Price', validators=[Optional(), NumberRange(min=0)])
     stock_quantity = IntegerField('Stock Quantity', validators=[DataRequired(), NumberRange(min=0)])
+    stock_shown = HiddenField()  # Stok (snapshot + pending) yang ditampilkan saat form dibuka
     stock_alert = IntegerField('Low Stock Alert', validators=[DataRequired(), NumberRange(min=0)])
     unit = SelectField('Unit', choices=[('pcs', 'Pieces'), ('carton', 'Carton')], default='pcs')
     carton_quantity = IntegerField('Pieces per Carton', validators=[Optional(), NumberRange(min=1)], default=1)
@@ -2,8 +2,10 @@ from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from app.products import bp
 from app.products.forms import ProductForm, CategoryForm
-from app.models import Product, Category, db
+from app.models import Product, Category, StockMovement, db
 from app.services.s3_service import S3Service
+from app.services.stock_ledger_service import StockLedger
+from app.services.product_search import product_search
 import os
 
 @bp.route('/')
@@ -57,6 +59,24 @@ def index():
                          low_stock_count=low_stock_count,
                          out_of_stock_count=out_of_stock_count)
 
+def _clean_barcode(form):
+    # Barcode kosong disimpan NULL supaya tidak bentrok di unique index
+    return (form.barcode.data or '').strip() or None
+
+def _barcode_available(form, product_id=None):
+    """Barcode harus unik per tenant (uq_products_tenant_barcode)"""
+    barcode = _clean_barcode(form)
+    if not barcode:
+        return True
+    query = Product.query.filter_by(tenant_id=current_user.tenant_id, barcode=barcode)
+    if product_id:
+        query = query.filter(Product.id != product_id)
+    taken = query.first()
+    if taken:
+        form.barcode.errors.append(f'Barcode already used by {taken.name}')
+        return False
+    return True
+
 @bp.route('/create', methods=['GET', 'POST'])
 @login_required
 def create():
@@ -68,13 +88,13 @@ def create():
         Category.query.filter_by(tenant_id=current_user.tenant_id).all()
     ]
     
-    if form.validate_on_submit():
+    if form.validate_on_submit() and _barcode_available(form):
         try:
             product = Product(
                 name=form.name.data,
                 description=form.description.data,
                 sku=form.sku.data,
-                barcode=form.barcode.data,
+                barcode=_clean_barcode(form),
                 price=form.price.data,
                 cost_price=form.cost_price.data,
                 stock_quantity=form.stock_quantity.data,
@@ -93,6 +113,14 @@ def create():
                 product.image_url = image_url
             
             db.session.add(product)
+            db.session.flush()
+            
+            # Stok awal masuk ke ledger sebagai movement yang sudah diterapkan
+            if product.stock_quantity:
+                ledger = StockLedger(current_user.tenant_id, current_user.id)
+                ledger.record([ledger.movement_row(
+                    product.id, product.stock_quantity, StockMovement.ADJUSTMENT, applied=True
+                )])
             db.session.commit()
             
             flash('Product created successfully!', 'success')
@@ -118,15 +146,29 @@ def edit(product_id):
         Category.query.filter_by(tenant_id=current_user.tenant_id).all()
     ]
     
-    if form.validate_on_submit():
+    ledger = StockLedger(current_user.tenant_id, current_user.id)
+    # Stok yang dilihat user = snapshot + movement yang belum dikompaksi
+    available = ledger.available({product.id: product})[product.id]
+    if request.method == 'GET':
+        form.stock_quantity.data = available
+        form.stock_shown.data = available
+    
+    if form.validate_on_submit() and _barcode_available(form, product.id):
         try:
+            try:
+                shown = int(form.stock_shown.data)
+            except (TypeError, ValueError):
+                shown = available
             product.name = form.name.data
             product.description = form.description.data
             product.sku = form.sku.data
-            product.barcode = form.barcode.data
+            product.barcode = _clean_barcode(form)
             product.price = form.price.data
             product.cost_price = form.cost_price.data
-            product.stock_quantity = form.stock_quantity.data
+            # Hanya kalau stok benar-benar diubah; kalau tidak, EDIT movement
+            # akan membatalkan penjualan yang belum dikompaksi
+            if (form.stock_quantity.data or 0) != shown:
+                ledger.set_quantity(product, form.stock_quantity.data or 0)
             product.stock_alert = form.stock_alert.data
             product.unit = form.unit.data
             product.carton_quantity = form.carton_quantity.data
@@ -158,6 +200,12 @@ def delete(product_id):
     ).first_or_404()
     
     try:
+        if product.stock_movements.first() is not None:
+            # Riwayat stok append-only tidak boleh ikut terhapus
+            product.is_active = False
+            db.session.commit()
+            flash('Product has stock history, so it was deactivated instead of deleted.', 'warning')
+            return redirect(url_for('products.index'))
         db.session.delete(product)
         db.session.commit()
         flash('Product deleted successfully!', 'success')
@@ -237,26 +285,8 @@ def delete_category(category_id):
 @bp.route('/api/search')
 @login_required
 def api_search():
-    query = request.args.get('q', '')
+    query = request.args.get('q', '').strip()
     if not query:
         return jsonify([])
     
-    products = Product.query.filter(
-        Product.tenant_id == current_user.tenant_id,
-        Product.is_active == True,
-        db.or_(
-            Product.name.ilike(f'%{query}%'),
-            Product.sku.ilike(f'%{query}%'),
-            Product.barcode.ilike(f'%{query}%')
-        )
-    ).limit(10).all()
-    
-    return jsonify([{
-        'id': p.id,
-        'name': p.name,
-        'price': float(p.price),
-        'stock_quantity': p.stock_quantity,
-        'image_url': p.image_url,
-        'sku': p.sku,
-        'barcode': p.barcode
-    } for p in products])
\ No newline at end of file
+    return jsonify(product_search.search_payload(current_user.tenant_id, query, 10))
\ No newline at end of file
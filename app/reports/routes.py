@@ -1,168 +1,181 @@
-from flask import render_template, jsonify, request, send_file
+from flask import render_template, stream_template, jsonify, request, send_file, current_app, Response, url_for, abort
 from flask_login import login_required, current_user
 from app.reports import bp
-from app.models import Sale, Product, SaleItem, db
+from app.models import Sale, Product, DailySalesRollup, DailyProductRollup, DailyPaymentRollup, db
+from app.services.sales_history_service import SalesHistory
+from app.services.report_export_service import ExcelExport, PdfReport, XLSX_MIMETYPE, export_jobs
+from app.utils.timezone import now_local, get_local_timezone, local_hour_expr
 from datetime import datetime, timedelta
-import io
-import openpyxl
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
+import os
+import tempfile
 
 @bp.route('/')
 @login_required
 def index():
     return render_template('reports/index.html')
 
+def _report_days():
+    """``(start_day, end_day)`` lokal dari query string; None jika kosong/invalid"""
+    days = []
+    for name in ('start_date', 'end_date'):
+        try:
+            days.append(datetime.strptime(request.args.get(name, ''), '%Y-%m-%d').date())
+        except ValueError:
+            days.append(None)
+    return tuple(days)
+
 @bp.route('/sales-report')
 @login_required
 def sales_report():
-    # Filter parameters
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    # Build query
-    query = Sale.query.filter_by(tenant_id=current_user.tenant_id)
-    
-    if start_date:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d')
-        query = query.filter(Sale.created_at >= start_date)
-    
-    if end_date:
-        end_date = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-        query = query.filter(Sale.created_at < end_date)
-    
-    sales = query.order_by(Sale.created_at.desc()).all()
-    
-    # Summary statistics
-    total_sales = len(sales)
-    total_revenue = sum(sale.total_amount for sale in sales)
+    # Tanggal filter adalah hari lokal tenant
+    start_day, end_day = _report_days()
+    tenant_id = current_user.tenant_id
+    
+    def in_range(query, day_column):
+        if start_day:
+            query = query.filter(day_column >= start_day)
+        if end_day:
+            query = query.filter(day_column <= end_day)
+        return query
+    
+    # Ringkasan: satu agregat SQL atas rollup harian
+    total_sales, total_revenue = in_range(db.session.query(
+        db.func.sum(DailySalesRollup.transactions),
+        db.func.sum(DailySalesRollup.revenue)
+    ).filter(DailySalesRollup.tenant_id == tenant_id), DailySalesRollup.day).one()
+    total_sales = int(total_sales or 0)
+    total_revenue = float(total_revenue or 0)
     avg_sale = total_revenue / total_sales if total_sales else 0
     
-    return render_template('reports/sales_report.html', 
-                         sales=sales,
-                         total_sales=total_sales,
-                         total_revenue=total_revenue,
-                         avg_sale=avg_sale)
+    payment_breakdown = dict(in_range(db.session.query(
+        DailyPaymentRollup.payment_method,
+        db.func.sum(DailyPaymentRollup.transactions)
+    ).filter(DailyPaymentRollup.tenant_id == tenant_id), DailyPaymentRollup.day).group_by(
+        DailyPaymentRollup.payment_method
+    ).all())
+    
+    history = SalesHistory(tenant_id, start=start_day, end=end_day)
+    hour = local_hour_expr(Sale.created_at)
+    sales_by_hour = [0] * 24
+    for bucket, count in history.query().with_entities(hour, db.func.count(Sale.id)).group_by(hour):
+        sales_by_hour[int(str(bucket)[11:13])] += count
+    
+    context = dict(total_sales=total_sales,
+                   total_revenue=total_revenue,
+                   avg_sale=avg_sale,
+                   payment_breakdown={method: int(count) for method, count in payment_breakdown.items()},
+                   sales_by_hour=sales_by_hour,
+                   filters={k: request.args[k] for k in ('start_date', 'end_date') if request.args.get(k)})
+    
+    if request.args.get('all'):
+        # Seluruh rentang: baris dialirkan per batch, template tidak pernah
+        # memegang semua penjualan di memori
+        return Response(stream_template('reports/sales_report.html',
+                                        sales=history.stream(), streaming=True,
+                                        older=None, newer=None, **context),
+                        mimetype='text/html')
+    
+    sales, older, newer = history.page(after=request.args.get('after'), before=request.args.get('before'),
+                                       per_page=current_app.config.get('REPORT_PAGE_SIZE', 100))
+    return render_template('reports/sales_report.html', sales=sales, streaming=False,
+                         older=older, newer=newer, **context)
 
 @bp.route('/export-excel')
 @login_required
 def export_excel():
     """Export sales report to Excel"""
-    # Get sales data
-    sales = Sale.query.filter_by(tenant_id=current_user.tenant_id)\
-        .order_by(Sale.created_at.desc()).all()
-    
-    # Create workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Sales Report"
-    
-    # Headers
-    headers = ['Receipt No', 'Date', 'Customer', 'Items', 'Total Amount', 'Payment Method']
-    ws.append(headers)
-    
-    # Data
-    for sale in sales:
-        items_count = sale.items.count()
-        customer_name = sale.customer.name if sale.customer else 'Walk-in'
-        
-        ws.append([
-            sale.receipt_number,
-            sale.created_at.strftime('%Y-%m-%d %H:%M'),
-            customer_name,
-            items_count,
-            sale.total_amount,
-            sale.payment_method
-        ])
-    
-    # Save to bytes buffer
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=f"sales_report_{datetime.now().strftime('%Y%m%d')}.xlsx",
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    start_day, end_day = _report_days()
+    sheets = request.args.get('sheets', 'sales').split(',')
+    export = ExcelExport(current_user.tenant_id, get_local_timezone(), start_day, end_day, sheets)
+    
+    if export.estimated_rows() > current_app.config.get('EXPORT_SYNC_ROWS', 20000):
+        # Terlalu besar untuk satu request: dikerjakan di background
+        job_id = export_jobs.start(export, current_user.id)
+        return render_template('reports/export_status.html', job_id=job_id, filename=export.filename())
+    
+    # Spool ke file sementara (hilang saat ditutup), bukan BytesIO
+    spool = tempfile.TemporaryFile()
+    export.write(spool)
+    spool.seek(0)
+    return send_file(spool, as_attachment=True, download_name=export.filename(), mimetype=XLSX_MIMETYPE)
+
+@bp.route('/exports/<job_id>')
+@login_required
+def export_status(job_id):
+    job = export_jobs.get(job_id, current_user.tenant_id, current_user.id)
+    if job is None:
+        return jsonify({'status': 'missing'}), 404
+    payload = {'status': job['status'], 'error': job['error']}
+    if job['status'] == 'done':
+        payload['download_url'] = url_for('reports.export_download', job_id=job_id)
+    return jsonify(payload)
+
+@bp.route('/exports/<job_id>/download')
+@login_required
+def export_download(job_id):
+    job = export_jobs.get(job_id, current_user.tenant_id, current_user.id)
+    if job is None or job['status'] != 'done':
+        abort(404)
+    path = job['path']
+    if not os.path.exists(path):
+        abort(404)
+    return send_file(path, as_attachment=True, download_name=job['filename'], mimetype=job['mimetype'])
 
 @bp.route('/export-pdf')
 @login_required
 def export_pdf():
     """Export sales report to PDF"""
-    sales = Sale.query.filter_by(tenant_id=current_user.tenant_id)\
-        .order_by(Sale.created_at.desc()).limit(50).all()
-    
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    
-    # Header
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(100, 800, f"Sales Report - {current_user.tenant.name}")
-    p.setFont("Helvetica", 10)
-    p.drawString(100, 780, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    
-    # Table headers
-    y_position = 750
-    p.drawString(100, y_position, "Receipt No")
-    p.drawString(200, y_position, "Date")
-    p.drawString(300, y_position, "Total")
-    p.drawString(400, y_position, "Payment")
-    
-    # Data rows
-    y_position -= 20
-    for sale in sales:
-        if y_position < 100:  # New page jika perlu
-            p.showPage()
-            y_position = 750
-        
-        p.drawString(100, y_position, sale.receipt_number)
-        p.drawString(200, y_position, sale.created_at.strftime('%m/%d %H:%M'))
-        p.drawString(300, y_position, f"${sale.total_amount:.2f}")
-        p.drawString(400, y_position, sale.payment_method)
-        y_position -= 15
-    
-    p.save()
-    buffer.seek(0)
-    
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=f"sales_report_{datetime.now().strftime('%Y%m%d')}.pdf",
-        mimetype='application/pdf'
-    )
+    start_day, end_day = _report_days()
+    report = PdfReport(current_user.tenant_id, get_local_timezone(), start_day, end_day,
+                       tenant_name=current_user.tenant.name)
+    path = report.cached_path()
+    if os.path.exists(path):
+        # Data rentang ini belum berubah sejak PDF terakhir dibuat
+        return send_file(path, as_attachment=True, download_name=report.filename(), mimetype='application/pdf')
+    
+    job_id = export_jobs.start(report, current_user.id, mimetype='application/pdf', path=path)
+    return render_template('reports/export_status.html', job_id=job_id, filename=report.filename())
 
 @bp.route('/dashboard-data')
 @login_required
 def dashboard_data():
     """API data untuk dashboard charts"""
-    # Sales last 7 days
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=7)
+    # Sales last 7 days (hari lokal, dari rollup harian)
+    end_day = now_local().date()
+    start_day = end_day - timedelta(days=6)
     
     daily_sales = db.session.query(
-        db.func.date(Sale.created_at),
-        db.func.sum(Sale.total_amount),
-        db.func.count(Sale.id)
+        DailySalesRollup.day,
+        DailySalesRollup.revenue,
+        DailySalesRollup.transactions
     ).filter(
-        Sale.tenant_id == current_user.tenant_id,
-        Sale.created_at >= start_date,
-        Sale.created_at <= end_date
-    ).group_by(db.func.date(Sale.created_at)).all()
+        DailySalesRollup.tenant_id == current_user.tenant_id,
+        DailySalesRollup.day >= start_day,
+        DailySalesRollup.day <= end_day
+    ).order_by(DailySalesRollup.day).all()
     
     # Top products
     top_products = db.session.query(
         Product.name,
-        db.func.sum(SaleItem.quantity),
-        db.func.sum(SaleItem.total_price)
-    ).join(SaleItem, Product.id == SaleItem.product_id)\
-     .join(Sale, SaleItem.sale_id == Sale.id)\
-     .filter(Sale.tenant_id == current_user.tenant_id)\
+        db.func.sum(DailyProductRollup.quantity),
+        db.func.sum(DailyProductRollup.revenue)
+    ).join(Product, Product.id == DailyProductRollup.product_id)\
+     .filter(DailyProductRollup.tenant_id == current_user.tenant_id)\
      .group_by(Product.id, Product.name)\
-     .order_by(db.func.sum(SaleItem.total_price).desc())\
+     .order_by(db.func.sum(DailyProductRollup.revenue).desc())\
      .limit(10).all()
     
+    # Payment methods
+    payment_methods = db.session.query(
+        DailyPaymentRollup.payment_method,
+        db.func.sum(DailyPaymentRollup.revenue),
+        db.func.sum(DailyPaymentRollup.transactions)
+    ).filter(
+        DailyPaymentRollup.tenant_id == current_user.tenant_id,
+        DailyPaymentRollup.day >= start_day,
+        DailyPaymentRollup.day <= end_day
+    ).group_by(DailyPaymentRollup.payment_method).all()
+    
     return jsonify({
         'daily_sales': [
             {'date': str(date), 'revenue': float(revenue), 'count': count}
@@ -171,5 +184,9 @@ def dashboard_data():
         'top_products': [
             {'name': name, 'quantity': int(quantity), 'revenue': float(revenue)}
             for name, quantity, revenue in top_products
+        ],
+        'payment_methods': [
+            {'method': method, 'revenue': float(revenue), 'count': int(count)}
+            for method, revenue, count in payment_methods
         ]
     })
\ No newline at end of file
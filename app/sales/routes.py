@@ -1,15 +1,23 @@
-from flask import render_template, jsonify, request, flash, redirect, url_for, send_file
+from flask import render_template, jsonify, request, flash, redirect, url_for, current_app, abort
 from flask_login import login_required, current_user
 from app.sales import bp
-from app.models import Sale, SaleItem, Product, Customer, db
+from app.models import User, db
 from app.sales.forms import SaleForm
 from app.services.printer_service import PrinterService
+from app.services.checkout_service import CheckoutService, CheckoutError
+from app.services.receipt_service import ReceiptSerializer
+from app.services.receipt_number_service import receipt_numbers
+from app.services.live_events import publish_sales
+from app.services.top_sellers_service import TopSellers
+from app.services.product_search import product_search
+from app.services.customer_search import CustomerTypeahead
+from app.services.sales_history_service import SalesHistory
+from app.services.receipt_artifacts import receipt_artifacts
+from app.services.catalog_service import CatalogSnapshot, catalog_etag, catalog_version
 import json
-from datetime import datetime
 import uuid
-import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
 from flask_wtf.csrf import CSRFProtect
 csrf = CSRFProtect()
 @bp.route('/')
@@ -21,48 +29,85 @@ def index():
 @bp.route('/pos')
 @login_required
 def pos():
-    products = Product.query.filter_by(
-        tenant_id=current_user.tenant_id, 
-        is_active=True
-    ).order_by(Product.name).all()
-    customers = Customer.query.filter_by(tenant_id=current_user.tenant_id).order_by(Customer.name).all()
-    return render_template('sales/pos.html', products=products, customers=customers)
+    # Produk (IndexedDB via /api/catalog) dan customer (typeahead) dimuat oleh JS
+    return render_template('sales/pos.html')
+
+@bp.route('/api/catalog')
+@login_required
+def api_catalog():
+    """Katalog POS: snapshot penuh, atau delta sejak ?since=<version>"""
+    tenant_id = current_user.tenant_id
+    etag = catalog_etag(tenant_id, catalog_version(tenant_id))
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        payload = CatalogSnapshot(tenant_id).payload(request.args.get('since', type=int))
+        # Versi bisa sudah naik sejak dicek di atas; ETag ikut versi payload
+        etag = catalog_etag(tenant_id, payload['version'])
+        response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 @bp.route('/api/products')
 @login_required
 def api_products():
     """API untuk pencarian produk real-time"""
-    search = request.args.get('q', '')
+    search = request.args.get('q', '').strip()
     category = request.args.get('category', '')
     
-    query = Product.query.filter_by(
-        tenant_id=current_user.tenant_id,
-        is_active=True
-    )
-    
+    # Pencarian teks lewat index in-memory, bukan ILIKE '%q%' (seq scan)
     if search:
-        query = query.filter(
-            db.or_(
-                Product.name.ilike(f'%{search}%'),
-                Product.sku.ilike(f'%{search}%'),
-                Product.barcode.ilike(f'%{search}%')
-            )
-        )
-    
-    if category:
-        query = query.filter_by(category_id=category)
-    
-    products = query.limit(50).all()
+        return jsonify(product_search.search_payload(current_user.tenant_id, search, 50, category or None))
+    return jsonify(product_search.browse_payload(current_user.tenant_id, 50, category or None))
+
+@bp.route('/api/barcode/<path:code>')
+@login_required
+def api_barcode(code):
+    """Resolusi scan barcode/SKU: exact match, bukan pencarian"""
+    code = code.strip()
+    entry = product_search.resolve(current_user.tenant_id, [code]).get(code) if code else None
+    products = product_search.payload([entry] if entry else [])
+    if not products:
+        return jsonify({'error': 'Product not found', 'code': code}), 404
+    return jsonify(products[0])
+
+@bp.route('/api/barcode', methods=['POST'])
+@login_required
+@csrf.exempt
+def api_barcode_batch():
+    """Resolusi banyak kode sekaligus (scan beruntun / antrean offline)"""
+    data = request.get_json(silent=True) or {}
+    codes = [str(code).strip() for code in data.get('codes') or [] if str(code).strip()]
+    limit = current_app.config.get('BARCODE_BATCH_LIMIT', 200)
+    if len(codes) > limit:
+        return jsonify({'error': f'At most {limit} codes per request'}), 400
     
-    return jsonify([{
-        'id': p.id,
-        'name': p.name,
-        'price': float(p.price),
-        'stock_quantity': p.stock_quantity,
-        'image_url': p.image_url,
-        'sku': p.sku,
-        'barcode': p.barcode
-    } for p in products])
+    found = product_search.resolve(current_user.tenant_id, list(dict.fromkeys(codes)))
+    rows = {row['id']: row for row in product_search.payload(list(found.values()))}
+    products = {code: rows[entry.id] for code, entry in found.items() if entry.id in rows}
+    return jsonify({
+        'products': products,
+        'missing': [code for code in dict.fromkeys(codes) if code not in products]
+    })
+
+def generate_receipt_number():
+    return receipt_numbers.next_receipt_number(current_user.tenant_id)
+
+def after_checkout_commit(checkout_service):
+    """Side effects di luar database, hanya setelah sale benar-benar tersimpan"""
+    TopSellers().record(current_user.tenant_id, checkout_service.created, checkout_service.created_items)
+    CustomerTypeahead(current_user.tenant_id).record_use(row.get('customer_id') for row in checkout_service.created)
+    publish_sales(current_user.tenant_id, checkout_service.created)
+
+def duplicate_sale(existing):
+    sale_id, receipt_number = existing
+    return jsonify({
+        'success': True,
+        'duplicate': True,
+        'sale_id': sale_id,
+        'receipt_number': receipt_number
+    })
 
 @bp.route('/process-sale', methods=['POST'])
 @login_required
@@ -73,157 +118,174 @@ def process_sale():
         if not data or 'items' not in data or not data['items']:
             return jsonify({'success': False, 'error': 'No items in cart'}), 400
         
-        data = request.get_json()
-        print("Parsed JSON data:", data)
-        
-        # Validasi data
-        if not data:
-            return jsonify({'success': False, 'error': 'No JSON data received'}), 400
-        
-        if 'items' not in data:
-            return jsonify({'success': False, 'error': 'Missing items field'}), 400
-            
-        if len(data['items']) == 0:
-            return jsonify({'success': False, 'error': 'No items in cart'}), 400
-        
         # Validasi field yang diperlukan
         required_fields = ['total_amount', 'payment_method']
         for field in required_fields:
             if field not in data:
                 return jsonify({'success': False, 'error': f'Missing required field: {field}'}), 400
         
-        # Generate receipt number
-        receipt_number = f"RCP-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
+        checkout_service = CheckoutService(current_user.tenant_id, current_user.id)
         
-        # Create sale
-        sale = Sale(
-            receipt_number=receipt_number,
-            total_amount=float(data['total_amount']),
-            tax_amount=float(data.get('tax_amount', 0)),
-            discount_amount=float(data.get('discount_amount', 0)),
-            payment_method=data['payment_method'],
-            customer_id=data.get('customer_id'),
-            user_id=current_user.id,
-            tenant_id=current_user.tenant_id,
-            notes=data.get('notes', '')
-        )
-        db.session.add(sale)
-        db.session.flush()  # Get sale ID without committing
+        # Request ulang dari terminal (client_ref sama) tidak membuat sale baru
+        client_ref = data.get('client_ref')
+        if client_ref:
+            existing = checkout_service.find_existing([client_ref]).get(client_ref)
+            if existing:
+                return duplicate_sale(existing)
         
-        # Create sale items dan update stock
-        for item in data['items']:
-            # Validasi item structure
-            if 'product_id' not in item or 'quantity' not in item:
-                db.session.rollback()
-                return jsonify({'success': False, 'error': 'Invalid item structure'}), 400
-                
-            product = Product.query.filter_by(
-                id=item['product_id'],
-                tenant_id=current_user.tenant_id
-            ).first()
-            
-            if not product:
-                db.session.rollback()
-                return jsonify({'success': False, 'error': f"Product {item['product_id']} not found"}), 404
-            
-            if product.stock_quantity < item['quantity']:
-                db.session.rollback()
-                return jsonify({'success': False, 'error': f"Insufficient stock for {product.name}. Available: {product.stock_quantity}, Requested: {item['quantity']}"}), 400
+        # Create sale, sale items dan update stock dalam satu transaksi
+        try:
+            sale, lines = checkout_service.checkout(data, generate_receipt_number())
             
-            sale_item = SaleItem(
-                sale_id=sale.id,
-                product_id=item['product_id'],
-                quantity=item['quantity'],
-                unit_price=float(item.get('unit_price', product.price)),
-                total_price=float(item.get('total_price', item['quantity'] * product.price))
+            # Siapkan data struk dari baris checkout yang sudah ada di memory,
+            # sebelum commit meng-expire semua objek di session
+            serializer = ReceiptSerializer(current_user.tenant, current_user.username)
+            receipt_data = serializer.serialize(
+                sale, lines,
+                amount_paid=data.get('amount_paid'),
+                change=data.get('change_amount', 0)
             )
-            db.session.add(sale_item)
+            sale_id = sale.id
             
-            # Update stock quantity
-            product.stock_quantity -= item['quantity']
-            product.updated_at = datetime.utcnow()
-        
-        db.session.commit()
-        
-       # PERUBAHAN: Siapkan data struk untuk dikirim ke frontend
-        receipt_data = {
-            'company_name': current_user.tenant.name if current_user.tenant else 'T-POS ENTERPRISE',
-            'store_name': getattr(current_user.tenant, 'store_name', 'Main Store'),
-            'store_address': getattr(current_user.tenant, 'address', ''),
-            'store_phone': getattr(current_user.tenant, 'phone', ''),
-            'receipt_number': sale.receipt_number,
-            'date': sale.created_at.strftime('%Y-%m-%d %H:%M'),
-            'cashier': current_user.username,
-            'items': [
-                {
-                    'name': item.product.name,
-                    'quantity': item.quantity,
-                    'price': float(item.unit_price),
-                    'total': float(item.total_price)
-                } for item in sale.items
-            ],
-            'subtotal': float(sale.total_amount - sale.tax_amount + sale.discount_amount),
-            'tax': float(sale.tax_amount),
-            'discount': float(sale.discount_amount),
-            'grand_total': float(sale.total_amount),
-            'payment_method': sale.payment_method.upper(),
-            'amount_paid': float(data.get('amount_paid', sale.total_amount)),
-            'change': float(data.get('change_amount', 0))
-        }
+            db.session.commit()
+        except CheckoutError as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': e.message}), e.status_code
+        except IntegrityError:
+            # Retry yang sama masuk bersamaan: request lain sudah menyimpan client_ref ini
+            db.session.rollback()
+            existing = checkout_service.find_existing([client_ref]).get(client_ref) if client_ref else None
+            if existing is None:
+                raise
+            return duplicate_sale(existing)
+        after_checkout_commit(checkout_service)
 
         return jsonify({
             'success': True,
-            'sale_id': sale.id,
-            'receipt_number': sale.receipt_number,
+            'sale_id': sale_id,
+            'receipt_number': receipt_data['receipt_number'],
             'receipt_data': receipt_data  # Kirim data ini ke frontend
         })
 
     except Exception as e:
         db.session.rollback()
-        print(f"Error in process_sale: {str(e)}")
+        current_app.logger.error(f"Error in process_sale: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@bp.route('/api/sync', methods=['POST'])
+@login_required
+@csrf.exempt
+def api_sync():
+    """Sinkronisasi batch penjualan offline dari terminal POS"""
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('sales'), list):
+        return jsonify({'success': False, 'error': 'Missing sales field'}), 400
+    
+    max_batch = current_app.config.get('SYNC_MAX_BATCH', 500)
+    if len(data['sales']) > max_batch:
+        return jsonify({'success': False, 'error': f'Batch too large (max {max_batch} sales)'}), 413
+    
+    checkout_service = CheckoutService(current_user.tenant_id, current_user.id)
+    try:
+        results = checkout_service.sync_batch(data['sales'], generate_receipt_number)
+        db.session.commit()
+        after_checkout_commit(checkout_service)
+    except CheckoutError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': e.message}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in api_sync: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({'success': True, 'results': results})
+
 @bp.route('/history')
 @login_required
 def history():
-    page = request.args.get('page', 1, type=int)
     date_filter = request.args.get('date', '')
     payment_filter = request.args.get('payment_method', '')
+    cashier_filter = request.args.get('cashier', '')
+    customer_filter = request.args.get('customer', '').strip()
+    min_amount = request.args.get('min_amount', type=float)
+    max_amount = request.args.get('max_amount', type=float)
     
-    query = Sale.query.filter_by(tenant_id=current_user.tenant_id)
-    
+    day = None
     if date_filter:
         try:
-            filter_date = datetime.strptime(date_filter, '%Y-%m-%d')
-            next_day = filter_date.replace(day=filter_date.day + 1)
-            query = query.filter(Sale.created_at >= filter_date, Sale.created_at < next_day)
+            # Tanggal filter adalah hari lokal tenant
+            day = datetime.strptime(date_filter, '%Y-%m-%d').date()
         except ValueError:
             pass
     
-    if payment_filter:
-        query = query.filter_by(payment_method=payment_filter)
-    
-    sales = query.order_by(Sale.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    history = SalesHistory(current_user.tenant_id, date=day, payment_method=payment_filter or None,
+                           cashier_id=cashier_filter or None, customer=customer_filter or None,
+                           min_amount=min_amount, max_amount=max_amount)
+    # Keyset (created_at, id), bukan OFFSET: halaman lama sama cepatnya
+    sales, older, newer = history.page(after=request.args.get('after'), before=request.args.get('before'))
+    cashiers = db.session.query(User.id, User.username).filter(
+        User.tenant_id == current_user.tenant_id
+    ).order_by(User.username).all()
     
-    return render_template('sales/history.html', sales=sales, 
-                         date_filter=date_filter, payment_filter=payment_filter)
+    filters = {
+        'date': date_filter, 'payment_method': payment_filter, 'cashier': cashier_filter,
+        'customer': customer_filter, 'min_amount': min_amount, 'max_amount': max_amount
+    }
+    return render_template('sales/history.html', sales=sales, older=older, newer=newer,
+                         cashiers=cashiers, filters=filters,
+                         active_filters={k: v for k, v in filters.items() if v not in (None, '')})
+
+def _receipt_sale_id(sale_id):
+    # Id dinormalisasi supaya satu penjualan hanya punya satu kunci cache
+    try:
+        return str(uuid.UUID(sale_id))
+    except ValueError:
+        abort(404)
+
+def _receipt_artifact(sale_id, kind, mimetype, download_name=None):
+    """Artefak struk dengan ETag kuat; 304 dijawab tanpa membaca cache maupun DB"""
+    sale_id = _receipt_sale_id(sale_id)
+    tenant = current_user.tenant
+    etag = receipt_artifacts.etag(tenant, sale_id, kind)
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        meta, data = receipt_artifacts.get(tenant, sale_id, kind)
+        response = current_app.response_class(data, mimetype=mimetype)
+        if download_name:
+            response.headers['Content-Disposition'] = f'attachment; filename="{download_name.format(**meta)}"'
+    response.set_etag(etag)
+    # Penjualan yang sudah selesai tidak pernah berubah
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
 
 @bp.route('/receipt/<sale_id>')
 @login_required
 def receipt(sale_id):
-    sale = Sale.query.filter_by(id=sale_id, tenant_id=current_user.tenant_id).first_or_404()
-    return render_template('sales/receipt.html', sale=sale)
+    meta, html = receipt_artifacts.get(current_user.tenant, _receipt_sale_id(sale_id), 'html')
+    return render_template('sales/receipt.html', sale_id=meta['sale_id'],
+                         receipt_number=meta['receipt_number'], receipt_html=html.decode())
+
+@bp.route('/receipt/<sale_id>/html')
+@login_required
+def receipt_html(sale_id):
+    """Isi struk saja (untuk modal detail penjualan)"""
+    return _receipt_artifact(sale_id, 'html', 'text/html')
+
+@bp.route('/receipt/<sale_id>/escpos')
+@login_required
+def receipt_escpos(sale_id):
+    """Byte ESC/POS untuk klien yang mencetak ke printer lokal"""
+    return _receipt_artifact(sale_id, 'escpos', 'application/octet-stream', 'receipt_{receipt_number}.bin')
 
 @bp.route('/receipt/<sale_id>/print')
 @login_required
 def print_receipt(sale_id):
-    sale = Sale.query.filter_by(id=sale_id, tenant_id=current_user.tenant_id).first_or_404()
+    meta, commands = receipt_artifacts.get(current_user.tenant, _receipt_sale_id(sale_id), 'escpos')
     
     try:
         printer_service = PrinterService()
-        success = printer_service.print_receipt(sale, current_user.tenant)
+        success = printer_service.send(commands)
         
         return jsonify({
             'success': success,
@@ -236,57 +298,4 @@ def print_receipt(sale_id):
 @login_required
 def download_receipt_pdf(sale_id):
     """Download receipt sebagai PDF"""
-    sale = Sale.query.filter_by(id=sale_id, tenant_id=current_user.tenant_id).first_or_404()
-    
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    
-    # Header
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(100, 800, current_user.tenant.name)
-    p.setFont("Helvetica", 10)
-    p.drawString(100, 780, f"Receipt: {sale.receipt_number}")
-    p.drawString(100, 765, f"Date: {sale.created_at.strftime('%Y-%m-%d %H:%M')}")
-    p.drawString(100, 750, f"Cashier: {sale.user.username}")
-    
-    # Items
-    y_position = 720
-    p.drawString(100, y_position, "Item")
-    p.drawString(300, y_position, "Qty")
-    p.drawString(350, y_position, "Price")
-    p.drawString(450, y_position, "Total")
-    
-    y_position -= 20
-    for item in sale.items:
-        p.drawString(100, y_position, item.product.name[:30])
-        p.drawString(300, y_position, str(item.quantity))
-        p.drawString(350, y_position, f"${item.unit_price:.2f}")
-        p.drawString(450, y_position, f"${item.total_price:.2f}")
-        y_position -= 15
-        
-        if y_position < 100:
-            p.showPage()
-            y_position = 800
-    
-    # Totals
-    y_position -= 20
-    p.drawString(350, y_position, "Subtotal:")
-    p.drawString(450, y_position, f"${sale.total_amount - sale.tax_amount:.2f}")
-    
-    y_position -= 15
-    p.drawString(350, y_position, "Tax:")
-    p.drawString(450, y_position, f"${sale.tax_amount:.2f}")
-    
-    y_position -= 15
-    p.drawString(350, y_position, "Total:")
-    p.drawString(450, y_position, f"${sale.total_amount:.2f}")
-    
-    p.save()
-    buffer.seek(0)
-    
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=f"receipt_{sale.receipt_number}.pdf",
-        mimetype='application/pdf'
-    )
\ No newline at end of file
+    return _receipt_artifact(sale_id, 'pdf', 'application/pdf', 'receipt_{receipt_number}.pdf')
\ No newline at end of file
@@ -0,0 +1,217 @@
+import logging
+import os
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+from app import db
+from app.models import CatalogTombstone, Category, Product, Tenant
+from app.utils.catalog_file import CatalogFile, write_catalog
+
+logger = logging.getLogger(__name__)
+
+# Kolom yang dikirim ke POS, urutannya = urutan array di payload
+PRODUCT_FIELDS = ('id', 'name', 'price', 'sku', 'barcode', 'image_url', 'category_id')
+CATEGORY_FIELDS = ('id', 'name')
+
+# Perubahan kolom ini menaikkan versi katalog (stok sengaja tidak)
+VERSIONED_FIELDS = {
+    Product: ('name', 'price', 'sku', 'barcode', 'image_url', 'category_id', 'is_active'),
+    Category: ('name',),
+}
+
+
+def catalog_version(tenant_id):
+    return db.session.execute(
+        select(Tenant.catalog_version).where(Tenant.id == tenant_id)
+    ).scalar() or 0
+
+
+def catalog_etag(tenant_id, version):
+    return f'catalog-{tenant_id}-{version}'
+
+
+class CatalogSnapshot:
+    """Compact POS catalog for one tenant: all rows, or the delta since a
+    version the register already has.
+
+    Rows are arrays in ``PRODUCT_FIELDS``/``CATEGORY_FIELDS`` order. A
+    delta carries rows stamped with a newer ``catalog_version`` plus ids to
+    drop (deactivated products and tombstones). The version is read before
+    the rows, so a change committed in between is sent again next time
+    rather than missed.
+    """
+
+    def __init__(self, tenant_id):
+        self.tenant_id = tenant_id
+
+    def payload(self, since=None):
+        version = catalog_version(self.tenant_id)
+        full = not since or since > version
+        since = 0 if full else since
+        if not full and since == version:
+            products, categories, deleted = [], [], {'products': [], 'categories': []}
+        else:
+            products, inactive = self._products(since, full)
+            categories = self._categories(since)
+            deleted = self._tombstones(since) if not full else {'products': [], 'categories': []}
+            deleted['products'].extend(inactive)
+        return {
+            'version': version,
+            'full': full,
+            'fields': {'products': PRODUCT_FIELDS, 'categories': CATEGORY_FIELDS},
+            'products': products,
+            'categories': categories,
+            'deleted': deleted,
+        }
+
+    def _products(self, since, full):
+        query = db.session.query(*[getattr(Product, name) for name in PRODUCT_FIELDS], Product.is_active).filter(
+            Product.tenant_id == self.tenant_id
+        )
+        if full:
+            query = query.filter(Product.is_active == True)
+        else:
+            query = query.filter(Product.catalog_version > since)
+        rows, inactive = [], []
+        for row in query.order_by(Product.name).execution_options(yield_per=5000):
+            if row.is_active:
+                rows.append(list(row[:-1]))
+            else:
+                inactive.append(row.id)
+        return rows, inactive
+
+    def _categories(self, since):
+        query = db.session.query(*[getattr(Category, name) for name in CATEGORY_FIELDS]).filter(
+            Category.tenant_id == self.tenant_id,
+            Category.catalog_version > since
+        )
+        return [list(row) for row in query.order_by(Category.name)]
+
+    def _tombstones(self, since):
+        deleted = {'products': [], 'categories': []}
+        rows = db.session.query(CatalogTombstone.kind, CatalogTombstone.object_id).filter(
+            CatalogTombstone.tenant_id == self.tenant_id,
+            CatalogTombstone.version > since
+        )
+        for kind, object_id in rows:
+            deleted['products' if kind == CatalogTombstone.PRODUCT else 'categories'].append(object_id)
+        return deleted
+
+
+class CatalogFiles:
+    """Per-tenant catalog snapshots on disk, memory-mapped by every worker.
+
+    ``get`` compares the mapped file's version with the tenant's
+    ``catalog_version``. When it is behind, the worker maps the file on
+    disk if another worker already wrote the current version, and writes
+    it otherwise (``write_catalog`` swaps files atomically). A superseded
+    map is not closed explicitly, so a request still reading it finishes;
+    it is released when the last reference goes away.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files = {}   # tenant_id -> CatalogFile
+
+    @staticmethod
+    def path(tenant_id):
+        return os.path.join(current_app.config['CATALOG_SNAPSHOT_DIR'], f'{tenant_id}.catalog')
+
+    def get(self, tenant_id):
+        version = catalog_version(tenant_id)
+        with self._lock:
+            mapped = self._files.get(tenant_id)
+        if mapped is not None and mapped.version == version:
+            return mapped
+
+        path = self.path(tenant_id)
+        catalog = self._open(path)
+        if catalog is None or catalog.version != version:
+            started = time.perf_counter()
+            count = write_catalog(path, version, self.rows(tenant_id))
+            catalog = self._open(path)
+            logger.info(f"Wrote catalog snapshot for tenant {tenant_id} v{version}: {count} products "
+                        f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        with self._lock:
+            self._files[tenant_id] = catalog
+        return catalog
+
+    @staticmethod
+    def _open(path):
+        try:
+            return CatalogFile(path)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def rows(tenant_id):
+        query = db.session.query(
+            Product.id, Product.name, Product.sku, Product.barcode, Product.price,
+            Product.image_url, Product.category_id, Category.name.label('category_name')
+        ).outerjoin(Category, Category.id == Product.category_id).filter(
+            Product.tenant_id == tenant_id,
+            Product.is_active == True
+        ).execution_options(yield_per=5000)
+        for row in query:
+            yield row._asdict()
+
+
+catalog_files = CatalogFiles()
+
+
+def _changed(obj):
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in VERSIONED_FIELDS[type(obj)])
+
+
+@event.listens_for(Session, 'before_flush')
+def _stamp_catalog_changes(session, flush_context, instances):
+    """Stamp changed products/categories with a freshly bumped tenant
+    catalog version and leave tombstones for deleted ones.
+
+    The bump is an UPDATE on the tenant row, so concurrent catalog edits of
+    one tenant serialise until commit. Checkout holds a FOR SHARE lock on
+    the same row (``SalesRollup.tenant_timezone``), taken before it locks
+    any product row; both paths lock tenant first, then products, so a
+    product edit and a checkout wait for each other instead of deadlocking.
+
+    The first and last version bumped per tenant in the transaction are
+    kept in ``session.info['catalog_versions']`` for the product search
+    index, which pops them on commit/rollback.
+    """
+    versions = {}
+
+    def version_for(tenant_id):
+        if tenant_id not in versions:
+            connection = session.connection()
+            connection.execute(
+                update(Tenant.__table__).where(Tenant.__table__.c.id == tenant_id)
+                .values(catalog_version=Tenant.__table__.c.catalog_version + 1)
+            )
+            # Tenant baru (belum ada barisnya) tetap di versi 0: POS selalu ambil full
+            versions[tenant_id] = connection.execute(
+                select(Tenant.__table__.c.catalog_version).where(Tenant.__table__.c.id == tenant_id)
+            ).scalar() or 0
+        return versions[tenant_id]
+
+    for obj in list(session.new):
+        if isinstance(obj, (Product, Category)) and obj.tenant_id:
+            obj.catalog_version = version_for(obj.tenant_id)
+    for obj in list(session.dirty):
+        if isinstance(obj, (Product, Category)) and _changed(obj):
+            obj.catalog_version = version_for(obj.tenant_id)
+    for obj in list(session.deleted):
+        if isinstance(obj, (Product, Category)):
+            session.add(CatalogTombstone(
+                tenant_id=obj.tenant_id,
+                kind=CatalogTombstone.PRODUCT if isinstance(obj, Product) else CatalogTombstone.CATEGORY,
+                object_id=obj.id,
+                version=version_for(obj.tenant_id)
+            ))
+    if versions:
+        bumped = session.info.setdefault('catalog_versions', {})
+        for tenant_id, version in versions.items():
+            bumped[tenant_id] = (bumped.get(tenant_id, (version,))[0], version)
+        logger.debug(f"Catalog versions bumped: {versions}")
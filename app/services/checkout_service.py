@@ -0,0 +1,326 @@
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import case, insert, update
+from app.models import Sale, SaleItem, Product, db, generate_uuid, utc_now
+from app.services.stock_ledger_service import StockLedger, deferred_mode
+from app.services.rollup_service import SalesRollup
+from app.services.customer_stats_service import CustomerStats
+
+logger = logging.getLogger(__name__)
+
+
+class CheckoutError(Exception):
+    """Checkout rejected; carries the HTTP status the route should answer with"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class CheckoutLine:
+    """One cart line, resolved against the product row loaded for checkout"""
+
+    __slots__ = ('product_id', 'name', 'quantity', 'unit_price', 'total_price')
+
+    def __init__(self, product, quantity, unit_price, total_price):
+        self.product_id = product.id
+        self.name = product.name
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.total_price = total_price
+
+    def to_row(self, sale_id):
+        return {
+            'id': generate_uuid(),
+            'sale_id': sale_id,
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'unit_price': self.unit_price,
+            'total_price': self.total_price
+        }
+
+
+class CheckoutService:
+    """Set-based checkout: one IN query for the cart, one guarded UPDATE for
+    the stock, one bulk INSERT each for the sale items and their stock
+    movements, and one upsert per daily rollup table, all in the caller's
+    transaction. The statement count does not grow with the basket size."""
+
+    def __init__(self, tenant_id, user_id):
+        self.tenant_id = tenant_id
+        self.user_id = user_id
+        self.ledger = StockLedger(tenant_id, user_id)
+        # Baris sale/item yang ditulis service ini, untuk hook setelah commit
+        self.created = []
+        self.created_items = []
+
+    def parse_items(self, items):
+        """Validate cart items and merge duplicate product lines"""
+        quantities = {}
+        for item in items:
+            if not isinstance(item, dict) or 'product_id' not in item or 'quantity' not in item:
+                raise CheckoutError('Invalid item structure')
+            try:
+                quantity = int(item['quantity'])
+            except (TypeError, ValueError):
+                raise CheckoutError('Invalid item structure')
+            if quantity <= 0:
+                raise CheckoutError(f"Invalid quantity for product {item['product_id']}")
+            quantities[item['product_id']] = quantities.get(item['product_id'], 0) + quantity
+        return quantities
+
+    def load_products(self, product_ids):
+        """Load every cart product with a single IN query"""
+        products = Product.query.filter(
+            Product.tenant_id == self.tenant_id,
+            Product.id.in_(product_ids)
+        ).all()
+        return {product.id: product for product in products}
+
+    def reserve_stock(self, products, quantities):
+        """Take ``quantities`` out of stock or raise ``CheckoutError``.
+
+        In the default mode this is one guarded UPDATE for the whole cart:
+        ``stock_quantity >= :qty`` is evaluated per row inside the statement,
+        so the check and the write are atomic and two registers can never
+        oversell the same product. If fewer rows than products were updated
+        the caller rolls the transaction back, undoing the partial decrement.
+
+        In deferred ledger mode the product rows are not written at all; the
+        check runs against snapshot plus pending movements and the sale items
+        are appended to the ledger for the compactor.
+        """
+        if deferred_mode():
+            available = self.ledger.available(products)
+            for product_id in sorted(quantities):
+                if available[product_id] < quantities[product_id]:
+                    raise self.insufficient(products[product_id], available[product_id], quantities[product_id])
+            return
+
+        qty_case = case(quantities, value=Product.id)
+        result = db.session.execute(
+            update(Product)
+            .where(
+                Product.tenant_id == self.tenant_id,
+                Product.id.in_(list(quantities)),
+                Product.stock_quantity >= qty_case
+            )
+            .values(
+                stock_quantity=Product.stock_quantity - qty_case,
+                updated_at=utc_now()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == len(quantities):
+            return
+
+        for product_id in sorted(quantities):
+            product = products[product_id]
+            if product.stock_quantity < quantities[product_id]:
+                raise self.insufficient(product, product.stock_quantity, quantities[product_id])
+        raise CheckoutError('Stock changed during checkout, please try again', 409)
+
+    def insufficient(self, product, available, requested):
+        return CheckoutError(
+            f"Insufficient stock for {product.name}. "
+            f"Available: {available}, Requested: {requested}"
+        )
+
+    def build_lines(self, items, products):
+        lines = []
+        for item in items:
+            product = products[item['product_id']]
+            quantity = int(item['quantity'])
+            lines.append(CheckoutLine(
+                product,
+                quantity,
+                float(item.get('unit_price', product.price)),
+                float(item.get('total_price', quantity * product.price))
+            ))
+        return lines
+
+    def sale_row(self, data, receipt_number, created_at=None):
+        """Column values for a new ``Sale`` built from a POS payload"""
+        return {
+            'id': generate_uuid(),
+            'receipt_number': receipt_number,
+            'total_amount': float(data['total_amount']),
+            'tax_amount': float(data.get('tax_amount', 0)),
+            'discount_amount': float(data.get('discount_amount', 0)),
+            'payment_method': data['payment_method'],
+            'customer_id': data.get('customer_id'),
+            'user_id': self.user_id,
+            'tenant_id': self.tenant_id,
+            'notes': data.get('notes', ''),
+            'client_ref': data.get('client_ref'),
+            'created_at': created_at or utc_now()
+        }
+
+    def find_existing(self, client_refs):
+        """Map client idempotency keys to sales that were already recorded"""
+        if not client_refs:
+            return {}
+        sales = db.session.query(Sale.client_ref, Sale.id, Sale.receipt_number).filter(
+            Sale.tenant_id == self.tenant_id,
+            Sale.client_ref.in_(client_refs)
+        ).all()
+        return {ref: (sale_id, receipt_number) for ref, sale_id, receipt_number in sales}
+
+    def checkout(self, data, receipt_number):
+        """Create the sale for ``data`` and return ``(sale, lines)``.
+
+        Does not commit; on ``CheckoutError`` the caller must roll back.
+        """
+        items = data['items']
+        quantities = self.parse_items(items)
+
+        # Tenant dikunci (FOR SHARE) sebelum baris produk, urutan yang sama
+        # dengan edit katalog (tenant lalu produk), supaya tidak deadlock
+        rollup = SalesRollup()
+        rollup.tenant_timezone(self.tenant_id)
+
+        products = self.load_products(list(quantities))
+        for product_id in quantities:
+            if product_id not in products:
+                raise CheckoutError(f"Product {product_id} not found", 404)
+
+        self.reserve_stock(products, quantities)
+
+        row = self.sale_row(data, receipt_number)
+        sale = Sale(**row)
+        db.session.add(sale)
+        db.session.flush()
+
+        lines = self.build_lines(items, products)
+        item_rows = [line.to_row(sale.id) for line in lines]
+        db.session.execute(insert(SaleItem), item_rows)
+        self.ledger.record_sale_items(item_rows)
+
+        rollup.add_sale(row, item_rows)
+        rollup.flush()
+        stats = CustomerStats(self.tenant_id)
+        stats.add_sale(row)
+        stats.flush()
+
+        self.created.append(row)
+        self.created_items.extend(item_rows)
+        return sale, lines
+
+    def sync_batch(self, sales, next_receipt_number):
+        """Record a batch of queued offline sales in one transaction.
+
+        Every entry must carry a client generated ``client_ref``; entries
+        whose key was already recorded are reported as duplicates instead of
+        being inserted again. Products for the whole batch are loaded (and
+        locked on PostgreSQL) with one query, stock is checked in memory in
+        client order, and the accepted sales are written with one stock
+        UPDATE and two bulk INSERTs. Returns one result dict per entry, in
+        request order. Does not commit.
+        """
+        results = [None] * len(sales)
+        pending = []
+        seen = {}
+
+        for index, data in enumerate(sales):
+            client_ref = data.get('client_ref') if isinstance(data, dict) else None
+            try:
+                if not client_ref:
+                    raise CheckoutError('Missing client_ref')
+                if client_ref in seen:
+                    results[index] = seen[client_ref]
+                    continue
+                if not data.get('items'):
+                    raise CheckoutError('No items in cart')
+                for field in ('total_amount', 'payment_method'):
+                    if field not in data:
+                        raise CheckoutError(f'Missing required field: {field}')
+                quantities = self.parse_items(data['items'])
+                created_at = parse_client_timestamp(data.get('created_at'))
+                float(data['total_amount'])
+            except (CheckoutError, TypeError, ValueError) as e:
+                results[index] = {'client_ref': client_ref, 'status': 'rejected',
+                                  'error': getattr(e, 'message', str(e))}
+                continue
+            seen[client_ref] = {'client_ref': client_ref, 'status': 'duplicate'}
+            pending.append((index, data, quantities, created_at))
+
+        # Kunci tenant dulu, baru produk (lihat ``checkout``)
+        rollup = SalesRollup()
+        if pending:
+            rollup.tenant_timezone(self.tenant_id)
+        existing = self.find_existing([data['client_ref'] for _, data, _, _ in pending])
+        product_ids = {pid for _, _, quantities, _ in pending for pid in quantities}
+        products = {}
+        if product_ids:
+            products = {
+                product.id: product for product in Product.query.filter(
+                    Product.tenant_id == self.tenant_id,
+                    Product.id.in_(product_ids)
+                ).with_for_update().all()
+            }
+        remaining = self.ledger.available(products)
+
+        totals = {}
+        sale_rows = []
+        item_rows = []
+        stats = CustomerStats(self.tenant_id)
+        for index, data, quantities, created_at in pending:
+            client_ref = data['client_ref']
+            if client_ref in existing:
+                sale_id, receipt_number = existing[client_ref]
+                results[index] = {'client_ref': client_ref, 'status': 'duplicate',
+                                  'sale_id': sale_id, 'receipt_number': receipt_number}
+                seen[client_ref].update(sale_id=sale_id, receipt_number=receipt_number)
+                continue
+
+            error = None
+            for product_id, quantity in quantities.items():
+                if product_id not in products:
+                    error = f"Product {product_id} not found"
+                elif remaining[product_id] < quantity:
+                    error = self.insufficient(products[product_id], remaining[product_id], quantity).message
+                if error:
+                    break
+            if error:
+                results[index] = {'client_ref': client_ref, 'status': 'rejected', 'error': error}
+                seen[client_ref].update(status='rejected', error=error)
+                continue
+
+            for product_id, quantity in quantities.items():
+                remaining[product_id] -= quantity
+                totals[product_id] = totals.get(product_id, 0) + quantity
+
+            row = self.sale_row(data, next_receipt_number(), created_at)
+            rows = [line.to_row(row['id']) for line in self.build_lines(data['items'], products)]
+            sale_rows.append(row)
+            item_rows.extend(rows)
+            rollup.add_sale(row, rows)
+            stats.add_sale(row)
+            results[index] = {'client_ref': client_ref, 'status': 'created',
+                              'sale_id': row['id'], 'receipt_number': row['receipt_number']}
+            seen[client_ref].update(sale_id=row['id'], receipt_number=row['receipt_number'])
+
+        if sale_rows:
+            self.reserve_stock(products, totals)
+            db.session.execute(insert(Sale), sale_rows)
+            db.session.execute(insert(SaleItem), item_rows)
+            self.ledger.record_sale_items(item_rows)
+            rollup.flush()
+            stats.flush()
+            self.created.extend(sale_rows)
+            self.created_items.extend(item_rows)
+
+        return results
+
+
+def parse_client_timestamp(value):
+    """Parse the ISO timestamp a terminal recorded for an offline sale into
+    naive UTC; missing or future values fall back to the server clock"""
+    now = utc_now()
+    if not value:
+        return now
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(parsed, now)
@@ -0,0 +1,97 @@
+import logging
+import time
+from flask import current_app
+from app import cache, db
+from app.models import Customer
+from app.utils.customer_keys import name_key, phone_key, prefix_range
+from app.utils.cursors import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+
+def _row(customer):
+    return {
+        'id': customer.id,
+        'text': f"{customer.name} ({customer.phone})" if customer.phone else customer.name,
+        'name': customer.name,
+        'phone': customer.phone,
+        'email': customer.email
+    }
+
+
+class CustomerTypeahead:
+    """Customer lookup for the POS customer picker.
+
+    Text with three or more digits and no letters is a phone search on
+    ``phone_key``; anything else is a name-prefix search on ``name_key``.
+    Both are btree range scans on ``(tenant_id, key, id)`` and page by
+    keyset (the last ``(key, id)`` seen), so page 50 costs the same as page
+    one. An empty query returns the tenant's recent/frequent customers from
+    the app cache, fed by checkout.
+    """
+
+    def __init__(self, tenant_id):
+        self.tenant_id = tenant_id
+
+    def _recent_key(self):
+        return f'customers-recent:{self.tenant_id}'
+
+    def search(self, text, limit=10, cursor=None):
+        """``(rows, next_cursor)``"""
+        text = (text or '').strip()
+        if not text:
+            return self.recent(limit), None
+
+        digits = phone_key(text)
+        if digits and len(digits) >= 3 and not any(char.isalpha() for char in text):
+            column, prefix = Customer.phone_key, digits
+        else:
+            column, prefix = Customer.name_key, name_key(text)
+        low, high = prefix_range(prefix)
+        query = Customer.query.filter(
+            Customer.tenant_id == self.tenant_id,
+            column >= low,
+            column < high,
+            column.startswith(prefix, autoescape=True)
+        )
+        after = decode_cursor(cursor) if cursor else None
+        if after:
+            query = query.filter(db.tuple_(column, Customer.id) > after)
+        customers = query.order_by(column, Customer.id).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(customers) > limit:
+            customers = customers[:limit]
+            last = customers[-1]
+            next_cursor = encode_cursor(getattr(last, column.key), last.id)
+        return [_row(customer) for customer in customers], next_cursor
+
+    def recent(self, limit=10):
+        entries = cache.get(self._recent_key()) or []
+        return [entry['row'] for entry in sorted(entries, key=lambda e: e['used_at'], reverse=True)[:limit]]
+
+    def record_use(self, customer_ids):
+        """Called after checkout; keeps the ``CUSTOMER_RECENT_SIZE`` most
+        used (then most recent) customers of the tenant.
+
+        Read-modify-write on the cache: concurrent checkouts can drop an
+        update, which is fine for a suggestion list.
+        """
+        customer_ids = {customer_id for customer_id in customer_ids if customer_id}
+        if not customer_ids:
+            return
+        size = current_app.config.get('CUSTOMER_RECENT_SIZE', 20)
+        entries = {entry['row']['id']: entry for entry in cache.get(self._recent_key()) or []}
+        now = time.time()
+        for customer in Customer.query.filter(Customer.id.in_(customer_ids), Customer.tenant_id == self.tenant_id):
+            entry = entries.get(customer.id, {'uses': 0})
+            entries[customer.id] = {'row': _row(customer), 'uses': entry['uses'] + 1, 'used_at': now}
+        kept = sorted(entries.values(), key=lambda e: (e['uses'], e['used_at']), reverse=True)[:size]
+        cache.set(self._recent_key(), kept, timeout=0)
+
+    def forget(self, customer_id):
+        """Drop an edited/deleted customer from the recent list"""
+        entries = cache.get(self._recent_key()) or []
+        kept = [entry for entry in entries if entry['row']['id'] != customer_id]
+        if len(kept) != len(entries):
+            cache.set(self._recent_key(), kept, timeout=0)
@@ -0,0 +1,89 @@
+import logging
+from sqlalchemy import bindparam, case, func, select, update
+from app.models import Customer, Sale, db
+
+logger = logging.getLogger(__name__)
+
+
+class CustomerStats:
+    """Keeps the denormalized ``Customer`` purchase columns (``total_spent``,
+    ``sales_count``, ``first_sale_at``, ``last_sale_at``) in step with sales.
+
+    Checkout calls ``add_sale`` per new sale and ``flush`` once, which
+    issues one executemany UPDATE for all touched customers inside the
+    checkout transaction. Increments are relative (``col = col + :delta``),
+    so concurrent checkouts for the same customer do not overwrite each
+    other.
+    """
+
+    def __init__(self, tenant_id):
+        self.tenant_id = tenant_id
+        self.pending = {}   # customer_id -> [amount, count, first, last]
+
+    def add_sale(self, row):
+        customer_id = row.get('customer_id')
+        if not customer_id:
+            return
+        created_at = row['created_at']
+        entry = self.pending.get(customer_id)
+        if entry is None:
+            self.pending[customer_id] = [row['total_amount'], 1, created_at, created_at]
+        else:
+            entry[0] += row['total_amount']
+            entry[1] += 1
+            entry[2] = min(entry[2], created_at)
+            entry[3] = max(entry[3], created_at)
+
+    def flush(self):
+        if not self.pending:
+            return
+        table = Customer.__table__
+        statement = update(table).where(
+            table.c.id == bindparam('customer_id'),
+            table.c.tenant_id == self.tenant_id
+        ).values(
+            total_spent=table.c.total_spent + bindparam('amount'),
+            sales_count=table.c.sales_count + bindparam('count'),
+            first_sale_at=case(
+                (table.c.first_sale_at.is_(None), bindparam('first')),
+                (table.c.first_sale_at > bindparam('first'), bindparam('first')),
+                else_=table.c.first_sale_at
+            ),
+            last_sale_at=case(
+                (table.c.last_sale_at.is_(None), bindparam('last')),
+                (table.c.last_sale_at < bindparam('last'), bindparam('last')),
+                else_=table.c.last_sale_at
+            )
+        )
+        db.session.execute(statement, [
+            {'customer_id': customer_id, 'amount': amount, 'count': count, 'first': first, 'last': last}
+            for customer_id, (amount, count, first, last) in sorted(self.pending.items())
+        ])
+        self.pending = {}
+
+
+def recompute_customer_stats(tenant_id=None):
+    """Rebuild the stats columns from ``sales`` (backfill / repair).
+
+    One UPDATE with correlated aggregates per tenant; returns the number of
+    customers updated.
+    """
+    table = Customer.__table__
+    sales = Sale.__table__
+    mine = sales.c.customer_id == table.c.id
+
+    def aggregate(expression):
+        return select(expression).where(mine).scalar_subquery()
+
+    statement = update(table).values(
+        total_spent=aggregate(func.coalesce(func.sum(sales.c.total_amount), 0)),
+        sales_count=aggregate(func.count(sales.c.id)),
+        first_sale_at=aggregate(func.min(sales.c.created_at)),
+        last_sale_at=aggregate(func.max(sales.c.created_at))
+    )
+    if tenant_id:
+        statement = statement.where(table.c.tenant_id == tenant_id)
+    result = db.session.execute(statement)
+    db.session.commit()
+    logger.info(f"Recomputed stats for {result.rowcount} customers")
+    return result.rowcount
@@ -0,0 +1,167 @@
+import logging
+from datetime import datetime, timedelta
+import pytz
+from sqlalchemy import case, func
+from app.models import Sale, SaleItem, Product, User, DailySalesRollup, DailyProductRollup, db
+from app.services.timeseries_service import cached_series
+from app.services.top_sellers_service import TopSellers
+from app.utils.timezone import format_local_time, local_day_bounds_utc, now_local
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardSummary:
+    """Everything the manager dashboard shows, for one tenant.
+
+    ``payload`` bundles KPIs, the chart series, top products and recent
+    activity so a dashboard load costs one request (and one pass through
+    the tenant/session middleware) instead of four. The individual JSON
+    endpoints reuse the same methods.
+    """
+
+    def __init__(self, tenant_id, tz):
+        self.tenant_id = tenant_id
+        self.tz = tz
+        self.today = now_local().date()
+
+    def kpis(self):
+        today = db.session.get(DailySalesRollup, (self.tenant_id, self.today))
+        # Dua hitungan produk dalam satu scan
+        low_stock, total_products = db.session.query(
+            func.coalesce(func.sum(case((Product.stock_quantity <= Product.stock_alert, 1), else_=0)), 0),
+            func.count(Product.id)
+        ).filter(
+            Product.tenant_id == self.tenant_id,
+            Product.is_active == True
+        ).one()
+        return {
+            'today_revenue': float(today.revenue) if today else 0.0,
+            'today_transactions': int(today.transactions) if today else 0,
+            'low_stock_products': int(low_stock),
+            'total_products': int(total_products),
+            'unique_customers_today': self.unique_customers(self.today)
+        }
+
+    def unique_customers(self, start_day):
+        count = TopSellers().unique_customers(self.tenant_id, start_day, self.today)
+        if count is None:
+            start, _ = local_day_bounds_utc(start_day, self.tz)
+            count = db.session.query(func.count(func.distinct(Sale.customer_id))).filter(
+                Sale.tenant_id == self.tenant_id,
+                Sale.created_at >= start,
+                Sale.customer_id.isnot(None)
+            ).scalar()
+        return int(count or 0)
+
+    def series(self, granularity='day', days=7, max_points=120):
+        start_day = self.today - timedelta(days=days - 1)
+        points = cached_series(self.tenant_id, self.tz, granularity, start_day, self.today, max_points)
+        return {
+            'granularity': granularity,
+            'start': start_day.isoformat(),
+            'end': self.today.isoformat(),
+            'points': points,
+            'dates': [point['label'] for point in points],
+            'revenues': [point['revenue'] for point in points],
+            'transactions': [point['transactions'] for point in points]
+        }
+
+    def top_products(self, days=30, limit=10):
+        start_day = self.today - timedelta(days=days - 1)
+        ranked = TopSellers().top(self.tenant_id, start_day, self.today, limit)
+        if ranked is not None:
+            return self._named(ranked, start_day)
+        return self.exact_top_products(start_day, limit)
+
+    def recent_top_products(self, hours=6, limit=10):
+        """Top products over the current local hour and the ``hours - 1``
+        before it, from the hourly sketch windows (exact query as fallback)"""
+        hour = datetime.now(self.tz).replace(minute=0, second=0, microsecond=0)
+        since = (hour - timedelta(hours=hours - 1)).astimezone(pytz.utc).replace(tzinfo=None)
+        ranked = TopSellers().top_recent(self.tenant_id, self.tz, hours, limit)
+        revenue = func.sum(SaleItem.total_price)
+        query = db.session.query(
+            Product.id, Product.name, func.sum(SaleItem.quantity), revenue
+        ).join(SaleItem, SaleItem.product_id == Product.id)\
+         .join(Sale, Sale.id == SaleItem.sale_id)\
+         .filter(Sale.tenant_id == self.tenant_id, Sale.created_at >= since)\
+         .group_by(Product.id, Product.name)
+        if ranked is None:
+            rows = query.order_by(func.sum(SaleItem.quantity).desc()).limit(limit).all()
+            return [{'name': name, 'sold': int(sold), 'revenue': float(total or 0)}
+                    for _, name, sold, total in rows]
+        if not ranked:
+            return []
+        # Nama dan pendapatan hanya untuk k produk dari sketch
+        exact = {row[0]: row for row in query.filter(Product.id.in_([product_id for product_id, _ in ranked]))}
+        return [{
+            'name': exact[product_id][1],
+            'sold': quantity,
+            'revenue': float(exact[product_id][3] or 0)
+        } for product_id, quantity in ranked if product_id in exact]
+
+    def _named(self, ranked, start_day):
+        """Names and revenue for the k sketched product ids (one IN query
+        each); quantities stay the sketch's estimates"""
+        ids = [product_id for product_id, _ in ranked]
+        if not ids:
+            return []
+        names = dict(db.session.query(Product.id, Product.name).filter(
+            Product.tenant_id == self.tenant_id, Product.id.in_(ids)))
+        revenue = dict(db.session.query(
+            DailyProductRollup.product_id, func.sum(DailyProductRollup.revenue)
+        ).filter(
+            DailyProductRollup.tenant_id == self.tenant_id,
+            DailyProductRollup.day >= start_day,
+            DailyProductRollup.product_id.in_(ids)
+        ).group_by(DailyProductRollup.product_id))
+        return [{
+            'name': names[product_id],
+            'sold': quantity,
+            'revenue': float(revenue.get(product_id) or 0)
+        } for product_id, quantity in ranked if product_id in names]
+
+    def exact_top_products(self, start_day, limit=10):
+        rows = db.session.query(
+            Product.name,
+            func.sum(DailyProductRollup.quantity).label('total_sold'),
+            func.sum(DailyProductRollup.revenue).label('revenue')
+        ).join(Product, Product.id == DailyProductRollup.product_id)\
+         .filter(
+             DailyProductRollup.tenant_id == self.tenant_id,
+             DailyProductRollup.day >= start_day
+         ).group_by(Product.id, Product.name)\
+         .order_by(func.sum(DailyProductRollup.quantity).desc())\
+         .limit(limit).all()
+        return [{
+            'name': row.name,
+            'sold': int(row.total_sold),
+            'revenue': float(row.revenue)
+        } for row in rows]
+
+    def recent_activity(self, limit=10):
+        # Hanya kolom yang ditampilkan, username lewat join (tanpa N+1)
+        rows = db.session.query(
+            Sale.id, Sale.receipt_number, Sale.total_amount, Sale.payment_method,
+            Sale.created_at, User.username
+        ).outerjoin(User, User.id == Sale.user_id)\
+         .filter(Sale.tenant_id == self.tenant_id)\
+         .order_by(Sale.created_at.desc())\
+         .limit(limit).all()
+        return [{
+            'type': 'sale',
+            'sale_id': str(row.id),
+            'title': f'New Sale - {row.receipt_number}',
+            'description': f'Rp{row.total_amount:.2f} • {row.payment_method}',
+            'time': format_local_time(row.created_at),
+            'user': row.username,
+            'icon': 'bi-cart-check'
+        } for row in rows]
+
+    def payload(self, granularity='day', days=7, max_points=120, top_days=30, top_limit=5, activity_limit=10):
+        return {
+            'kpis': self.kpis(),
+            'series': self.series(granularity, days, max_points),
+            'top_products': self.top_products(top_days, top_limit),
+            'recent_activity': self.recent_activity(activity_limit)
+        }
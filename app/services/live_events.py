@@ -0,0 +1,141 @@
+import json
+import logging
+import queue
+import threading
+import time
+from flask import current_app
+from redis.exceptions import RedisError
+from app.models import DailySalesRollup, db
+from app.services.timeseries_service import invalidate_series
+from app.utils.timezone import format_local_time, now_local, utc_to_local
+
+logger = logging.getLogger(__name__)
+
+
+def channel_for(tenant_id):
+    return f'pos:live:{tenant_id}'
+
+
+class LiveEventBus:
+    """Fan-out of per-tenant dashboard events.
+
+    With Redis available every worker publishes to and subscribes on a
+    ``pos:live:<tenant>`` pub/sub channel, so a sale committed on one worker
+    reaches dashboards connected to any other. Without Redis, events only
+    reach subscribers in the same process (enough for a single worker or
+    the development server).
+
+    Every open stream holds a worker thread, so ``open_stream`` caps them
+    per process and the rest of the threads stay free for normal requests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = {}
+        self._streams = 0
+
+    def open_stream(self, limit):
+        """Reserve one of ``limit`` concurrent streams; False when full"""
+        with self._lock:
+            if self._streams >= limit:
+                return False
+            self._streams += 1
+            return True
+
+    def close_stream(self):
+        with self._lock:
+            self._streams -= 1
+
+    def publish(self, tenant_id, event, data):
+        message = json.dumps({'event': event, 'data': data}, default=str)
+        redis_client = current_app.redis
+        if redis_client is not None:
+            try:
+                redis_client.publish(channel_for(tenant_id), message)
+                return
+            except RedisError as e:
+                logger.warning(f"Live event publish failed, delivering locally: {e}")
+        with self._lock:
+            subscribers = list(self._local.get(tenant_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # Klien lambat: buang event, dashboard akan resync saat reconnect
+                pass
+
+    def subscribe(self, tenant_id, redis_client=None, heartbeat=15, lifetime=300):
+        """Yield JSON messages for ``tenant_id``, or ``None`` every
+        ``heartbeat`` seconds without one; ends after ``lifetime`` seconds"""
+        deadline = time.monotonic() + lifetime
+        if redis_client is not None:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(channel_for(tenant_id))
+                while time.monotonic() < deadline:
+                    message = pubsub.get_message(timeout=heartbeat)
+                    if message is None:
+                        yield None
+                    elif message['type'] == 'message':
+                        data = message['data']
+                        yield data.decode() if isinstance(data, bytes) else data
+            finally:
+                pubsub.close()
+            return
+
+        subscriber = queue.Queue(maxsize=100)
+        with self._lock:
+            self._local.setdefault(tenant_id, set()).add(subscriber)
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    yield subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield None
+        finally:
+            with self._lock:
+                self._local.get(tenant_id, set()).discard(subscriber)
+
+
+live_events = LiveEventBus()
+
+
+def publish_sales(tenant_id, sales):
+    """Announce committed sales (dicts or ``Sale`` rows) with the tenant's
+    updated totals for today. Call after commit; never raises, a dashboard
+    that misses an event catches up on its next reload."""
+    if not sales:
+        return
+    try:
+        # Series yang mencakup hari ini harus dihitung ulang; penjualan offline
+        # yang tanggalnya sudah lewat juga mengubah rentang yang sudah tutup
+        day = now_local().date()
+        backdated = any(utc_to_local(_get(sale)('created_at')).date() < day for sale in sales)
+        invalidate_series(tenant_id, history=backdated)
+        today = db.session.get(DailySalesRollup, (tenant_id, day))
+        live_events.publish(tenant_id, 'sale', {
+            'sales': [_sale_event(sale) for sale in sales],
+            'today': {
+                'revenue': float(today.revenue) if today else 0.0,
+                'transactions': int(today.transactions) if today else 0
+            }
+        })
+    except Exception as e:
+        logger.warning(f"Could not publish live sale event: {e}")
+
+
+def _get(sale):
+    return sale.get if isinstance(sale, dict) else (lambda name: getattr(sale, name))
+
+
+def _sale_event(sale):
+    get = _get(sale)
+    created_at = get('created_at')
+    return {
+        'id': get('id'),
+        'receipt_number': get('receipt_number'),
+        'total_amount': float(get('total_amount') or 0),
+        'payment_method': get('payment_method'),
+        'local_time': utc_to_local(created_at).replace(tzinfo=None).isoformat(),
+        'time': format_local_time(created_at)
+    }
@@ -0,0 +1,126 @@
+import logging
+from flask import current_app
+from app import cache, db
+from app.models import Tenant, User
+from app.services.tenant_cache import TenantSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class Principal:
+    """What ``current_user`` is on an ordinary request: a slotted snapshot of
+    the signed-in user and their tenant, rebuilt from the app cache.
+
+    Exposes what routes and templates read (``id``, ``role``, ``tenant_id``,
+    ``tenant.name`` ...) without touching the database. Anything else, and
+    any write, goes through ``model()``, which loads the real ``User`` row
+    on first use in the request.
+    """
+
+    __slots__ = ('id', 'username', 'role', 'tenant_id', 'is_superadmin', 'user_active', 'tenant', '_model')
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, username, role, tenant_id, is_superadmin, user_active, tenant):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.tenant_id = tenant_id
+        self.is_superadmin = bool(is_superadmin)
+        self.user_active = user_active is not False
+        self.tenant = tenant
+        self._model = None
+
+    @classmethod
+    def from_model(cls, user, tenant):
+        return cls(user.id, user.username, user.role, user.tenant_id, user.is_superadmin, user.is_active,
+                   TenantSnapshot.from_model(tenant) if tenant is not None else None)
+
+    @classmethod
+    def from_dict(cls, data):
+        tenant = data.pop('tenant')
+        return cls(tenant=TenantSnapshot(**tenant) if tenant else None, **data)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'role': self.role,
+            'tenant_id': self.tenant_id,
+            'is_superadmin': self.is_superadmin,
+            'user_active': self.user_active,
+            'tenant': self.tenant.to_dict() if self.tenant else None
+        }
+
+    @property
+    def is_active(self):
+        # Flask-Login: akun nonaktif tidak dianggap login
+        return self.user_active
+
+    def get_id(self):
+        return self.id
+
+    def is_admin(self):
+        return self.role == 'admin'
+
+    def is_manager(self):
+        return self.role in ['admin', 'manager']
+
+    def is_cashier(self):
+        return self.role in ['admin', 'manager', 'cashier']
+
+    def model(self):
+        """The ``User`` row, loaded once per request when actually needed"""
+        if self._model is None:
+            self._model = db.session.get(User, self.id)
+        return self._model
+
+    def __getattr__(self, name):
+        # Kolom yang tidak ada di snapshot (email, last_login, ...)
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.model(), name)
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<Principal {self.username} tenant={self.tenant_id}>'
+
+
+def _key(user_id):
+    return f'principal:{user_id}'
+
+
+def load_principal(user_id):
+    """``user_loader``: one cache read on a warm path, two primary-key
+    lookups (user, tenant) after expiry or invalidation"""
+    data = cache.get(_key(user_id))
+    if data is not None:
+        return Principal.from_dict(dict(data))
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    tenant = db.session.get(Tenant, user.tenant_id) if user.tenant_id else None
+    principal = Principal.from_model(user, tenant)
+    principal._model = user
+    cache.set(_key(user_id), principal.to_dict(), timeout=current_app.config.get('PRINCIPAL_CACHE_TTL', 300))
+    return principal
+
+
+def invalidate_principal(*user_ids):
+    """Call after editing or deleting users"""
+    cache.delete_many(*[_key(user_id) for user_id in user_ids])
+
+
+def invalidate_tenant_principals(tenant_id):
+    """Call after editing a tenant: every user of it carries a tenant copy"""
+    user_ids = [user_id for user_id, in db.session.query(User.id).filter(User.tenant_id == tenant_id)]
+    if user_ids:
+        invalidate_principal(*user_ids)
+    logger.debug(f"Invalidated {len(user_ids)} cached principals of tenant {tenant_id}")
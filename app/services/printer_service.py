@@ -11,6 +11,10 @@ class PrinterService:
     
     def print_receipt(self, receipt_data):
         """Print receipt to network thermal printer"""
+        return self.send(self.format_receipt(receipt_data))
+    
+    def send(self, esc_pos_commands):
+        """Send pre-rendered ESC/POS bytes to the network thermal printer"""
         try:
             if not self.printer_ip:
                 logger.error("Printer IP not configured")
@@ -21,11 +25,8 @@ class PrinterService:
             sock.settimeout(10)
             sock.connect((self.printer_ip, self.printer_port))
             
-            # ESC/POS commands for receipt formatting
-            esc_pos_commands = self._format_receipt(receipt_data)
-            
             # Send commands to printer
-            sock.send(esc_pos_commands)
+            sock.sendall(esc_pos_commands)
             sock.close()
             
             logger.info("Receipt printed successfully")
@@ -35,7 +36,7 @@ class PrinterService:
             logger.error(f"Failed to print receipt: {str(e)}")
             return False
     
-    def _format_receipt(self, receipt_data):
+    def format_receipt(self, receipt_data):
         """Format receipt data into ESC/POS commands"""
         # Initialize with reset command
         commands = b'\x1B@'
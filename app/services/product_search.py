@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Product
+from app.services.catalog_service import catalog_files, catalog_version
+from app.utils.search_index import ProductEntry, SearchIndex
+
+logger = logging.getLogger(__name__)
+
+INDEXED_FIELDS = ('name', 'sku', 'barcode', 'price', 'image_url', 'category_id', 'is_active', 'tenant_id')
+
+
+def _entry(product):
+    return ProductEntry(product.id, product.name, product.sku, product.barcode,
+                        float(product.price or 0), product.image_url, product.category_id)
+
+
+class ProductSearch:
+    """Per-tenant ``SearchIndex`` registry for POS product lookups.
+
+    Each worker builds a tenant's index lazily on first search and keys it
+    on the tenant's ``catalog_version``, which every catalog edit bumps in
+    the database. Product changes committed through the ORM are applied to
+    this worker's index in an ``after_commit`` hook; other workers see the
+    new version on their next search and rebuild.
+    Stock is deliberately not indexed (it changes on every checkout): the
+    routes read it for the handful of hits with one primary-key query.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}   # tenant_id -> (version, built_at, SearchIndex)
+
+    def build(self, tenant_id):
+        # Dibaca dari snapshot katalog yang di-mmap, bukan scan tabel products;
+        # hit didekode dari snapshot yang sama, bukan disimpan per worker
+        return SearchIndex(catalog=catalog_files.get(tenant_id))
+
+    def index_for(self, tenant_id):
+        version = catalog_version(tenant_id)
+        max_age = current_app.config.get('PRODUCT_INDEX_MAX_AGE', 3600)
+        with self._lock:
+            cached = self._indexes.get(tenant_id)
+        if cached and cached[0] == version and time.monotonic() - cached[1] < max_age:
+            return cached[2]
+
+        started = time.perf_counter()
+        index = self.build(tenant_id)
+        with self._lock:
+            self._indexes[tenant_id] = (version, time.monotonic(), index)
+        logger.info(f"Built product index for tenant {tenant_id}: {len(index)} products "
+                    f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return index
+
+    def search(self, tenant_id, text, limit=50, category_id=None):
+        return self.index_for(tenant_id).search(text, limit, category_id)
+
+    @staticmethod
+    def payload(entries):
+        """JSON rows for the POS: index entries plus live stock (one PK query)"""
+        if not entries:
+            return []
+        stock = dict(db.session.query(Product.id, Product.stock_quantity).filter(
+            Product.id.in_({entry.id for entry in entries})))
+        return [{
+            'id': entry.id,
+            'name': entry.name,
+            'price': entry.price,
+            'stock_quantity': stock.get(entry.id, 0),
+            'image_url': entry.image_url,
+            'sku': entry.sku,
+            'barcode': entry.barcode
+        } for entry in entries if entry.id in stock]
+
+    def search_payload(self, tenant_id, text, limit=50, category_id=None):
+        return self.payload(self.search(tenant_id, text, limit, category_id))
+
+    def resolve(self, tenant_id, codes):
+        """``{code: ProductEntry}`` for scanned barcodes/SKUs, exact match only.
+
+        Served from the shared catalog snapshot's code table; codes it does
+        not know are looked up once by equality on the ``(tenant_id,
+        barcode)`` unique index and ``sku``, so the database stays the
+        source of truth.
+        """
+        catalog = catalog_files.get(tenant_id)
+        found, missing = {}, []
+        for code in codes:
+            number = catalog.lookup(code)
+            if number is not None:
+                found[code] = ProductEntry.from_record(catalog.record(number))
+            else:
+                missing.append(code)
+        if missing:
+            rows = db.session.query(
+                Product.id, Product.name, Product.sku, Product.barcode,
+                Product.price, Product.image_url, Product.category_id
+            ).filter(
+                Product.tenant_id == tenant_id,
+                Product.is_active == True,
+                db.or_(Product.barcode.in_(missing), Product.sku.in_(missing))
+            ).all()
+            by_code = {}
+            for row in rows:
+                by_code.setdefault(row.sku, _entry(row))
+            for row in rows:
+                by_code[row.barcode] = _entry(row)  # barcode menang atas SKU
+            for code in missing:
+                if code in by_code:
+                    found[code] = by_code[code]
+        return found
+
+    def browse_payload(self, tenant_id, limit=50, category_id=None):
+        """First ``limit`` products by name (no search text), from the snapshot"""
+        entries = []
+        for record in catalog_files.get(tenant_id).records():
+            if not category_id or record['category_id'] == category_id:
+                entries.append(ProductEntry.from_record(record))
+                if len(entries) >= limit:
+                    break
+        return self.payload(entries)
+
+    def apply(self, tenant_id, changes, versions):
+        """Apply committed ``{product_id: ProductEntry or None}`` changes to
+        this worker's index. ``versions`` is the first and last catalog
+        version the transaction bumped; the index is only patched when it
+        was built at the version just before them"""
+        first, version = versions
+        with self._lock:
+            cached = self._indexes.get(tenant_id)
+            if cached is None:
+                return
+            if cached[0] != first - 1:
+                # Index lokal sudah tertinggal perubahan worker lain: bangun ulang nanti
+                del self._indexes[tenant_id]
+                return
+            # Salinan: thread lain mungkin sedang membaca index yang lama
+            index = cached[2].copy()
+            for product_id, entry in changes.items():
+                if entry is None:
+                    index.remove(product_id)
+                else:
+                    index.add(entry)
+            self._indexes[tenant_id] = (version, cached[1], index)
+
+
+product_search = ProductSearch()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_product_changes(session, flush_context):
+    changes = session.info.setdefault('product_index_changes', {})
+    for product in session.new:
+        if isinstance(product, Product):
+            changes.setdefault(product.tenant_id, {})[product.id] = _entry(product) if product.is_active else None
+    for product in session.dirty:
+        if isinstance(product, Product):
+            state = inspect(product)
+            if any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS):
+                changes.setdefault(product.tenant_id, {})[product.id] = _entry(product) if product.is_active else None
+    for product in session.deleted:
+        if isinstance(product, Product):
+            changes.setdefault(product.tenant_id, {})[product.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_product_changes(session):
+    changes = session.info.pop('product_index_changes', None)
+    versions = session.info.pop('catalog_versions', {})
+    if not changes:
+        return
+    try:
+        for tenant_id, tenant_changes in changes.items():
+            if tenant_id in versions:
+                product_search.apply(tenant_id, tenant_changes, versions[tenant_id])
+    except Exception as e:
+        # Index lokal tetap basi sampai versi berikutnya / PRODUCT_INDEX_MAX_AGE
+        logger.warning(f"Could not update product search index: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_product_changes(session):
+    session.info.pop('product_index_changes', None)
+    session.info.pop('catalog_versions', None)
@@ -0,0 +1,237 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+from flask import current_app, render_template
+from redis.exceptions import RedisError
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from app.services.printer_service import PrinterService
+from app.services.receipt_service import ReceiptSerializer
+from app.services.sales_history_service import load_receipt
+from app.utils.timezone import format_local_datetime
+
+logger = logging.getLogger(__name__)
+
+# Naikkan jika template/format struk berubah: semua artefak lama jadi tidak terpakai
+RECEIPT_VERSION = 1
+
+KINDS = ('html', 'pdf', 'escpos')
+
+
+def _tenant_digest(tenant):
+    # Header struk memakai data tenant; kalau berubah, artefak lama tidak cocok lagi
+    fields = (tenant.id, tenant.name, tenant.address, tenant.phone, tenant.timezone)
+    return hashlib.sha1(json.dumps(fields, default=str).encode()).hexdigest()[:12]
+
+
+def receipt_pdf(sale, lines, tenant_name):
+    """Receipt PDF bytes; ``invariant`` keeps them identical across rebuilds"""
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+
+    # Header
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(100, 800, tenant_name)
+    p.setFont("Helvetica", 10)
+    p.drawString(100, 780, f"Receipt: {sale.receipt_number}")
+    p.drawString(100, 765, f"Date: {format_local_datetime(sale.created_at, '%Y-%m-%d %H:%M')}")
+    p.drawString(100, 750, f"Cashier: {sale.user.username if sale.user else '-'}")
+
+    # Items
+    y_position = 720
+    p.drawString(100, y_position, "Item")
+    p.drawString(300, y_position, "Qty")
+    p.drawString(350, y_position, "Price")
+    p.drawString(450, y_position, "Total")
+
+    y_position -= 20
+    for item in lines:
+        p.drawString(100, y_position, item.name[:30])
+        p.drawString(300, y_position, str(item.quantity))
+        p.drawString(350, y_position, f"${item.unit_price:.2f}")
+        p.drawString(450, y_position, f"${item.total_price:.2f}")
+        y_position -= 15
+
+        if y_position < 100:
+            p.showPage()
+            y_position = 800
+
+    # Totals
+    y_position -= 20
+    p.drawString(350, y_position, "Subtotal:")
+    p.drawString(450, y_position, f"${sale.total_amount - sale.tax_amount:.2f}")
+
+    y_position -= 15
+    p.drawString(350, y_position, "Tax:")
+    p.drawString(450, y_position, f"${sale.tax_amount:.2f}")
+
+    y_position -= 15
+    p.drawString(350, y_position, "Total:")
+    p.drawString(450, y_position, f"${sale.total_amount:.2f}")
+
+    p.save()
+    return buffer.getvalue()
+
+
+class _RedisStore:
+    """One hash per receipt; eviction is Redis' own LRU (``maxmemory-policy``)
+    with a TTL as the backstop"""
+
+    def __init__(self, client, ttl):
+        self.client = client
+        self.ttl = ttl
+
+    def get(self, key, kind):
+        meta, data = self.client.hmget(key, 'meta', kind)
+        if meta is None or data is None:
+            return None
+        return json.loads(meta), data
+
+    def put(self, key, artifacts):
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping=artifacts)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+
+class _DiskStore:
+    """One file per artifact under ``directory``. Reads bump the mtime, and
+    every ``check_every`` writes the oldest files are removed until the
+    directory is back under ``max_bytes`` (approximate LRU, shared by every
+    worker on the host)."""
+
+    def __init__(self, directory, max_bytes, check_every=64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.check_every = check_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key, kind):
+        return os.path.join(self.directory, f'{key}.{kind}')
+
+    def get(self, key, kind):
+        try:
+            with open(self._path(key, 'meta'), 'rb') as f:
+                meta = json.loads(f.read())
+            with open(self._path(key, kind), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(self._path(key, kind))
+        except OSError:
+            pass
+        return meta, data
+
+    def put(self, key, artifacts):
+        os.makedirs(self.directory, exist_ok=True)
+        # meta ditulis terakhir: kalau meta ada, artefaknya lengkap
+        for kind in sorted(artifacts, key=lambda k: k == 'meta'):
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.receipt-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(artifacts[kind])
+            os.replace(temp_path, self._path(key, kind))
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % self.check_every == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.8
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        logger.info(f"Evicted {removed} receipt artifacts")
+
+
+class ReceiptArtifacts:
+    """Rendered receipts (HTML fragment, PDF, ESC/POS bytes) of completed sales.
+
+    A sale never changes after checkout, so its artifacts are built once
+    (one ``load_receipt`` query, all three formats) and stored under a key
+    made of the receipt version, the tenant header digest and the sale id.
+    Later views, downloads and reprints are served from the store without
+    touching the database. The store is Redis when available, otherwise
+    a local directory with LRU eviction.
+
+    ETags are derived from the key alone, so a conditional request is
+    answered with 304 before the store is even read.
+    """
+
+    def __init__(self):
+        self._disk = None
+
+    def _store(self):
+        redis_client = current_app.redis
+        if redis_client is not None:
+            return _RedisStore(redis_client, current_app.config.get('RECEIPT_CACHE_TTL', 30 * 86400))
+        if self._disk is None:
+            self._disk = _DiskStore(current_app.config.get('RECEIPT_CACHE_DIR', '/tmp/pos-receipts'),
+                                    current_app.config.get('RECEIPT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+        return self._disk
+
+    def key(self, tenant, sale_id):
+        return f'receipt:{RECEIPT_VERSION}:{_tenant_digest(tenant)}:{sale_id}'
+
+    def etag(self, tenant, sale_id, kind):
+        return hashlib.sha1(f'{self.key(tenant, sale_id)}:{kind}'.encode()).hexdigest()[:20]
+
+    def get(self, tenant, sale_id, kind):
+        """``(meta, bytes)`` for ``kind``; builds and stores on a miss (404 if
+        the sale is not the tenant's)"""
+        key = self.key(tenant, sale_id)
+        store = self._store()
+        try:
+            found = store.get(key, kind)
+        except (RedisError, OSError) as e:
+            logger.warning(f"Receipt cache read failed: {e}")
+            found = None
+        if found is not None:
+            return found
+
+        meta, artifacts = self._build(tenant, sale_id)
+        try:
+            store.put(key, dict(artifacts, meta=json.dumps(meta).encode()))
+        except (RedisError, OSError) as e:
+            logger.warning(f"Receipt cache write failed: {e}")
+        return meta, artifacts[kind]
+
+    def _build(self, tenant, sale_id):
+        sale, lines = load_receipt(tenant.id, sale_id)
+        cashier_name = sale.user.username if sale.user else None
+        meta = {'sale_id': sale.id, 'tenant_id': sale.tenant_id, 'receipt_number': sale.receipt_number}
+        html = render_template('sales/_receipt.html', sale=sale, lines=lines, tenant=tenant,
+                               cashier_name=cashier_name,
+                               customer_name=sale.customer.name if sale.customer else None)
+        receipt_data = ReceiptSerializer(tenant, cashier_name).serialize(sale, lines)
+        return meta, {
+            'html': html.encode(),
+            'pdf': receipt_pdf(sale, lines, tenant.name),
+            'escpos': PrinterService().format_receipt(receipt_data)
+        }
+
+
+receipt_artifacts = ReceiptArtifacts()
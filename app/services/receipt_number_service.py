@@ -0,0 +1,74 @@
+import logging
+import os
+import threading
+from flask import current_app
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app.models import ReceiptSequence, db
+from app.utils.timezone import now_local
+
+logger = logging.getLogger(__name__)
+
+
+class ReceiptNumberAllocator:
+    """Hi-lo allocator for per-tenant, per-day sequential receipt numbers.
+
+    Each worker process reserves a block of ``RECEIPT_BLOCK_SIZE`` numbers at
+    a time from ``receipt_sequences`` in its own short transaction, then hands
+    them out from memory. Numbers are ordered within a worker and unique
+    across workers; a block left unused when a worker restarts leaves a gap,
+    which is harmless for receipts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = {}
+        self._pid = os.getpid()
+
+    def _reserve_block(self, tenant_id, day, size):
+        """Atomically advance the high-water mark; returns ``(first, limit)``"""
+        table = ReceiptSequence.__table__
+        key = (table.c.tenant_id == tenant_id) & (table.c.day == day)
+        for _ in range(2):
+            try:
+                with db.engine.begin() as conn:
+                    result = conn.execute(
+                        update(table).where(key).values(next_value=table.c.next_value + size)
+                    )
+                    if result.rowcount == 1:
+                        # Row is write-locked by the UPDATE until this commits
+                        limit = conn.execute(select(table.c.next_value).where(key)).scalar_one()
+                        return limit - size, limit
+                    conn.execute(insert(table).values(tenant_id=tenant_id, day=day, next_value=1 + size))
+                    return 1, 1 + size
+            except IntegrityError:
+                # Another worker created today's row first; retry the UPDATE
+                continue
+        raise RuntimeError(f'Could not allocate receipt numbers for tenant {tenant_id}')
+
+    def next_value(self, tenant_id, day):
+        size = current_app.config.get('RECEIPT_BLOCK_SIZE', 50)
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked (e.g. gunicorn --preload): never reuse the parent's blocks
+                self._blocks = {}
+                self._pid = os.getpid()
+
+            # Blocks from previous days are never needed again
+            for stale in [k for k in self._blocks if k[0] == tenant_id and k[1] != day]:
+                del self._blocks[stale]
+
+            current, limit = self._blocks.get((tenant_id, day), (0, 0))
+            if current >= limit:
+                current, limit = self._reserve_block(tenant_id, day, size)
+                logger.debug(f"Reserved receipt block {current}-{limit - 1} for tenant {tenant_id} on {day}")
+            self._blocks[(tenant_id, day)] = (current + 1, limit)
+            return current
+
+    def next_receipt_number(self, tenant_id):
+        """Return e.g. ``RCP-20261017-00042`` using the local business day"""
+        day = now_local().strftime('%Y%m%d')
+        return f"RCP-{day}-{self.next_value(tenant_id, day):05d}"
+
+
+receipt_numbers = ReceiptNumberAllocator()
@@ -0,0 +1,45 @@
+class ReceiptSerializer:
+    """Build the receipt payload sent to the POS and the thermal printer.
+
+    Works from plain values only (the sale row and its lines), so callers that
+    already hold the checkout lines in memory never reload ``sale.items`` or
+    lazy-load each product name.
+    """
+
+    def __init__(self, tenant, cashier_name):
+        self.company_name = tenant.name if tenant else 'T-POS ENTERPRISE'
+        self.store_name = getattr(tenant, 'store_name', 'Main Store')
+        self.store_address = getattr(tenant, 'address', '')
+        self.store_phone = getattr(tenant, 'phone', '')
+        self.cashier_name = cashier_name
+
+    def serialize_lines(self, lines):
+        return [
+            {
+                'name': line.name,
+                'quantity': line.quantity,
+                'price': float(line.unit_price),
+                'total': float(line.total_price)
+            } for line in lines
+        ]
+
+    def serialize(self, sale, lines, amount_paid=None, change=0):
+        """``lines`` is any iterable of objects with ``name``, ``quantity``,
+        ``unit_price`` and ``total_price`` attributes."""
+        return {
+            'company_name': self.company_name,
+            'store_name': self.store_name,
+            'store_address': self.store_address,
+            'store_phone': self.store_phone,
+            'receipt_number': sale.receipt_number,
+            'date': sale.created_at.strftime('%Y-%m-%d %H:%M'),
+            'cashier': self.cashier_name,
+            'items': self.serialize_lines(lines),
+            'subtotal': float(sale.total_amount - sale.tax_amount + sale.discount_amount),
+            'tax': float(sale.tax_amount),
+            'discount': float(sale.discount_amount),
+            'grand_total': float(sale.total_amount),
+            'payment_method': sale.payment_method.upper(),
+            'amount_paid': float(amount_paid if amount_paid is not None else sale.total_amount),
+            'change': float(change)
+        }
@@ -0,0 +1,375 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import openpyxl
+import pytz
+from flask import current_app
+from app import cache
+from app.models import DailyPaymentRollup, DailyProductRollup, DailySalesRollup, Product, Sale, SaleItem, db
+from app.services.sales_history_service import SalesHistory
+from app.utils.pdf_report import LAYOUT_VERSION, render_sales_report, write_rows
+
+logger = logging.getLogger(__name__)
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Sheet yang bisa dipilih, dalam urutan di workbook
+EXCEL_SHEETS = {
+    'sales': 'Sales',
+    'items': 'Line Items',
+    'products': 'Product Summary',
+}
+
+
+class ExcelExport:
+    """Sales export for one tenant and local day range, in constant memory.
+
+    The workbook is write-only: every sheet is fed from a ``yield_per``
+    query and openpyxl flushes rows to disk as they are appended, so
+    neither the ORM objects nor the cells of a large export are held at
+    once. Customer names and item counts come joined into the sales query
+    (no per-row lazy loads).
+    """
+
+    def __init__(self, tenant_id, tz, start=None, end=None, sheets=('sales',), batch=1000):
+        self.tenant_id = tenant_id
+        self.tz = tz
+        self.start = start
+        self.end = end
+        self.sheets = [sheet for sheet in EXCEL_SHEETS if sheet in sheets] or ['sales']
+        self.batch = batch
+
+    def filename(self):
+        if self.start or self.end:
+            period = f"{self.start or 'awal'}_{self.end or 'akhir'}".replace('-', '')
+        else:
+            period = 'semua'
+        return f"sales_report_{period}.xlsx"
+
+    def estimated_rows(self):
+        """Rough row count from the daily rollups, to decide sync vs job"""
+        query = db.session.query(
+            db.func.sum(DailySalesRollup.transactions),
+            db.func.sum(DailySalesRollup.items_sold)
+        ).filter(DailySalesRollup.tenant_id == self.tenant_id)
+        if self.start:
+            query = query.filter(DailySalesRollup.day >= self.start)
+        if self.end:
+            query = query.filter(DailySalesRollup.day <= self.end)
+        transactions, items_sold = query.one()
+        rows = int(transactions or 0)
+        if 'items' in self.sheets:
+            rows += int(items_sold or 0)
+        return rows
+
+    def _local(self, value):
+        return pytz.utc.localize(value).astimezone(self.tz).strftime('%Y-%m-%d %H:%M') if value else ''
+
+    def _history(self):
+        return SalesHistory(self.tenant_id, start=self.start, end=self.end, tz=self.tz)
+
+    def _sales_rows(self):
+        yield ['Receipt No', 'Date', 'Customer', 'Items', 'Total Amount', 'Payment Method', 'Cashier']
+        for sale in self._history().stream(self.batch):
+            yield [sale.receipt_number, self._local(sale.created_at), sale.customer_name or 'Walk-in',
+                   sale.item_count, sale.total_amount, sale.payment_method, sale.cashier_name]
+
+    def _item_rows(self):
+        yield ['Receipt No', 'Date', 'Product', 'SKU', 'Quantity', 'Unit Price', 'Total']
+        # Filter penjualan yang sama dengan sheet Sales
+        query = self._history().query().with_entities(
+            Sale.receipt_number, Sale.created_at, Product.name, Product.sku,
+            SaleItem.quantity, SaleItem.unit_price, SaleItem.total_price
+        ).join(SaleItem, SaleItem.sale_id == Sale.id).join(
+            Product, Product.id == SaleItem.product_id
+        ).order_by(Sale.created_at.desc(), Sale.id.desc()).execution_options(yield_per=self.batch)
+        for row in query:
+            yield [row.receipt_number, self._local(row.created_at), row.name, row.sku,
+                   row.quantity, row.unit_price, row.total_price]
+
+    def _product_rows(self):
+        yield ['Product', 'SKU', 'Quantity Sold', 'Revenue']
+        quantity = db.func.sum(DailyProductRollup.quantity)
+        revenue = db.func.sum(DailyProductRollup.revenue)
+        query = db.session.query(Product.name, Product.sku, quantity, revenue).select_from(
+            DailyProductRollup
+        ).join(Product, Product.id == DailyProductRollup.product_id).filter(
+            DailyProductRollup.tenant_id == self.tenant_id
+        )
+        if self.start:
+            query = query.filter(DailyProductRollup.day >= self.start)
+        if self.end:
+            query = query.filter(DailyProductRollup.day <= self.end)
+        for name, sku, sold, total in query.group_by(Product.id, Product.name, Product.sku).order_by(revenue.desc()):
+            yield [name, sku, int(sold or 0), float(total or 0)]
+
+    def write(self, target):
+        """Write the workbook to ``target`` (path or binary file object)"""
+        workbook = openpyxl.Workbook(write_only=True)
+        rows = {'sales': self._sales_rows, 'items': self._item_rows, 'products': self._product_rows}
+        for sheet in self.sheets:
+            worksheet = workbook.create_sheet(EXCEL_SHEETS[sheet])
+            for row in rows[sheet]():
+                worksheet.append(row)
+        workbook.save(target)
+
+    def save(self, path):
+        """``write`` to a temp file next to ``path`` and move it into place"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.export-', suffix='.xlsx')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self.write(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+
+class PdfRenderPool:
+    """Process pool for CPU-bound PDF rendering, created lazily per worker.
+
+    Processes are spawned rather than forked: the web worker has threads
+    (and possibly open connections) that must not be copied into children.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def render(self, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=current_app.config.get('PDF_RENDER_PROCESSES', 2),
+                    mp_context=multiprocessing.get_context('spawn'))
+            executor = self._executor
+        try:
+            return executor.submit(render_sales_report, *args).result()
+        except BrokenProcessPool:
+            # Proses anak mati (OOM dll.): pool dibuat ulang pada job berikutnya
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+
+
+pdf_pool = PdfRenderPool()
+
+
+class PdfReport:
+    """Full-range sales report PDF for one tenant and local day range.
+
+    This process only queries: summary figures from the daily rollups and
+    the sales rows (streamed, spooled to a JSON-lines file). Layout and
+    rendering happen in ``pdf_pool``. The finished file is cached under
+    ``EXPORT_DIR/pdf`` by tenant, range and data version, where the data
+    version is the range's rollup totals: any sale added to the range
+    changes it, so a cached file is served only while it is still exact.
+    """
+
+    def __init__(self, tenant_id, tz, start=None, end=None, tenant_name='', batch=1000):
+        self.tenant_id = tenant_id
+        self.tz = tz
+        self.start = start
+        self.end = end
+        self.tenant_name = tenant_name
+        self.batch = batch
+
+    def period(self):
+        return f"{self.start or 'awal'} s/d {self.end or 'sekarang'}"
+
+    def filename(self):
+        if self.start or self.end:
+            return f"sales_report_{self.start or 'awal'}_{self.end or 'akhir'}.pdf".replace('-', '')
+        return 'sales_report_semua.pdf'
+
+    def _in_range(self, query, day_column):
+        if self.start:
+            query = query.filter(day_column >= self.start)
+        if self.end:
+            query = query.filter(day_column <= self.end)
+        return query
+
+    def totals(self):
+        return self._in_range(db.session.query(
+            db.func.coalesce(db.func.sum(DailySalesRollup.transactions), 0),
+            db.func.coalesce(db.func.sum(DailySalesRollup.revenue), 0),
+            db.func.coalesce(db.func.sum(DailySalesRollup.tax_amount), 0),
+            db.func.coalesce(db.func.sum(DailySalesRollup.discount_amount), 0),
+            db.func.coalesce(db.func.sum(DailySalesRollup.items_sold), 0)
+        ).filter(DailySalesRollup.tenant_id == self.tenant_id), DailySalesRollup.day).one()
+
+    def cached_path(self, totals=None):
+        transactions, revenue, _, _, items_sold = totals or self.totals()
+        scope = f'{self.tenant_id}:{self.tz.zone}:{self.start}:{self.end}'
+        version = f'{LAYOUT_VERSION}:{int(transactions)}:{float(revenue):.2f}:{int(items_sold)}'
+        return os.path.join(
+            current_app.config.get('EXPORT_DIR', '/tmp/pos-exports'), 'pdf',
+            f"{hashlib.sha1(scope.encode()).hexdigest()[:20]}-{hashlib.sha1(version.encode()).hexdigest()[:12]}.pdf")
+
+    def meta(self, totals):
+        transactions, revenue, tax, discount, items_sold = totals
+        payments = self._in_range(db.session.query(
+            DailyPaymentRollup.payment_method,
+            db.func.sum(DailyPaymentRollup.transactions),
+            db.func.sum(DailyPaymentRollup.revenue)
+        ).filter(DailyPaymentRollup.tenant_id == self.tenant_id), DailyPaymentRollup.day).group_by(
+            DailyPaymentRollup.payment_method
+        ).order_by(db.func.sum(DailyPaymentRollup.revenue).desc())
+        revenue_sum = db.func.sum(DailyProductRollup.revenue)
+        top_products = self._in_range(db.session.query(
+            Product.name, db.func.sum(DailyProductRollup.quantity), revenue_sum
+        ).select_from(DailyProductRollup).join(Product, Product.id == DailyProductRollup.product_id).filter(
+            DailyProductRollup.tenant_id == self.tenant_id
+        ), DailyProductRollup.day).group_by(Product.id, Product.name).order_by(revenue_sum.desc()).limit(20)
+        days = self._in_range(db.session.query(
+            DailySalesRollup.day, DailySalesRollup.transactions, DailySalesRollup.revenue
+        ).filter(DailySalesRollup.tenant_id == self.tenant_id), DailySalesRollup.day).order_by(DailySalesRollup.day)
+        return {
+            'tenant_name': self.tenant_name,
+            'period': self.period(),
+            'generated_at': datetime.now(self.tz).strftime('%Y-%m-%d %H:%M'),
+            'summary': {
+                'transactions': int(transactions), 'revenue': float(revenue),
+                'average': float(revenue) / int(transactions) if transactions else 0.0,
+                'tax': float(tax), 'discount': float(discount), 'items_sold': int(items_sold)
+            },
+            'payments': [[method, int(count or 0), float(total or 0)] for method, count, total in payments],
+            'top_products': [[name, int(quantity or 0), float(total or 0)] for name, quantity, total in top_products],
+            'days': [[str(day), int(count), float(total)] for day, count, total in days],
+        }
+
+    def _rows(self):
+        history = SalesHistory(self.tenant_id, start=self.start, end=self.end, tz=self.tz)
+        for sale in history.stream(self.batch):
+            yield [sale.receipt_number,
+                   pytz.utc.localize(sale.created_at).astimezone(self.tz).strftime('%Y-%m-%d %H:%M'),
+                   sale.customer_name or 'Walk-in', sale.item_count or 0, float(sale.total_amount),
+                   sale.payment_method]
+
+    def save(self, path):
+        totals = self.totals()
+        meta = self.meta(totals)
+        fd, rows_path = tempfile.mkstemp(prefix='.report-rows-', suffix='.jsonl')
+        os.close(fd)
+        try:
+            count = write_rows(rows_path, self._rows())
+            # Koneksi DB tidak perlu ditahan selama rendering
+            db.session.remove()
+            pdf_pool.render(path, rows_path, meta)
+            logger.info(f"Rendered PDF report with {count} sales for tenant {self.tenant_id}")
+        finally:
+            os.unlink(rows_path)
+        # Versi lama untuk rentang yang sama tidak akan dipakai lagi; versi yang
+        # lebih baru (job lain yang selesai duluan) dibiarkan
+        prefix = os.path.basename(path).split('-')[0]
+        directory = os.path.dirname(path)
+        written = os.path.getmtime(path)
+        for name in os.listdir(directory):
+            other = os.path.join(directory, name)
+            try:
+                if name.startswith(prefix + '-') and other != path and os.path.getmtime(other) < written:
+                    os.unlink(other)
+            except OSError:
+                pass
+
+
+class ExportJobs:
+    """Exports too large for a request, run in a background thread.
+
+    Job state lives in the app cache (``export-job:<id>``) so a status poll
+    can land on any worker; the finished file goes to ``EXPORT_DIR``,
+    which every worker on the host can read. A job interrupted by a worker
+    restart stays ``running`` until its cache entry expires. Jobs writing
+    to an explicit ``path`` are rendered once: a second request for the
+    same path while the first runs follows that job instead.
+    """
+
+    def _key(self, job_id):
+        return f'export-job:{job_id}'
+
+    def directory(self):
+        return current_app.config.get('EXPORT_DIR', '/tmp/pos-exports')
+
+    def path(self, job_id, suffix='.xlsx'):
+        return os.path.join(self.directory(), f'{job_id}{suffix}')
+
+    def _path_key(self, path):
+        return f'export-path:{hashlib.sha1(path.encode()).hexdigest()}'
+
+    def get(self, job_id, tenant_id, user_id):
+        """The job if it belongs to ``tenant_id``/``user_id``, else None"""
+        job = cache.get(self._key(job_id))
+        if not job or job['tenant_id'] != tenant_id or job['user_id'] != user_id:
+            return None
+        if job.get('leader'):
+            leader = cache.get(self._key(job['leader']))
+            if leader is None:
+                return dict(job, status='failed', error='Export was interrupted')
+            return dict(job, status=leader['status'], error=leader['error'])
+        return job
+
+    def start(self, export, user_id, suffix='.xlsx', mimetype=XLSX_MIMETYPE, path=None):
+        """Queue ``export`` (anything with ``filename()`` and ``save(path)``);
+        the file goes to ``path`` or ``EXPORT_DIR/<job id><suffix>``"""
+        ttl = current_app.config.get('EXPORT_TTL', 3600)
+        self._purge(ttl)
+        job_id = uuid.uuid4().hex
+        job = {'status': 'running', 'tenant_id': export.tenant_id, 'user_id': user_id,
+               'filename': export.filename(), 'path': path or self.path(job_id, suffix),
+               'mimetype': mimetype, 'error': None}
+        if path is not None and not cache.add(self._path_key(path), job_id, timeout=ttl):
+            leader = cache.get(self._path_key(path))
+            if leader is not None:
+                job['leader'] = leader
+                cache.set(self._key(job_id), job, timeout=ttl)
+                return job_id
+        cache.set(self._key(job_id), job, timeout=ttl)
+        app = current_app._get_current_object()
+        threading.Thread(target=self._run, args=(app, job_id, job, export, ttl),
+                         name=f'export-{job_id}', daemon=True).start()
+        return job_id
+
+    def _run(self, app, job_id, job, export, ttl):
+        with app.app_context():
+            started = time.monotonic()
+            try:
+                export.save(job['path'])
+                job['status'] = 'done'
+                logger.info(f"Export {job_id} finished in {time.monotonic() - started:.1f}s")
+            except Exception as e:
+                logger.exception(f"Export {job_id} failed")
+                job['status'] = 'failed'
+                job['error'] = str(e)
+            cache.set(self._key(job_id), job, timeout=ttl)
+            if cache.get(self._path_key(job['path'])) == job_id:
+                cache.delete(self._path_key(job['path']))
+
+    def _purge(self, ttl):
+        # File yang statusnya sudah kedaluwarsa dari cache tidak bisa diunduh lagi;
+        # PDF cache (EXPORT_DIR/pdf) dibuat ulang bila diminta lagi
+        cutoff = time.time() - ttl
+        for directory in (self.directory(), os.path.join(self.directory(), 'pdf')):
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                        os.unlink(path)
+                except OSError:
+                    pass
+
+
+export_jobs = ExportJobs()
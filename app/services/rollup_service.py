@@ -0,0 +1,280 @@
+import logging
+from datetime import date
+import pytz
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import (Sale, SaleItem, Tenant, DailySalesRollup, DailyProductRollup,
+                        DailyPaymentRollup, db)
+from app.services.principal_service import invalidate_tenant_principals
+from app.services.tenant_cache import tenant_cache
+from app.services.timeseries_service import invalidate_series
+from app.services.top_sellers_service import seed_top_sellers
+from app.utils.timezone import get_tenant_timezone, local_date_expr
+
+logger = logging.getLogger(__name__)
+
+UPSERT_CHUNK = 500
+
+UPSERT_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def upsert_increment(model, rows, keys):
+    """``INSERT ... ON CONFLICT (keys) DO UPDATE SET col = col + excluded.col``
+
+    ``rows`` must already be aggregated so each key appears once (PostgreSQL
+    refuses to touch the same row twice in one statement).
+    """
+    if not rows:
+        return
+    table = model.__table__
+    counters = [name for name in rows[0] if name not in keys]
+    dialect_insert = UPSERT_DIALECTS.get(db.engine.dialect.name)
+
+    if dialect_insert is None:
+        # Dialect tanpa ON CONFLICT: baca-lalu-tulis per baris
+        for row in rows:
+            existing = db.session.get(model, tuple(row[k] for k in keys))
+            if existing is None:
+                db.session.add(model(**row))
+            else:
+                for name in counters:
+                    setattr(existing, name, getattr(existing, name) + row[name])
+        return
+
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        stmt = dialect_insert(table).values(rows[start:start + UPSERT_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[k] for k in keys],
+            set_={name: table.c[name] + stmt.excluded[name] for name in counters}
+        )
+        db.session.execute(stmt)
+
+
+class SalesRollup:
+    """Accumulates sales into the daily rollup tables.
+
+    Rows are keyed by the local business day of each sale (in the tenant's
+    own timezone) and applied with one upsert per table, so a checkout adds
+    three statements regardless of basket size.
+    """
+
+    def __init__(self):
+        self.zones = {}
+        self.reset()
+
+    def reset(self):
+        self.days = {}
+        self.products = {}
+        self.payments = {}
+
+    def tenant_timezone(self, tenant_id):
+        if tenant_id not in self.zones:
+            # FOR SHARE sampai commit: checkout menunggu rebuild/ganti zona
+            # waktu yang sedang berjalan (lihat ``_rebuild_locked``). Checkout
+            # memanggil ini sebelum mengunci baris produk
+            tenant = db.session.execute(
+                select(Tenant.timezone).where(Tenant.id == tenant_id).with_for_update(read=True)
+            ).one()
+            self.zones[tenant_id] = get_tenant_timezone(tenant)
+        return self.zones[tenant_id]
+
+    def day_for(self, tenant_id, created_at):
+        local = pytz.utc.localize(created_at).astimezone(self.tenant_timezone(tenant_id))
+        return local.date()
+
+    def add_sale(self, sale, items):
+        """``sale`` and ``items`` are column dicts (or rows with the same
+        attribute names) for a sale and its sale items"""
+        get = _getter(sale)
+        tenant_id = get('tenant_id')
+        day = self.day_for(tenant_id, get('created_at'))
+
+        totals = self.days.setdefault((tenant_id, day), {
+            'revenue': 0.0, 'tax_amount': 0.0, 'discount_amount': 0.0,
+            'transactions': 0, 'items_sold': 0
+        })
+        totals['revenue'] += get('total_amount') or 0
+        totals['tax_amount'] += get('tax_amount') or 0
+        totals['discount_amount'] += get('discount_amount') or 0
+        totals['transactions'] += 1
+
+        payment = self.payments.setdefault(
+            (tenant_id, day, get('payment_method'), get('user_id') or ''),
+            {'revenue': 0.0, 'transactions': 0}
+        )
+        payment['revenue'] += get('total_amount') or 0
+        payment['transactions'] += 1
+
+        for item in items:
+            item_get = _getter(item)
+            totals['items_sold'] += item_get('quantity')
+            product = self.products.setdefault(
+                (tenant_id, day, item_get('product_id')),
+                {'quantity': 0, 'revenue': 0.0}
+            )
+            product['quantity'] += item_get('quantity')
+            product['revenue'] += item_get('total_price') or 0
+
+    def flush(self):
+        """Write accumulated totals in the caller's transaction and reset"""
+        upsert_increment(DailySalesRollup, [
+            dict(tenant_id=tenant_id, day=day, **totals)
+            for (tenant_id, day), totals in self.days.items()
+        ], ('tenant_id', 'day'))
+        upsert_increment(DailyProductRollup, [
+            dict(tenant_id=tenant_id, day=day, product_id=product_id, **totals)
+            for (tenant_id, day, product_id), totals in self.products.items()
+        ], ('tenant_id', 'day', 'product_id'))
+        upsert_increment(DailyPaymentRollup, [
+            dict(tenant_id=tenant_id, day=day, payment_method=method, user_id=user_id, **totals)
+            for (tenant_id, day, method, user_id), totals in self.payments.items()
+        ], ('tenant_id', 'day', 'payment_method', 'user_id'))
+        self.reset()
+
+
+def _getter(obj):
+    if isinstance(obj, dict):
+        return obj.get
+    return lambda name: getattr(obj, name)
+
+
+def rebuild_rollups(tenant_id=None):
+    """Recompute all rollup rows (optionally for one tenant) from raw sales.
+
+    Each table is rebuilt with one ``GROUP BY`` per tenant, bucketing
+    ``created_at`` by the tenant's local date inside the database (see
+    ``local_date_expr``), so nothing but the aggregates crosses the wire.
+    Every tenant is rebuilt in its own transaction under a lock on its
+    tenant row, so checkouts wait instead of being counted twice. Returns
+    the number of sales folded in.
+    """
+    tenant_ids = select(Tenant.id)
+    if tenant_id:
+        tenant_ids = tenant_ids.where(Tenant.id == tenant_id)
+
+    count = sum(_rebuild_locked(tid) for tid in db.session.execute(tenant_ids).scalars().all())
+    logger.info(f"Rebuilt rollups from {count} sales")
+    return count
+
+
+def apply_pending_timezones(tenant_id=None):
+    """Apply every requested timezone change (``Tenant.pending_timezone``,
+    set by the settings page). Each tenant switches and has its rollups
+    rebuilt in one transaction; a failure is stored in
+    ``Tenant.timezone_error`` and the change stays pending, so the next
+    pass retries it. Returns the number of tenants switched."""
+    pending = select(Tenant.id).where(Tenant.pending_timezone.isnot(None))
+    if tenant_id:
+        pending = pending.where(Tenant.id == tenant_id)
+
+    switched = 0
+    for tid in db.session.execute(pending).scalars().all():
+        try:
+            switched += change_timezone(tid)
+        except Exception as e:
+            logger.exception(f"Timezone change for tenant {tid} failed")
+            db.session.execute(update(Tenant).where(Tenant.id == tid).values(timezone_error=str(e)[:500]))
+            db.session.commit()
+    return switched
+
+
+def change_timezone(tenant_id):
+    """Switch a tenant to its pending timezone and rebuild its rollups,
+    which are keyed by local day, in the same transaction; then drop
+    everything derived from the old local days (cached tenant and
+    principals, cached series, top-seller sketches). Returns 1 if the
+    tenant was switched, 0 if nothing was pending."""
+    count = _rebuild_locked(tenant_id, apply_pending=True)
+    if count is None:
+        return 0
+    tenant = db.session.get(Tenant, tenant_id)
+    tenant_cache.invalidate(tenant)
+    invalidate_tenant_principals(tenant_id)
+    seed_top_sellers(tenant_id=tenant_id, restart_live=True)
+    logger.info(f"Tenant {tenant_id} switched to {tenant.timezone}, {count} sales rebuilt")
+    return 1
+
+
+def _rebuild_locked(tenant_id, apply_pending=False):
+    # FOR NO KEY UPDATE: checkout (FOR SHARE di ``SalesRollup``) menunggu
+    # sampai commit, insert lain yang hanya mereferensikan tenant tidak
+    tenant = db.session.get(Tenant, tenant_id, with_for_update={'key_share': True}, populate_existing=True)
+    if tenant is None or (apply_pending and not tenant.pending_timezone):
+        db.session.rollback()
+        return None if apply_pending else 0
+    try:
+        if apply_pending:
+            tenant.timezone = tenant.pending_timezone
+            tenant.pending_timezone = None
+            tenant.timezone_error = None
+        for model in (DailySalesRollup, DailyProductRollup, DailyPaymentRollup):
+            db.session.execute(delete(model).where(model.tenant_id == tenant_id))
+        count = _rebuild_tenant(tenant_id, get_tenant_timezone(tenant))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    invalidate_series(tenant_id, history=True)
+    return count
+
+
+def _rebuild_tenant(tenant_id, tz):
+    day = local_date_expr(Sale.created_at, tz).label('day')
+    own = Sale.tenant_id == tenant_id
+
+    days = db.session.execute(
+        select(day,
+               func.coalesce(func.sum(Sale.total_amount), 0),
+               func.coalesce(func.sum(Sale.tax_amount), 0),
+               func.coalesce(func.sum(Sale.discount_amount), 0),
+               func.count(Sale.id))
+        .where(own).group_by(day)
+    ).all()
+    if not days:
+        return 0
+
+    items = dict(db.session.execute(
+        select(day, func.sum(SaleItem.quantity))
+        .join(Sale, SaleItem.sale_id == Sale.id).where(own).group_by(day)
+    ).all())
+    _insert(DailySalesRollup, [
+        dict(tenant_id=tenant_id, day=_as_date(d), revenue=revenue, tax_amount=tax,
+             discount_amount=discount, transactions=transactions, items_sold=int(items.get(d) or 0))
+        for d, revenue, tax, discount, transactions in days
+    ])
+
+    _insert(DailyProductRollup, [
+        dict(tenant_id=tenant_id, day=_as_date(d), product_id=product_id,
+             quantity=int(quantity or 0), revenue=revenue or 0)
+        for d, product_id, quantity, revenue in db.session.execute(
+            select(day, SaleItem.product_id, func.sum(SaleItem.quantity), func.sum(SaleItem.total_price))
+            .join(Sale, SaleItem.sale_id == Sale.id).where(own)
+            .group_by(day, SaleItem.product_id)
+        )
+    ])
+
+    user_key = func.coalesce(Sale.user_id, '')
+    _insert(DailyPaymentRollup, [
+        dict(tenant_id=tenant_id, day=_as_date(d), payment_method=method, user_id=user_id,
+             revenue=revenue or 0, transactions=transactions)
+        for d, method, user_id, revenue, transactions in db.session.execute(
+            select(day, Sale.payment_method, user_key, func.sum(Sale.total_amount), func.count(Sale.id))
+            .where(own).group_by(day, Sale.payment_method, user_key)
+        )
+    ])
+    return sum(row[4] for row in days)
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        db.session.execute(insert(model), rows[start:start + UPSERT_CHUNK])
+
+
+def _as_date(value):
+    # SQLite date() mengembalikan string 'YYYY-MM-DD'
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
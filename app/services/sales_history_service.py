@@ -0,0 +1,122 @@
+import logging
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+from app.models import Customer, Product, Sale, SaleItem, User, db
+from app.utils.customer_keys import name_key
+from app.utils.cursors import decode_cursor, encode_cursor
+from app.utils.timezone import local_day_bounds_utc
+
+logger = logging.getLogger(__name__)
+
+
+class SalesHistory:
+    """One page of a tenant's sales for the history screen.
+
+    A page is a single query: the sale columns the table shows, customer
+    and cashier names by outer join, and the item count as a correlated
+    subquery. Pages are keyset-paginated on ``(created_at, id)``, newest
+    first, backed by ``ix_sales_tenant_created``, so the cost of a page
+    does not grow with how far back it is.
+    """
+
+    def __init__(self, tenant_id, date=None, payment_method=None, cashier_id=None,
+                 customer=None, min_amount=None, max_amount=None, start=None, end=None, tz=None):
+        self.tenant_id = tenant_id
+        self.tz = tz  # default: timezone tenant dari request
+        self.date = date
+        self.start = start
+        self.end = end
+        self.payment_method = payment_method
+        self.cashier_id = cashier_id
+        self.customer = customer
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+
+    def query(self):
+        item_count = select(func.count(SaleItem.id)).where(
+            SaleItem.sale_id == Sale.id
+        ).correlate(Sale).scalar_subquery()
+        query = db.session.query(
+            Sale.id, Sale.receipt_number, Sale.created_at, Sale.total_amount, Sale.payment_method,
+            Customer.name.label('customer_name'),
+            User.username.label('cashier_name'),
+            item_count.label('item_count')
+        ).outerjoin(Customer, Customer.id == Sale.customer_id).outerjoin(
+            User, User.id == Sale.user_id
+        ).filter(Sale.tenant_id == self.tenant_id)
+
+        if self.date:
+            start, end = local_day_bounds_utc(self.date, self.tz)
+            query = query.filter(Sale.created_at >= start, Sale.created_at < end)
+        if self.start:
+            query = query.filter(Sale.created_at >= local_day_bounds_utc(self.start, self.tz)[0])
+        if self.end:
+            query = query.filter(Sale.created_at < local_day_bounds_utc(self.end, self.tz)[1])
+        if self.payment_method:
+            query = query.filter(Sale.payment_method == self.payment_method)
+        if self.cashier_id:
+            query = query.filter(Sale.user_id == self.cashier_id)
+        if self.customer:
+            query = query.filter(Customer.name_key.startswith(name_key(self.customer), autoescape=True))
+        if self.min_amount is not None:
+            query = query.filter(Sale.total_amount >= self.min_amount)
+        if self.max_amount is not None:
+            query = query.filter(Sale.total_amount <= self.max_amount)
+        return query
+
+    def page(self, after=None, before=None, per_page=20):
+        """``(rows, older_cursor, newer_cursor)``; ``after`` pages to older
+        sales, ``before`` back to newer ones"""
+        query = self.query()
+        key = db.tuple_(Sale.created_at, Sale.id)
+        position = _position(before or after)
+        if position and before:
+            query = query.filter(key > position).order_by(Sale.created_at, Sale.id)
+        else:
+            if position:
+                query = query.filter(key < position)
+            query = query.order_by(Sale.created_at.desc(), Sale.id.desc())
+
+        rows = query.limit(per_page + 1).all()
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        if position and before:
+            rows.reverse()
+            has_older, has_newer = True, more
+        else:
+            has_older, has_newer = more, bool(position)
+
+        older = encode_cursor(rows[-1].created_at.isoformat(), str(rows[-1].id)) if rows and has_older else None
+        newer = encode_cursor(rows[0].created_at.isoformat(), str(rows[0].id)) if rows and has_newer else None
+        return rows, older, newer
+
+    def stream(self, batch=500):
+        """Every matching row, newest first, fetched ``batch`` rows at a time
+        (server-side cursor on PostgreSQL) instead of one ``.all()``"""
+        query = self.query().order_by(Sale.created_at.desc(), Sale.id.desc())
+        return query.execution_options(yield_per=batch)
+
+
+def _position(cursor):
+    values = decode_cursor(cursor) if cursor else None
+    if not values:
+        return None
+    try:
+        return datetime.fromisoformat(values[0]), values[1]
+    except ValueError:
+        return None
+
+
+def load_receipt(tenant_id, sale_id):
+    """``(sale, lines)`` with cashier and customer loaded alongside the sale
+    and every line's product name in one query (no per-item lazy loads)"""
+    sale = Sale.query.options(
+        joinedload(Sale.user), joinedload(Sale.customer)
+    ).filter_by(id=sale_id, tenant_id=tenant_id).first_or_404()
+    lines = db.session.query(
+        SaleItem.quantity, SaleItem.unit_price, SaleItem.total_price, Product.name.label('name')
+    ).join(Product, Product.id == SaleItem.product_id).filter(
+        SaleItem.sale_id == sale.id
+    ).all()
+    return sale, lines
@@ -0,0 +1,142 @@
+import logging
+from flask import current_app
+from sqlalchemy import case, func, insert, select, update
+from app.models import Product, StockMovement, db, generate_uuid, utc_now
+
+logger = logging.getLogger(__name__)
+
+
+def deferred_mode():
+    """``STOCK_LEDGER_MODE='deferred'``: checkout only appends movements and
+    the compactor folds them into ``Product.stock_quantity`` later.
+
+    The default ``'immediate'`` mode still updates the snapshot in the same
+    transaction (with the oversell guard) and records already-applied
+    movements, so the ledger is a pure audit trail.
+    """
+    return current_app.config.get('STOCK_LEDGER_MODE', 'immediate') == 'deferred'
+
+
+class StockLedger:
+    """Append-only stock ledger for one tenant.
+
+    Current stock is ``Product.stock_quantity`` (the last compacted snapshot)
+    plus the sum of that product's movements with ``applied=False``.
+    """
+
+    def __init__(self, tenant_id, user_id=None):
+        self.tenant_id = tenant_id
+        self.user_id = user_id
+
+    def movement_row(self, product_id, quantity, reason, reference_id=None, applied=None):
+        return {
+            'id': generate_uuid(),
+            'tenant_id': self.tenant_id,
+            'product_id': product_id,
+            'user_id': self.user_id,
+            'quantity': quantity,
+            'reason': reason,
+            'reference_id': reference_id,
+            'applied': (not deferred_mode()) if applied is None else applied,
+            'created_at': utc_now()
+        }
+
+    def record(self, rows):
+        """Bulk-append movement rows built with ``movement_row``"""
+        if rows:
+            db.session.execute(insert(StockMovement), rows)
+
+    def record_sale_items(self, item_rows):
+        """One ``sale`` movement per sale item row, in a single INSERT"""
+        self.record([
+            self.movement_row(row['product_id'], -row['quantity'], StockMovement.SALE, row['sale_id'])
+            for row in item_rows
+        ])
+
+    def pending_deltas(self, product_ids):
+        """Sum of not-yet-compacted movements per product"""
+        if not product_ids:
+            return {}
+        rows = db.session.query(
+            StockMovement.product_id,
+            func.sum(StockMovement.quantity)
+        ).filter(
+            StockMovement.tenant_id == self.tenant_id,
+            StockMovement.applied == False,
+            StockMovement.product_id.in_(list(product_ids))
+        ).group_by(StockMovement.product_id).all()
+        return {product_id: int(delta or 0) for product_id, delta in rows}
+
+    def available(self, products):
+        """Current stock for ``{id: Product}``: snapshot plus pending deltas"""
+        pending = self.pending_deltas(products.keys()) if deferred_mode() else {}
+        return {
+            product_id: (product.stock_quantity or 0) + pending.get(product_id, 0)
+            for product_id, product in products.items()
+        }
+
+    def add(self, product, delta, reason, reference_id=None):
+        """Record an incoming/outgoing quantity (restock, manual adjustment)"""
+        if not delta:
+            return
+        if not deferred_mode():
+            # SQL-side increment, no lost update against concurrent checkouts
+            product.stock_quantity = Product.stock_quantity + delta
+        self.record([self.movement_row(product.id, delta, reason, reference_id)])
+
+    def set_quantity(self, product, quantity, reason=StockMovement.EDIT):
+        """Record an absolute stock count (product edit / stock take)"""
+        current = self.available({product.id: product})[product.id]
+        delta = quantity - current
+        if not delta:
+            return
+        if not deferred_mode():
+            product.stock_quantity = quantity
+        self.record([self.movement_row(product.id, delta, reason)])
+
+
+def compact_movements(batch_size=1000):
+    """Fold one batch of pending movements into ``Product.stock_quantity``.
+
+    Safe to run from several processes at once: rows are claimed with
+    ``FOR UPDATE SKIP LOCKED`` on PostgreSQL, and the claim UPDATE only
+    counts rows that are still pending, so a batch another compactor got to
+    first is rolled back instead of being applied twice. Returns the number
+    of movements folded.
+    """
+    table = StockMovement.__table__
+    rows = db.session.execute(
+        select(table.c.id, table.c.product_id, table.c.quantity)
+        .where(table.c.applied == False)
+        .order_by(table.c.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        db.session.rollback()
+        return 0
+
+    ids = [row.id for row in rows]
+    claimed = db.session.execute(
+        update(table)
+        .where(table.c.id.in_(ids), table.c.applied == False)
+        .values(applied=True)
+    )
+    if claimed.rowcount != len(ids):
+        db.session.rollback()
+        return 0
+
+    deltas = {}
+    for row in rows:
+        deltas[row.product_id] = deltas.get(row.product_id, 0) + row.quantity
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if deltas:
+        db.session.execute(
+            update(Product)
+            .where(Product.id.in_(list(deltas)))
+            .values(stock_quantity=Product.stock_quantity + case(deltas, value=Product.id))
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    logger.info(f"Compacted {len(rows)} stock movements into {len(deltas)} products")
+    return len(rows)
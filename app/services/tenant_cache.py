@@ -0,0 +1,136 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from redis.exceptions import RedisError
+from app.models import Tenant
+
+logger = logging.getLogger(__name__)
+
+
+class TenantSnapshot:
+    """Read-only copy of the tenant columns request handling needs.
+
+    Cached instead of ``Tenant`` objects so entries are never bound to (or
+    expired by) a request's session, and serialise cheaply to Redis.
+    """
+
+    __slots__ = ('id', 'name', 'email', 'phone', 'address', 'subdomain',
+                 'timezone', 'is_active', 'is_default')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_model(cls, tenant):
+        return cls(**{name: getattr(tenant, name) for name in cls.__slots__})
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f'<TenantSnapshot {self.id} {self.subdomain}>'
+
+
+class TenantCache:
+    """Two-level TTL cache for tenant resolution, including negative results.
+
+    Level one is a per-process LRU (``TENANT_CACHE_SIZE`` entries, expiring
+    after ``TENANT_CACHE_TTL`` seconds), so a warm request resolves its
+    tenant without any I/O. Level two is Redis (``TENANT_CACHE_REDIS_TTL``),
+    shared by all workers so a cold worker does not hit the database.
+    ``invalidate`` clears both levels here and in Redis; other workers'
+    in-process entries expire within ``TENANT_CACHE_TTL``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _config(self, name, default):
+        return current_app.config.get(name, default)
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._config('TENANT_CACHE_TTL', 30), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._config('TENANT_CACHE_SIZE', 1024):
+                self._entries.popitem(last=False)
+
+    def get(self, key, loader):
+        """Cached ``TenantSnapshot`` (or ``None``) for ``key``, calling
+        ``loader()`` for a ``Tenant`` on a miss at both levels"""
+        found, value = self._get_local(key)
+        if found:
+            return value
+
+        redis_client = current_app.redis
+        if redis_client is not None:
+            try:
+                raw = redis_client.get(f'tenant:{key}')
+                if raw is not None:
+                    data = json.loads(raw)
+                    value = TenantSnapshot(**data) if data else None
+                    self._set_local(key, value)
+                    return value
+            except (RedisError, ValueError) as e:
+                logger.warning(f"Tenant cache read failed for {key}: {e}")
+
+        tenant = loader()
+        value = TenantSnapshot.from_model(tenant) if tenant is not None else None
+        self._set_local(key, value)
+        if redis_client is not None:
+            try:
+                redis_client.set(f'tenant:{key}', json.dumps(value.to_dict() if value else None),
+                                 ex=self._config('TENANT_CACHE_REDIS_TTL', 300))
+            except RedisError as e:
+                logger.warning(f"Tenant cache write failed for {key}: {e}")
+        return value
+
+    def by_subdomain(self, subdomain):
+        return self.get(f'sub:{subdomain}', lambda: Tenant.query.filter_by(
+            subdomain=subdomain, is_active=True).first())
+
+    def by_id(self, tenant_id):
+        return self.get(f'id:{tenant_id}', lambda: Tenant.query.filter_by(
+            id=tenant_id, is_active=True).first())
+
+    def default(self):
+        return self.get('default', lambda: Tenant.query.filter_by(is_default=True).first())
+
+    def invalidate(self, tenant=None, subdomains=()):
+        """Drop every key ``tenant`` may be cached under (its id, its
+        subdomain, the default entry) plus any extra ``subdomains``, e.g. a
+        newly registered one that was cached as a miss"""
+        keys = {'default'} | {f'sub:{subdomain}' for subdomain in subdomains if subdomain}
+        if tenant is not None:
+            keys.add(f'id:{tenant.id}')
+            if tenant.subdomain:
+                keys.add(f'sub:{tenant.subdomain}')
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        redis_client = current_app.redis
+        if redis_client is not None:
+            try:
+                redis_client.delete(*[f'tenant:{key}' for key in keys])
+            except RedisError as e:
+                logger.warning(f"Tenant cache invalidation failed: {e}")
+
+
+tenant_cache = TenantCache()
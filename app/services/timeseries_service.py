@@ -0,0 +1,163 @@
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app import cache
+from app.models import Sale, DailySalesRollup, db
+from app.utils.timezone import local_day_bounds_utc, local_hour_expr
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+
+# Rentang hourly dibaca dari tabel sales mentah, jadi dibatasi
+MAX_HOUR_RANGE_DAYS = 31
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+BUCKETS = {
+    # granularity: (bucket start of a date/datetime, next bucket, label format)
+    'hour': (lambda t: t.replace(minute=0, second=0, microsecond=0), lambda t: t + timedelta(hours=1), '%m/%d %H:00'),
+    'day': (lambda d: d, lambda d: d + timedelta(days=1), '%m/%d'),
+    'week': (lambda d: d - timedelta(days=d.weekday()), lambda d: d + timedelta(days=7), '%m/%d'),
+    'month': (_month_start, _next_month, '%b %Y'),
+}
+
+
+class SalesTimeSeries:
+    """Revenue/transaction series for one tenant at a chosen granularity.
+
+    Day, week and month series are folded from ``daily_sales_rollups`` in a
+    single pass over a dict keyed by bucket start; hour series are grouped
+    by local hour in SQL. Missing buckets are filled with zeros and long
+    series are downsampled by summing consecutive buckets, so a chart never
+    receives more than ``max_points`` points.
+    """
+
+    def __init__(self, tenant_id, tz):
+        self.tenant_id = tenant_id
+        self.tz = tz
+
+    def totals(self, granularity, start_day, end_day):
+        """``{bucket_start: [revenue, transactions]}`` for buckets with sales"""
+        bucket_of = BUCKETS[granularity][0]
+        totals = {}
+        if granularity == 'hour':
+            hour = local_hour_expr(Sale.created_at, self.tz).label('hour')
+            rows = db.session.query(
+                hour, func.sum(Sale.total_amount), func.count(Sale.id)
+            ).filter(
+                Sale.tenant_id == self.tenant_id,
+                Sale.created_at >= local_day_bounds_utc(start_day, self.tz)[0],
+                Sale.created_at < local_day_bounds_utc(end_day, self.tz)[1]
+            ).group_by(hour).all()
+            for bucket, revenue, transactions in rows:
+                if isinstance(bucket, str):
+                    # SQLite strftime mengembalikan string
+                    bucket = datetime.fromisoformat(bucket)
+                totals[bucket.replace(tzinfo=None)] = [float(revenue or 0), int(transactions)]
+            return totals
+
+        rows = db.session.query(
+            DailySalesRollup.day, DailySalesRollup.revenue, DailySalesRollup.transactions
+        ).filter(
+            DailySalesRollup.tenant_id == self.tenant_id,
+            DailySalesRollup.day >= start_day,
+            DailySalesRollup.day <= end_day
+        )
+        for day, revenue, transactions in rows:
+            bucket = totals.setdefault(bucket_of(day), [0.0, 0])
+            bucket[0] += float(revenue or 0)
+            bucket[1] += int(transactions or 0)
+        return totals
+
+    def series(self, granularity, start_day, end_day, max_points=120):
+        bucket_of, next_bucket, label_format = BUCKETS[granularity]
+        totals = self.totals(granularity, start_day, end_day)
+
+        if granularity == 'hour':
+            current = datetime.combine(start_day, datetime.min.time())
+            stop = datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+        else:
+            current, stop = bucket_of(start_day), end_day + timedelta(days=1)
+
+        points = []
+        while current < stop:
+            revenue, transactions = totals.get(current, (0.0, 0))
+            points.append({
+                'start': current.isoformat(),
+                'label': current.strftime(label_format),
+                'revenue': round(revenue, 2),
+                'transactions': transactions
+            })
+            current = next_bucket(current)
+        return downsample(points, max_points)
+
+
+def downsample(points, max_points):
+    """Merge consecutive buckets so at most ``max_points`` remain.
+
+    Values are sums, so merging keeps totals exact (unlike picking every
+    n-th point); each merged point keeps the label of its first bucket.
+    """
+    if max_points <= 0 or len(points) <= max_points:
+        return points
+    size = math.ceil(len(points) / max_points)
+    merged = []
+    for start in range(0, len(points), size):
+        chunk = points[start:start + size]
+        merged.append({
+            'start': chunk[0]['start'],
+            'label': chunk[0]['label'],
+            'revenue': round(sum(p['revenue'] for p in chunk), 2),
+            'transactions': sum(p['transactions'] for p in chunk)
+        })
+    return merged
+
+
+def cached_series(tenant_id, tz, granularity, start_day, end_day, max_points=120):
+    """``SalesTimeSeries.series`` through the app cache, keyed per tenant and
+    range. Every key carries the tenant's history version, which is reset
+    when a sale lands on a past day (offline sync) or the rollups are
+    rebuilt; ranges that include today also carry the live version, which
+    ``publish_sales`` resets after each checkout."""
+    today = datetime.now(tz).date()
+    key = (f'timeseries:{tenant_id}:{tz.zone}:{granularity}:{start_day}:{end_day}:{max_points}'
+           f':{series_version(tenant_id, HISTORY_VERSION)}')
+    if end_day >= today:
+        key += f':{series_version(tenant_id)}'
+    points = cache.get(key)
+    if points is None:
+        points = SalesTimeSeries(tenant_id, tz).series(granularity, start_day, end_day, max_points)
+        cache.set(key, points, timeout=60 if end_day >= today else 3600)
+        logger.debug(f"Cached {granularity} series {start_day}..{end_day} for tenant {tenant_id}")
+    return points
+
+
+LIVE_VERSION = 'timeseries-version'
+HISTORY_VERSION = 'timeseries-history-version'
+
+
+def series_version(tenant_id, name=LIVE_VERSION):
+    key = f'{name}:{tenant_id}'
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.set(key, version, timeout=0)
+    return version
+
+
+def invalidate_series(tenant_id, history=False):
+    """Drop cached series that include today; with ``history`` also every
+    closed range (backdated sales, rollup rebuilds)"""
+    cache.delete(f'{LIVE_VERSION}:{tenant_id}')
+    if history:
+        cache.delete(f'{HISTORY_VERSION}:{tenant_id}')
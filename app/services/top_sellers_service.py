@@ -0,0 +1,278 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+import pytz
+from flask import current_app
+from redis.exceptions import RedisError
+from app.utils.sketches import SPACE_SAVING_LUA, SPACE_SAVING_TOP_LUA, HyperLogLog, SpaceSaving, window_covered
+from app.utils.timezone import get_local_timezone
+
+logger = logging.getLogger(__name__)
+
+DAY_TTL = 40 * 24 * 3600
+HOUR_TTL = 49 * 3600
+MAX_RECENT_HOURS = 48
+
+
+def _day_windows(start_day, end_day):
+    return [(start_day + timedelta(days=i)).strftime('%Y%m%d') for i in range((end_day - start_day).days + 1)]
+
+
+def _hour_windows(end, hours):
+    return [(end - timedelta(hours=i)).strftime('%Y%m%d%H') for i in range(hours)]
+
+
+class RedisTopSellers:
+    """Per-tenant Space-Saving ZSETs in Redis, one per local day (``d``) and
+    per local hour (``h``), plus one HyperLogLog of customers per day;
+    windows are combined at read time with a floor-aware merge (see
+    ``SPACE_SAVING_TOP_LUA``) / multi-key ``PFCOUNT``."""
+
+    def __init__(self, client):
+        self.client = client
+        self.space_saving = client.register_script(SPACE_SAVING_LUA)
+        self.space_saving_top = client.register_script(SPACE_SAVING_TOP_LUA)
+
+    def record(self, tenant_id, hour, quantities, customers, capacity):
+        day = hour[:8]
+        pipe = self.client.pipeline(transaction=False)
+        pairs = []
+        for product_id, quantity in quantities.items():
+            pairs.extend([product_id, quantity])
+        for kind, window, ttl in (('d', day, DAY_TTL), ('h', hour, HOUR_TTL)):
+            self.space_saving(keys=[f'topsell:{tenant_id}:{kind}:{window}'], args=[capacity, ttl] + pairs, client=pipe)
+        if customers:
+            pipe.pfadd(f'uniqcust:{tenant_id}:d:{day}', *customers)
+            pipe.expire(f'uniqcust:{tenant_id}:d:{day}', DAY_TTL)
+        pipe.set(f'topsell:{tenant_id}:since', hour, nx=True)
+        pipe.set(f'topsell:{tenant_id}:live-since', hour, nx=True)
+        pipe.execute()
+
+    def since(self, tenant_id, marker):
+        value = self.client.get(f'topsell:{tenant_id}:{marker}')
+        return value.decode() if isinstance(value, bytes) else value
+
+    def top(self, tenant_id, kind, windows, n, capacity):
+        ranked = self.space_saving_top(keys=[f'topsell:{tenant_id}:{kind}:{window}' for window in windows],
+                                       args=[capacity, n])
+        return [(item.decode() if isinstance(item, bytes) else item, int(float(count)))
+                for item, count in zip(ranked[::2], ranked[1::2])]
+
+    def unique_customers(self, tenant_id, windows):
+        return int(self.client.pfcount(*[f'uniqcust:{tenant_id}:d:{window}' for window in windows]))
+
+    def seed(self, tenant_id, day, quantities, capacity):
+        """Replace a day window with exact totals"""
+        key = f'topsell:{tenant_id}:d:{day}'
+        top = sorted(quantities.items(), key=lambda kv: kv[1], reverse=True)[:capacity]
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        if top:
+            pipe.zadd(key, dict(top))
+            pipe.expire(key, DAY_TTL)
+        pipe.execute()
+
+    def set_since(self, tenant_id, day, hour, restart_live=False):
+        self.client.set(f'topsell:{tenant_id}:since', day)
+        # Seed tidak mengisi window per jam maupun HLL pelanggan
+        self.client.set(f'topsell:{tenant_id}:live-since', hour, nx=not restart_live)
+
+
+class LocalTopSellers:
+    """In-process equivalent of ``RedisTopSellers`` for deployments without
+    Redis; each worker only sees its own checkouts, so it is exact only
+    with a single worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sketches = {}
+        self._customers = {}
+        self._since = {}
+
+    def record(self, tenant_id, hour, quantities, customers, capacity):
+        day = hour[:8]
+        with self._lock:
+            for kind, window in (('d', day), ('h', hour)):
+                sketch = self._sketches.setdefault((tenant_id, kind, window), SpaceSaving(capacity))
+                for product_id, quantity in quantities.items():
+                    sketch.add(product_id, quantity)
+            if customers:
+                hll = self._customers.setdefault((tenant_id, day), HyperLogLog())
+                for customer_id in customers:
+                    hll.add(customer_id)
+            self._since.setdefault((tenant_id, 'since'), hour)
+            self._since.setdefault((tenant_id, 'live-since'), hour)
+            self._expire(hour)
+
+    def _expire(self, hour):
+        # Buang window harian/jam yang sudah di luar retensi
+        now = datetime.strptime(hour, '%Y%m%d%H')
+        oldest = {'d': (now - timedelta(seconds=DAY_TTL)).strftime('%Y%m%d'),
+                  'h': (now - timedelta(seconds=HOUR_TTL)).strftime('%Y%m%d%H')}
+        for key in [k for k in self._sketches if k[2] < oldest[k[1]]]:
+            del self._sketches[key]
+        for key in [k for k in self._customers if k[1] < oldest['d']]:
+            del self._customers[key]
+
+    def since(self, tenant_id, marker):
+        return self._since.get((tenant_id, marker))
+
+    def top(self, tenant_id, kind, windows, n, capacity):
+        merged = SpaceSaving(capacity)
+        with self._lock:
+            for window in windows:
+                sketch = self._sketches.get((tenant_id, kind, window))
+                if sketch is not None:
+                    merged.merge(sketch)
+        return [(item, count) for item, count, _ in merged.top(n)]
+
+    def unique_customers(self, tenant_id, windows):
+        merged = HyperLogLog()
+        with self._lock:
+            for window in windows:
+                hll = self._customers.get((tenant_id, window))
+                if hll is not None:
+                    merged.merge(hll)
+        return merged.count()
+
+    def seed(self, tenant_id, day, quantities, capacity):
+        sketch = SpaceSaving(capacity)
+        for product_id, quantity in sorted(quantities.items(), key=lambda kv: kv[1], reverse=True)[:capacity]:
+            sketch.add(product_id, quantity)
+        with self._lock:
+            self._sketches[(tenant_id, 'd', day)] = sketch
+
+    def set_since(self, tenant_id, day, hour, restart_live=False):
+        with self._lock:
+            self._since[(tenant_id, 'since')] = day
+            if restart_live:
+                self._since[(tenant_id, 'live-since')] = hour
+            else:
+                self._since.setdefault((tenant_id, 'live-since'), hour)
+
+
+_local_store = LocalTopSellers()
+
+
+class TopSellers:
+    """Approximate top-N products and distinct customers per tenant.
+
+    Checkouts feed rolling daily and hourly windows (``record``); reads merge
+    the windows of the requested range in O(k * windows), where k is
+    ``TOP_SELLERS_CAPACITY``. Reads return ``None`` when the sketches do not
+    cover the whole range (e.g. just after deploy, before ``flask sketches
+    seed``) or the store is unreachable, and callers fall back to the exact
+    rollup query.
+    """
+
+    def __init__(self):
+        redis_client = current_app.redis
+        self.store = RedisTopSellers(redis_client) if redis_client is not None else _local_store
+        self.capacity = current_app.config.get('TOP_SELLERS_CAPACITY', 200)
+
+    @staticmethod
+    def enabled():
+        return current_app.config.get('TOP_SELLERS_SKETCH', True)
+
+    def record(self, tenant_id, sales, items):
+        """Add committed sales (column dicts) and their item rows. Never
+        raises: a failed update only makes the sketch slightly low"""
+        if not sales or not self.enabled():
+            return
+        try:
+            tz = get_local_timezone()
+            items_by_sale = {}
+            for item in items:
+                items_by_sale.setdefault(item['sale_id'], []).append(item)
+            groups = {}
+            for sale in sales:
+                local = pytz.utc.localize(sale['created_at']).astimezone(tz)
+                quantities, customers = groups.setdefault(local.strftime('%Y%m%d%H'), ({}, set()))
+                for item in items_by_sale.get(sale['id'], ()):
+                    quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+                if sale.get('customer_id'):
+                    customers.add(sale['customer_id'])
+            for hour, (quantities, customers) in groups.items():
+                self.store.record(tenant_id, hour, quantities, sorted(customers), self.capacity)
+        except (RedisError, ValueError, KeyError) as e:
+            logger.warning(f"Could not update top-seller sketch for tenant {tenant_id}: {e}")
+
+    def _covered(self, tenant_id, first_window, marker='since'):
+        return window_covered(self.store.since(tenant_id, marker), first_window)
+
+    def top(self, tenant_id, start_day, end_day, n):
+        """``[(product_id, quantity)]`` over local days, or ``None``"""
+        windows = _day_windows(start_day, end_day)
+        try:
+            if not self.enabled() or not self._covered(tenant_id, windows[0]):
+                return None
+            return self.store.top(tenant_id, 'd', windows, n, self.capacity)
+        except RedisError as e:
+            logger.warning(f"Top-seller sketch unavailable: {e}")
+            return None
+
+    def top_recent(self, tenant_id, tz, hours, n):
+        """``[(product_id, quantity)]`` over the current local hour and the
+        ``hours - 1`` before it, or ``None``"""
+        windows = _hour_windows(datetime.now(tz), hours)
+        try:
+            if not self.enabled() or not self._covered(tenant_id, windows[-1], 'live-since'):
+                return None
+            return self.store.top(tenant_id, 'h', windows, n, self.capacity)
+        except RedisError as e:
+            logger.warning(f"Top-seller sketch unavailable: {e}")
+            return None
+
+    def unique_customers(self, tenant_id, start_day, end_day):
+        """Approximate distinct customers over local days, or ``None``"""
+        windows = _day_windows(start_day, end_day)
+        try:
+            if not self.enabled() or not self._covered(tenant_id, windows[0], 'live-since'):
+                return None
+            return self.store.unique_customers(tenant_id, windows)
+        except RedisError as e:
+            logger.warning(f"Unique-customer sketch unavailable: {e}")
+            return None
+
+    def seed(self, tenant_id, daily_quantities, tz, restart_live=False):
+        """Load exact per-day quantities (``{date: {product_id: qty}}``, e.g.
+        from the daily product rollups) and mark the range as covered.
+        Distinct-customer counts are only available from the seed day on,
+        or from now on with ``restart_live`` (their windows are keyed by
+        local day too, so a timezone change invalidates them)."""
+        for day, quantities in daily_quantities.items():
+            self.store.seed(tenant_id, day.strftime('%Y%m%d'), quantities, self.capacity)
+        if daily_quantities:
+            self.store.set_since(tenant_id, min(daily_quantities).strftime('%Y%m%d'),
+                                 datetime.now(tz).strftime('%Y%m%d%H'), restart_live)
+
+
+def seed_top_sellers(days=35, tenant_id=None, restart_live=False):
+    """Seed the daily windows of the last ``days`` days from the exact daily
+    product rollups so reads over that range stop falling back to SQL.
+    Every day in the range is replaced, including days without sales.
+    Returns the number of tenants seeded."""
+    from app.models import DailyProductRollup, Tenant, db
+    from app.utils.timezone import get_tenant_timezone
+
+    tenants = db.session.query(Tenant)
+    if tenant_id:
+        tenants = tenants.filter(Tenant.id == tenant_id)
+    top_sellers = TopSellers()
+    count = 0
+    for tenant in tenants.all():
+        tz = get_tenant_timezone(tenant)
+        start_day = datetime.now(tz).date() - timedelta(days=days - 1)
+        daily = {start_day + timedelta(days=i): {} for i in range(days)}
+        rows = db.session.query(
+            DailyProductRollup.day, DailyProductRollup.product_id, DailyProductRollup.quantity
+        ).filter(
+            DailyProductRollup.tenant_id == tenant.id,
+            DailyProductRollup.day >= start_day
+        )
+        for day, product_id, quantity in rows:
+            daily.setdefault(day, {})[product_id] = quantity
+        top_sellers.seed(tenant.id, daily, tz, restart_live)
+        count += 1
+    logger.info(f"Seeded top-seller sketches for {count} tenants")
+    return count
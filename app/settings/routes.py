@@ -4,8 +4,11 @@ from flask import render_template, request, flash, redirect, url_for, jsonify, a
 from flask_login import login_required, current_user
 from app.settings import bp
 from app.models import Tenant, db, User
+from app.services.tenant_cache import tenant_cache
+from app.services.principal_service import invalidate_principal, invalidate_tenant_principals
 from app.services.printer_service import PrinterService
 import json
+import pytz
 from .forms import UserForm
 from functools import wraps
 import uuid
@@ -153,6 +156,7 @@ def edit_user(user_id):
             user_to_edit.set_password(password)
         
         db.session.commit()
+        invalidate_principal(user_id)
         flash(f'User "{user_to_edit.username}" has been updated.', 'success')
         return redirect(url_for('settings.user_management'))
     
@@ -175,6 +179,7 @@ def delete_user(user_id):
     
     db.session.delete(user_to_delete)
     db.session.commit()
+    invalidate_principal(user_id)
     flash(f'User "{user_to_delete.username}" has been deleted.', 'success')
     return redirect(url_for('settings.user_management'))
 
@@ -189,7 +194,23 @@ def tenant_info():
         tenant.phone = request.form.get('phone')
         tenant.address = request.form.get('address')
         
+        timezone = request.form.get('timezone')
+        timezone_changed = bool(timezone) and timezone != (tenant.pending_timezone or tenant.timezone)
+        if timezone_changed and timezone not in pytz.all_timezones_set:
+            flash('Unknown timezone.', 'danger')
+            return redirect(url_for('settings.tenant_info'))
+        if timezone_changed:
+            # Rollup harian dikunci per hari lokal: zona waktu baru diterapkan
+            # bersama rebuild-nya oleh `flask rollups apply-timezones`.
+            # Memilih zona waktu saat ini membatalkan perubahan yang menunggu
+            tenant.pending_timezone = timezone if timezone != tenant.timezone else None
+            tenant.timezone_error = None
+        
         db.session.commit()
+        tenant_cache.invalidate(tenant)
+        invalidate_tenant_principals(tenant.id)
+        if tenant.pending_timezone and timezone_changed:
+            flash(f'Timezone change to {timezone} is queued; reports switch over once it has been applied.', 'info')
         flash('Tenant information updated successfully!', 'success')
         return redirect(url_for('settings.tenant_info'))
     
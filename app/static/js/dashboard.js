@@ -5,18 +5,27 @@ class Dashboard {
     }
 
     init() {
-        this.loadSalesData();
-        this.loadTopProducts();
-        this.loadRecentActivity();
+        this.loadSummary();
         this.bindEvents();
     }
 
+    // Satu request untuk chart, top products dan aktivitas
+    async loadSummary() {
+        try {
+            const response = await fetch('/dashboard/api/summary?top_limit=10');
+            const summary = await response.json();
+
+            this.renderSalesChart(summary.series);
+            this.renderRevenueChart(summary.series);
+            this.renderTopProducts(summary.top_products);
+            this.renderRecentActivity(summary.recent_activity);
+        } catch (error) {
+            console.error('Error loading dashboard summary:', error);
+        }
+    }
+
     bindEvents() {
-        // Refresh data every 5 minutes
-        setInterval(() => {
-            this.loadSalesData();
-            this.loadTopProducts();
-        }, 300000);
+        this.startLiveUpdates();
 
         // Date range filters
         const dateFilter = document.getElementById('dateFilter');
@@ -27,6 +36,35 @@ class Dashboard {
         }
     }
 
+    // Push dari /dashboard/stream; polling tiap 5 menit hanya sebagai fallback
+    startLiveUpdates() {
+        if (!window.EventSource) {
+            this.startPolling();
+            return;
+        }
+
+        const source = new EventSource('/dashboard/stream');
+        source.addEventListener('open', () => this.stopPolling());
+        source.addEventListener('error', () => {
+            if (source.readyState === EventSource.CLOSED) {
+                this.startPolling();
+                setTimeout(() => this.startLiveUpdates(), 60000);
+            }
+        });
+        source.addEventListener('sale', () => this.loadSummary());
+    }
+
+    startPolling() {
+        if (!this.pollingTimer) {
+            this.pollingTimer = setInterval(() => this.loadSummary(), 300000);
+        }
+    }
+
+    stopPolling() {
+        clearInterval(this.pollingTimer);
+        this.pollingTimer = null;
+    }
+
     async loadSalesData() {
         try {
             const response = await fetch('/dashboard/sales-data');
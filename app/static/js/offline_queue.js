@@ -0,0 +1,119 @@
+// Antrian penjualan offline untuk terminal POS.
+// Sale yang gagal dikirim karena jaringan disimpan di localStorage dan
+// dikirim ulang sekaligus ke /sales/api/sync ketika koneksi kembali.
+// Sale yang ditolak server (stok kurang, data tidak valid) sudah dibayar
+// pelanggan, jadi tidak dibuang: dipindah ke store "failed" bersama
+// errornya sampai kasir memprosesnya ulang atau menghapusnya.
+class OfflineSaleQueue {
+    constructor(options = {}) {
+        this.storageKey = options.storageKey || 'pos_offline_sales';
+        this.failedKey = options.failedKey || this.storageKey + '_failed';
+        this.syncUrl = options.syncUrl || '/sales/api/sync';
+        this.batchSize = options.batchSize || 200;
+        this.onSynced = options.onSynced || (() => {});
+        this.syncing = false;
+
+        window.addEventListener('online', () => this.flush());
+        setInterval(() => this.flush(), options.interval || 60000);
+    }
+
+    static newClientRef() {
+        if (window.crypto && window.crypto.randomUUID) {
+            return window.crypto.randomUUID();
+        }
+        return 'ref-' + Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+    }
+
+    load(key = this.storageKey) {
+        try {
+            return JSON.parse(localStorage.getItem(key)) || [];
+        } catch (error) {
+            return [];
+        }
+    }
+
+    save(sales, key = this.storageKey) {
+        localStorage.setItem(key, JSON.stringify(sales));
+    }
+
+    failed() {
+        return this.load(this.failedKey);
+    }
+
+    // Kirim ulang sale yang ditolak (mis. setelah stok dikoreksi)
+    retry(clientRef) {
+        const failed = this.failed();
+        const sale = failed.find(entry => entry.client_ref === clientRef);
+        if (!sale) return;
+        this.save(failed.filter(entry => entry.client_ref !== clientRef), this.failedKey);
+        delete sale.error;
+        delete sale.rejected_at;
+        this.enqueue(sale);
+        this.flush();
+    }
+
+    // Hapus sale yang ditolak setelah kasir menanganinya secara manual
+    dismiss(clientRef) {
+        this.save(this.failed().filter(entry => entry.client_ref !== clientRef), this.failedKey);
+    }
+
+    size() {
+        return this.load().length;
+    }
+
+    enqueue(saleData) {
+        const sales = this.load();
+        if (!sales.some(sale => sale.client_ref === saleData.client_ref)) {
+            sales.push(Object.assign({ created_at: new Date().toISOString() }, saleData));
+            this.save(sales);
+        }
+    }
+
+    async flush() {
+        if (this.syncing || !navigator.onLine) return;
+        const queued = this.load();
+        if (queued.length === 0) return;
+
+        this.syncing = true;
+        try {
+            const batch = queued.slice(0, this.batchSize);
+            const csrfToken = document.querySelector('meta[name="csrf-token"]')?.getAttribute('content');
+            const response = await fetch(this.syncUrl, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': csrfToken || ''
+                },
+                body: JSON.stringify({ sales: batch })
+            });
+            if (!response.ok) return;
+
+            const data = await response.json();
+            if (!data.success) return;
+
+            // Sale yang sudah tercatat (created/duplicate) dikeluarkan dari
+            // antrian; yang ditolak pindah ke store failed bersama errornya.
+            // Hasilnya diteruskan ke callback.
+            const done = new Set(data.results.map(result => result.client_ref));
+            const errors = new Map(data.results
+                .filter(result => result.status === 'rejected')
+                .map(result => [result.client_ref, result.error]));
+            const remaining = this.load();
+            const rejected = remaining
+                .filter(sale => errors.has(sale.client_ref))
+                .map(sale => Object.assign({}, sale, {
+                    error: errors.get(sale.client_ref),
+                    rejected_at: new Date().toISOString()
+                }));
+            if (rejected.length) {
+                this.save(this.failed().concat(rejected), this.failedKey);
+            }
+            this.save(remaining.filter(sale => !done.has(sale.client_ref)));
+            this.onSynced(data.results);
+        } catch (error) {
+            console.error('Offline sync error:', error);
+        } finally {
+            this.syncing = false;
+        }
+    }
+}
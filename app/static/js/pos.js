@@ -9,6 +9,17 @@ class POSSystem {
         this.currentCustomer = null;
         this.barcodeInput = '';
         this.barcodeTimeout = null;
+        this.offlineQueue = new OfflineSaleQueue({
+            onSynced: results => {
+                const created = results.filter(r => r.status === 'created').length;
+                if (created) {
+                    this.showNotification(`${created} offline sale(s) synced`, 'success');
+                }
+                if (results.some(r => r.status === 'rejected')) {
+                    this.showOfflineFailed();
+                }
+            }
+        });
         this.init();
     }
 
@@ -17,6 +28,8 @@ class POSSystem {
         this.updateCartDisplay();
         this.loadProducts();
         this.setupBarcodeScanner();
+        this.showOfflineFailed();
+        this.offlineQueue.flush();
     }
 
     bindEvents() {
@@ -111,11 +124,10 @@ class POSSystem {
 
     async processBarcode(barcode) {
         try {
-            const response = await fetch(`/products/api/search?q=${encodeURIComponent(barcode)}`);
-            const products = await response.json();
+            const response = await fetch(`/sales/api/barcode/${encodeURIComponent(barcode)}`);
             
-            if (products.length > 0) {
-                const product = products[0];
+            if (response.ok) {
+                const product = await response.json();
                 this.addToCart(product.id);
                 this.showNotification(`Added ${product.name} to cart`, 'success');
             } else {
@@ -359,11 +371,13 @@ class POSSystem {
             total_amount: this.totalAmount,
             payment_method: paymentMethod,
             customer_id: customerId || null,
-            notes: notes
+            notes: notes,
+            client_ref: OfflineSaleQueue.newClientRef()
         };
 
+        let response;
         try {
-            const response = await fetch('/sales/process-sale', {
+            response = await fetch('/sales/process-sale', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -371,6 +385,15 @@ class POSSystem {
                 },
                 body: JSON.stringify(saleData)
             });
+        } catch (error) {
+            // Jaringan putus: simpan ke antrian offline, sync nanti
+            this.offlineQueue.enqueue(saleData);
+            this.clearCart();
+            this.showNotification(`Offline: sale queued for sync (${this.offlineQueue.size()} pending)`, 'warning');
+            return;
+        }
+
+        try {
 
             const result = await response.json();
 
@@ -468,6 +491,52 @@ class POSSystem {
         }, 5000);
     }
 
+    // Sale offline yang ditolak server tetap tampil (tanpa auto-hide) sampai
+    // kasir memprosesnya ulang atau menghapusnya
+    showOfflineFailed() {
+        const container = document.getElementById('notificationContainer') || this.createNotificationContainer();
+        let panel = document.getElementById('offlineFailed');
+        const failed = this.offlineQueue.failed();
+        if (failed.length === 0) {
+            if (panel) panel.remove();
+            return;
+        }
+        if (!panel) {
+            panel = document.createElement('div');
+            panel.id = 'offlineFailed';
+            panel.className = 'alert alert-danger';
+            container.prepend(panel);
+        }
+        panel.replaceChildren();
+        const title = document.createElement('strong');
+        title.textContent = `${failed.length} offline sale(s) rejected by the server (already paid):`;
+        const list = document.createElement('ul');
+        list.className = 'mb-0 mt-2 small';
+        failed.forEach(sale => {
+            const item = document.createElement('li');
+            item.append(`${new Date(sale.created_at).toLocaleString()} · ${sale.total_amount} · ${sale.error} `);
+            const retry = document.createElement('button');
+            retry.className = 'btn btn-sm btn-outline-light me-1';
+            retry.textContent = 'Retry';
+            retry.addEventListener('click', () => {
+                this.offlineQueue.retry(sale.client_ref);
+                this.showOfflineFailed();
+            });
+            const dismiss = document.createElement('button');
+            dismiss.className = 'btn btn-sm btn-outline-light';
+            dismiss.textContent = 'Dismiss';
+            dismiss.addEventListener('click', () => {
+                if (confirm('Remove this sale? Record it manually first.')) {
+                    this.offlineQueue.dismiss(sale.client_ref);
+                    this.showOfflineFailed();
+                }
+            });
+            item.append(retry, dismiss);
+            list.appendChild(item);
+        });
+        panel.append(title, list);
+    }
+
     createNotificationContainer() {
         const container = document.createElement('div');
         container.id = 'notificationContainer';
@@ -0,0 +1,178 @@
+// Katalog produk POS yang disimpan di IndexedDB.
+// Saat halaman dibuka katalog langsung dibaca dari IndexedDB, lalu
+// disinkronkan dengan /sales/api/catalog?since=<versi>: server hanya
+// mengirim baris yang berubah/dihapus, atau 304 kalau versi masih sama.
+class PosCatalog {
+    constructor(options = {}) {
+        this.url = options.url || '/sales/api/catalog';
+        this.dbName = 'pos_catalog_' + (options.tenantId || 'default');
+        this.onChange = options.onChange || (() => {});
+        this.products = new Map();
+        this.categories = new Map();
+        this.codes = new Map();
+        this.version = 0;
+        this.etag = null;
+        this.db = null;
+        this.syncing = false;
+
+        window.addEventListener('online', () => this.sync());
+        setInterval(() => this.sync(), options.interval || 60000);
+    }
+
+    static promisify(request) {
+        return new Promise((resolve, reject) => {
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    static done(transaction) {
+        return new Promise((resolve, reject) => {
+            transaction.oncomplete = () => resolve();
+            transaction.onerror = () => reject(transaction.error);
+            transaction.onabort = () => reject(transaction.error);
+        });
+    }
+
+    async open() {
+        if (this.db || !window.indexedDB) return this.db;
+        const request = indexedDB.open(this.dbName, 1);
+        request.onupgradeneeded = () => {
+            const db = request.result;
+            db.createObjectStore('products', { keyPath: 'id' });
+            db.createObjectStore('categories', { keyPath: 'id' });
+            db.createObjectStore('meta', { keyPath: 'key' });
+        };
+        this.db = await PosCatalog.promisify(request);
+        return this.db;
+    }
+
+    // Baca katalog lokal ke memori (tanpa jaringan)
+    async load() {
+        try {
+            const db = await this.open();
+            if (!db) return;
+            const tx = db.transaction(['products', 'categories', 'meta'], 'readonly');
+            const [products, categories, meta] = await Promise.all([
+                PosCatalog.promisify(tx.objectStore('products').getAll()),
+                PosCatalog.promisify(tx.objectStore('categories').getAll()),
+                PosCatalog.promisify(tx.objectStore('meta').get('sync'))
+            ]);
+            products.forEach(product => this.put(product));
+            categories.forEach(category => this.categories.set(category.id, category));
+            if (meta) {
+                this.version = meta.version;
+                this.etag = meta.etag;
+            }
+        } catch (error) {
+            console.error('Catalog load error:', error);
+        }
+        this.onChange();
+    }
+
+    put(product) {
+        const previous = this.products.get(product.id);
+        if (previous) this.dropCodes(previous);
+        this.products.set(product.id, product);
+        [product.barcode, product.sku].forEach(code => {
+            if (code && !this.codes.has(code.toLowerCase())) this.codes.set(code.toLowerCase(), product.id);
+        });
+        // Barcode menang atas SKU produk lain
+        if (product.barcode) this.codes.set(product.barcode.toLowerCase(), product.id);
+    }
+
+    dropCodes(product) {
+        [product.barcode, product.sku].forEach(code => {
+            if (code && this.codes.get(code.toLowerCase()) === product.id) this.codes.delete(code.toLowerCase());
+        });
+    }
+
+    remove(productId) {
+        const product = this.products.get(productId);
+        if (!product) return;
+        this.dropCodes(product);
+        this.products.delete(productId);
+    }
+
+    static rows(fields, rows) {
+        return rows.map(row => Object.fromEntries(fields.map((field, i) => [field, row[i]])));
+    }
+
+    async sync() {
+        if (this.syncing || !navigator.onLine) return;
+        this.syncing = true;
+        try {
+            const headers = this.etag ? { 'If-None-Match': this.etag } : {};
+            const response = await fetch(`${this.url}?since=${this.version}`, { headers, cache: 'no-store' });
+            if (response.status === 304 || !response.ok) return;
+            const data = await response.json();
+            const products = PosCatalog.rows(data.fields.products, data.products);
+            const categories = PosCatalog.rows(data.fields.categories, data.categories);
+
+            if (data.full) {
+                this.products.clear();
+                this.codes.clear();
+                this.categories.clear();
+            }
+            products.forEach(product => this.put(product));
+            categories.forEach(category => this.categories.set(category.id, category));
+            data.deleted.products.forEach(id => this.remove(id));
+            data.deleted.categories.forEach(id => this.categories.delete(id));
+            this.version = data.version;
+            this.etag = response.headers.get('ETag');
+
+            await this.save(data.full, products, categories, data.deleted);
+            this.onChange();
+        } catch (error) {
+            console.error('Catalog sync error:', error);
+        } finally {
+            this.syncing = false;
+        }
+    }
+
+    async save(full, products, categories, deleted) {
+        const db = await this.open();
+        if (!db) return;
+        const tx = db.transaction(['products', 'categories', 'meta'], 'readwrite');
+        const productStore = tx.objectStore('products');
+        const categoryStore = tx.objectStore('categories');
+        if (full) {
+            productStore.clear();
+            categoryStore.clear();
+        }
+        products.forEach(product => productStore.put(product));
+        categories.forEach(category => categoryStore.put(category));
+        deleted.products.forEach(id => productStore.delete(id));
+        deleted.categories.forEach(id => categoryStore.delete(id));
+        tx.objectStore('meta').put({ key: 'sync', version: this.version, etag: this.etag });
+        await PosCatalog.done(tx);
+    }
+
+    get(productId) {
+        return this.products.get(productId);
+    }
+
+    byCode(code) {
+        const productId = this.codes.get((code || '').trim().toLowerCase());
+        return productId ? this.products.get(productId) : null;
+    }
+
+    // Awalan nama lebih dulu, lalu nama/SKU/barcode yang mengandung kata kunci
+    search(term, limit = 48) {
+        const query = (term || '').trim().toLowerCase();
+        const prefix = [];
+        const contains = [];
+        for (const product of this.products.values()) {
+            const name = product.name.toLowerCase();
+            if (!query || name.startsWith(query)) {
+                prefix.push(product);
+                if (prefix.length >= limit) break;
+            } else if (contains.length < limit && (name.includes(query) ||
+                       (product.sku || '').toLowerCase().includes(query) ||
+                       (product.barcode || '').toLowerCase().includes(query))) {
+                contains.push(product);
+            }
+        }
+        return prefix.concat(contains).slice(0, limit);
+    }
+}
@@ -3,6 +3,8 @@ from flask_login import login_required, current_user
 from functools import wraps
 from . import bp
 from app.models import Tenant
+from app.services.tenant_cache import tenant_cache
+from app.services.principal_service import invalidate_tenant_principals
 from .. import db
 
 def superadmin_required(f):
@@ -35,6 +37,8 @@ def toggle_tenant_status(tenant_id):
     tenant = Tenant.query.get_or_404(tenant_id)
     tenant.is_active = not tenant.is_active
     db.session.commit()
+    tenant_cache.invalidate(tenant)
+    invalidate_tenant_principals(tenant.id)
     status = "activated" if tenant.is_active else "deactivated"
     flash(f'Tenant "{tenant.name}" has been {status}.', 'success')
     return redirect(url_for('superadmin.dashboard'))
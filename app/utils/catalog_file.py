@@ -0,0 +1,142 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+
+MAGIC = b'POSCAT01'
+HEADER = struct.Struct('<8sQII')     # magic, catalog version, records, codes
+OFFSET = struct.Struct('<I')
+CODE = struct.Struct('<QI')          # code hash, record number
+PRICE = struct.Struct('<d')
+LENGTH = struct.Struct('<H')
+NULL = 0xFFFF
+
+# Urutan string di setiap record (setelah harga)
+FIELDS = ('id', 'name', 'sku', 'barcode', 'image_url', 'category_id', 'category_name')
+
+
+def code_hash(code):
+    # hash() Python diacak per proses, jadi pakai digest yang stabil
+    return int.from_bytes(hashlib.blake2b(code.strip().lower().encode(), digest_size=8).digest(), 'little')
+
+
+def _encode(value):
+    if value is None:
+        return LENGTH.pack(NULL)
+    data = str(value).encode()[:NULL - 1]
+    return LENGTH.pack(len(data)) + data
+
+
+def write_catalog(path, version, products):
+    """Write ``products`` (dicts with ``FIELDS`` and ``price``) to ``path``.
+
+    Layout: header, record offsets, code table sorted by hash (barcode and
+    SKU -> record), then the records, sorted by name. The file is written
+    under a temporary name and moved into place with ``os.replace``, so a
+    reader maps either the old or the new file, never a partial one.
+    """
+    products = sorted(products, key=lambda p: ((p.get('name') or '').lower(), p['id']))
+    records, offsets, codes = [], [], []
+    position = 0
+    for number, product in enumerate(products):
+        record = PRICE.pack(float(product.get('price') or 0)) + b''.join(
+            _encode(product.get(field)) for field in FIELDS)
+        offsets.append(position)
+        records.append(record)
+        position += len(record)
+        # Barcode didahulukan atas SKU produk lain dengan kode yang sama
+        for rank, code in enumerate((product.get('barcode'), product.get('sku'))):
+            if code:
+                codes.append((code_hash(code), rank, number))
+    offsets.append(position)
+    codes.sort()
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.catalog-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, version, len(products), len(codes)))
+            f.write(b''.join(OFFSET.pack(offset) for offset in offsets))
+            f.write(b''.join(CODE.pack(digest, number) for digest, _, number in codes))
+            f.writelines(records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return len(products)
+
+
+class CatalogFile:
+    """Read-only, memory-mapped view of a file from ``write_catalog``.
+
+    Nothing is decoded up front: records are located through the offset
+    table and decoded only when asked for, and code lookups binary-search
+    the hash table in place. The pages are shared through the OS page
+    cache by every process mapping the same file.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        magic, self.version, self._count, self._codes = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f'{path} is not a catalog snapshot')
+        self._offsets = HEADER.size
+        self._code_table = self._offsets + (self._count + 1) * OFFSET.size
+        self._records = self._code_table + self._codes * CODE.size
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._map.close()
+
+    def record(self, number):
+        """Product dict of record ``number`` (records are in name order)"""
+        data = self._map
+        position = self._records + OFFSET.unpack_from(data, self._offsets + number * OFFSET.size)[0]
+        product = {'price': PRICE.unpack_from(data, position)[0]}
+        position += PRICE.size
+        for field in FIELDS:
+            length = LENGTH.unpack_from(data, position)[0]
+            position += LENGTH.size
+            if length == NULL:
+                product[field] = None
+            else:
+                product[field] = data[position:position + length].decode()
+                position += length
+        return product
+
+    def records(self, start=0, stop=None):
+        for number in range(start, min(self._count, self._count if stop is None else stop)):
+            yield self.record(number)
+
+    def lookup(self, code):
+        """Record number scanned as ``code`` (barcode before SKU), or None"""
+        if not code or not code.strip():
+            return None
+        digest = code_hash(code)
+        low, high = 0, self._codes
+        while low < high:
+            middle = (low + high) // 2
+            if CODE.unpack_from(self._map, self._code_table + middle * CODE.size)[0] < digest:
+                low = middle + 1
+            else:
+                high = middle
+        key = code.strip().lower()
+        while low < self._codes:
+            found, number = CODE.unpack_from(self._map, self._code_table + low * CODE.size)
+            if found != digest:
+                break
+            product = self.record(number)
+            if key in ((product['barcode'] or '').lower(), (product['sku'] or '').lower()):
+                return number
+            low += 1
+        return None
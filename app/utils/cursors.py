@@ -0,0 +1,18 @@
+import base64
+import json
+
+
+def encode_cursor(*values):
+    """Opaque, URL-safe keyset cursor for ``values`` (JSON-serialisable)"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, size=2):
+    """The values of ``cursor`` as strings, or None if it is not valid"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return tuple(str(value) for value in values)
@@ -0,0 +1,25 @@
+import re
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def name_key(name):
+    """Lowercase, single-spaced name used for prefix search"""
+    return ' '.join((name or '').lower().split())[:100] or None
+
+
+def phone_key(phone):
+    """Phone digits without the 0 / +62 trunk prefix, so 0812..., +62 812...
+    and 62812... all index (and search) as 812..."""
+    digits = _NON_DIGITS.sub('', phone or '')
+    if digits.startswith('62'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = digits[1:]
+    return digits[:20] or None
+
+
+def prefix_range(prefix):
+    """``(low, high)`` bounds such that ``low <= key < high`` is a prefix
+    match that a plain btree index can serve"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
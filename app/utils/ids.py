@@ -0,0 +1,31 @@
+import os
+import time
+import uuid
+
+
+def uuid7():
+    """Time-ordered UUID (RFC 9562 version 7).
+
+    The first 48 bits are the Unix time in milliseconds, so ids generated
+    later sort later and B-tree inserts land on the right-most index page
+    instead of a random one.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), 'big')
+
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+    value |= 0x7 << 76                              # version
+    value |= ((rand >> 62) & 0x0FFF) << 64          # rand_a (12 bits)
+    value |= 0b10 << 62                             # variant
+    value |= rand & ((1 << 62) - 1)                 # rand_b (62 bits)
+    return uuid.UUID(int=value)
+
+
+def uuid4():
+    return uuid.uuid4()
+
+
+ID_STRATEGIES = {
+    'uuid7': uuid7,
+    'uuid4': uuid4,
+}
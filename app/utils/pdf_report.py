@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+from xml.sax.saxutils import escape
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# Naikkan jika tata letak berubah, supaya PDF lama di cache tidak dipakai lagi
+LAYOUT_VERSION = 1
+
+SALES_HEADER = ['Receipt No', 'Date', 'Customer', 'Items', 'Total', 'Payment']
+CHUNK_ROWS = 500   # Baris per Table; tabel raksasa lambat dipecah per halaman
+
+TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e9ecef')),
+    ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+
+def money(value):
+    return f"Rp{value:,.2f}"
+
+
+def write_rows(path, rows):
+    """Spool sales rows (lists of display values) to ``path`` as JSON lines"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+            count += 1
+    return count
+
+
+def _read_rows(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _table(header, rows, widths, right=()):
+    table = Table([header] + rows, colWidths=widths, repeatRows=1)
+    table.setStyle(TABLE_STYLE)
+    for column in right:
+        table.setStyle(TableStyle([('ALIGN', (column, 0), (column, -1), 'RIGHT')]))
+    return table
+
+
+def _summary(meta, styles):
+    summary = meta['summary']
+    story = [
+        Paragraph(f"Sales Report - {escape(meta['tenant_name'])}", styles['Title']),
+        Paragraph(f"Periode: {meta['period']} &middot; Dibuat: {meta['generated_at']}", styles['Normal']),
+        Spacer(1, 6 * mm),
+        _table(['Transaksi', 'Pendapatan', 'Rerata', 'Pajak', 'Diskon', 'Item terjual'], [[
+            f"{summary['transactions']:,}", money(summary['revenue']), money(summary['average']),
+            money(summary['tax']), money(summary['discount']), f"{summary['items_sold']:,}"
+        ]], [25 * mm, 32 * mm, 28 * mm, 28 * mm, 28 * mm, 25 * mm], right=range(6)),
+        Spacer(1, 6 * mm),
+        Paragraph('Metode Pembayaran', styles['Heading3']),
+        _table(['Metode', 'Transaksi', 'Pendapatan'],
+               [[method, f"{count:,}", money(revenue)] for method, count, revenue in meta['payments']],
+               [50 * mm, 30 * mm, 40 * mm], right=(1, 2)),
+        Spacer(1, 6 * mm),
+        Paragraph('Produk Terlaris', styles['Heading3']),
+        _table(['Produk', 'Qty', 'Pendapatan'],
+               [[name, f"{quantity:,}", money(revenue)] for name, quantity, revenue in meta['top_products']],
+               [90 * mm, 25 * mm, 40 * mm], right=(1, 2)),
+    ]
+    if meta['days']:
+        story += [
+            PageBreak(),
+            Paragraph('Penjualan Harian', styles['Heading3']),
+            _table(['Tanggal', 'Transaksi', 'Pendapatan'],
+                   [[day, f"{count:,}", money(revenue)] for day, count, revenue in meta['days']],
+                   [40 * mm, 30 * mm, 40 * mm], right=(1, 2)),
+        ]
+    return story
+
+
+def render_sales_report(path, rows_path, meta):
+    """Render the PDF to ``path`` from precomputed ``meta`` and spooled rows.
+
+    Runs in a worker process (no Flask, no database): summary pages first,
+    then the sales list as ``CHUNK_ROWS``-row tables with a repeated
+    header. Written under a temporary name and moved into place.
+    """
+    styles = getSampleStyleSheet()
+    story = _summary(meta, styles)
+    story += [PageBreak(), Paragraph('Daftar Transaksi', styles['Heading3'])]
+    widths = [32 * mm, 28 * mm, 45 * mm, 14 * mm, 30 * mm, 22 * mm]
+    chunk, count = [], 0
+    for receipt, created, customer, items, total, payment in _read_rows(rows_path):
+        chunk.append([receipt, created, customer[:28], items, money(total), payment])
+        count += 1
+        if len(chunk) == CHUNK_ROWS:
+            story.append(_table(SALES_HEADER, chunk, widths, right=(3, 4)))
+            chunk = []
+    if chunk:
+        story.append(_table(SALES_HEADER, chunk, widths, right=(3, 4)))
+    elif not count:
+        story.append(Paragraph('Tidak ada transaksi pada periode ini.', styles['Normal']))
+
+    def footer(canvas, doc):
+        canvas.setFont('Helvetica', 7)
+        canvas.drawRightString(A4[0] - 15 * mm, 10 * mm, f"{meta['tenant_name']} - {meta['period']} - {doc.page}")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.report-', suffix='.pdf')
+    os.close(fd)
+    try:
+        doc = SimpleDocTemplate(temp_path, pagesize=A4, leftMargin=15 * mm, rightMargin=15 * mm,
+                                topMargin=15 * mm, bottomMargin=18 * mm, title=f"Sales Report {meta['period']}")
+        doc.build(story, onFirstPage=footer, onLaterPages=footer)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return path
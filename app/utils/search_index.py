@@ -0,0 +1,252 @@
+import bisect
+import heapq
+
+NGRAM = 3
+
+
+def normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def ngrams(text, n=NGRAM):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class ProductEntry:
+    """The searchable, rarely changing columns of one product"""
+
+    __slots__ = ('id', 'name', 'sku', 'barcode', 'price', 'image_url', 'category_id',
+                 'name_key', 'sku_key', 'barcode_key')
+
+    def __init__(self, id, name, sku=None, barcode=None, price=0.0, image_url=None, category_id=None):
+        self.id = id
+        self.name = name
+        self.sku = sku
+        self.barcode = barcode
+        self.price = price
+        self.image_url = image_url
+        self.category_id = category_id
+        self.name_key = normalize(name)
+        self.sku_key = normalize(sku)
+        self.barcode_key = normalize(barcode)
+
+    @classmethod
+    def from_record(cls, record):
+        """Entry for a decoded catalog snapshot record"""
+        return cls(record['id'], record['name'], record['sku'], record['barcode'],
+                   record['price'], record['image_url'], record['category_id'])
+
+    def keys(self):
+        return (self.name_key, self.sku_key, self.barcode_key)
+
+
+class SearchIndex:
+    """Inverted index over one tenant's active products.
+
+    Names are split into character trigrams; a query of three or more
+    characters intersects the posting sets of its trigrams (rarest first),
+    so only products that can match are looked at. One- and two-character
+    queries use a word-prefix map instead. SKUs and barcodes are matched
+    exactly or by prefix (what a scanner or a cashier typing a code
+    produces) from a sorted key list, which keeps digit-heavy codes out of
+    the trigram postings.
+
+    Documents are numbered in ``(len(name), name)`` order when built in
+    bulk, so within a rank tier a smaller doc is a better hit. Rank: exact
+    SKU/barcode, name prefix (read straight off a sorted name list, in name
+    order), word prefix, other name substring, SKU/barcode prefix. Each
+    tier is scanned lazily and stops once ``limit`` hits are found.
+
+    Built from a ``catalog`` (a ``CatalogFile``), a document keeps only its
+    record number, normalized name and category; hits are decoded from the
+    shared snapshot when returned. Entries added later (committed product
+    changes) are kept as ``ProductEntry`` objects.
+
+    A published index is never mutated: searches read it without a lock,
+    so updates go to ``copy()`` and the caller swaps the reference. The
+    copy shares posting sets with the original and copies each set the
+    first time it changes it.
+    """
+
+    def __init__(self, entries=(), catalog=None):
+        self.entries = []          # doc -> ProductEntry or catalog record number (None when removed)
+        self.names = []            # doc -> normalized name (None when removed)
+        self.categories = []       # doc -> category_id
+        self.catalog = catalog
+        self.docs = {}             # product id -> doc
+        self.postings = {}         # trigram -> {doc}
+        self.prefixes = {}         # 1-2 char word prefix -> {doc}
+        self.codes = {}            # normalized sku/barcode -> {doc}
+        self._sorted_names = None  # sorted [(name, doc)], rebuilt lazily
+        self._sorted_codes = None  # sorted [(code, doc)], rebuilt lazily
+        self._shared = None        # (store, term) sets already copied, None if nothing is shared
+        if catalog is not None:
+            # Didekode sementara untuk term index; yang disimpan nomor record-nya
+            entries = ((ProductEntry.from_record(catalog.record(number)), number)
+                       for number in range(len(catalog)))
+        else:
+            entries = ((entry, None) for entry in entries)
+        for entry, number in sorted(entries, key=lambda pair: (len(pair[0].name_key), pair[0].name_key)):
+            self.add(entry, number)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def copy(self):
+        """Independent index to apply changes to; ``self`` stays untouched"""
+        clone = SearchIndex()
+        clone.entries = list(self.entries)
+        clone.names = list(self.names)
+        clone.categories = list(self.categories)
+        clone.catalog = self.catalog
+        clone.docs = dict(self.docs)
+        clone.postings = dict(self.postings)
+        clone.prefixes = dict(self.prefixes)
+        clone.codes = dict(self.codes)
+        clone._sorted_names, clone._sorted_codes = self._sorted_names, self._sorted_codes
+        clone._shared = set()
+        return clone
+
+    def _writable(self, store, name, term):
+        """The set of ``term`` in ``store``, safe to mutate in this index"""
+        docs = store.get(term)
+        if docs is None:
+            docs = store[term] = set()
+        elif self._shared is not None and (name, term) not in self._shared:
+            docs = store[term] = set(docs)
+        if self._shared is not None:
+            self._shared.add((name, term))
+        return docs
+
+    @staticmethod
+    def _terms(entry):
+        prefixes = set()
+        for word in entry.name_key.split():
+            prefixes.add(word[:1])
+            prefixes.add(word[:2])
+        return ngrams(entry.name_key), prefixes
+
+    def entry(self, doc):
+        """``ProductEntry`` of ``doc``, decoded from the catalog if needed"""
+        entry = self.entries[doc]
+        if isinstance(entry, int):
+            return ProductEntry.from_record(self.catalog.record(entry))
+        return entry
+
+    def add(self, entry, number=None):
+        """Index ``entry``; ``number`` is its record in ``catalog``, if any"""
+        self.remove(entry.id)
+        doc = len(self.entries)
+        self.entries.append(entry if number is None else number)
+        self.names.append(entry.name_key)
+        self.categories.append(entry.category_id)
+        self.docs[entry.id] = doc
+        grams, prefixes = self._terms(entry)
+        for gram in grams:
+            self._writable(self.postings, 'postings', gram).add(doc)
+        for prefix in prefixes:
+            self._writable(self.prefixes, 'prefixes', prefix).add(doc)
+        for code in (entry.sku_key, entry.barcode_key):
+            if code:
+                self._writable(self.codes, 'codes', code).add(doc)
+        self._sorted_names = self._sorted_codes = None
+
+    def remove(self, product_id):
+        doc = self.docs.pop(product_id, None)
+        if doc is None:
+            return
+        entry = self.entry(doc)
+        self.entries[doc] = self.names[doc] = self.categories[doc] = None
+        grams, prefixes = self._terms(entry)
+        for store, name, terms in ((self.postings, 'postings', grams), (self.prefixes, 'prefixes', prefixes),
+                                   (self.codes, 'codes', {entry.sku_key, entry.barcode_key} - {''})):
+            for term in terms:
+                if term not in store:
+                    continue
+                docs = self._writable(store, name, term)
+                docs.discard(doc)
+                if not docs:
+                    del store[term]
+        self._sorted_names = self._sorted_codes = None
+
+    def lookup(self, code):
+        """The product scanned as ``code``: exact barcode first, then SKU"""
+        key = normalize(code)
+        docs = self.codes.get(key)
+        if not docs:
+            return None
+        matches = sorted((self.entry(doc).barcode_key != key, doc) for doc in docs)
+        return self.entry(matches[0][1])
+
+    @staticmethod
+    def _starting_with(pairs, query):
+        """Docs of the sorted ``(key, doc)`` pairs whose key starts with
+        ``query``, in key order; lazy, so callers can stop early"""
+        for index in range(bisect.bisect_left(pairs, (query,)), len(pairs)):
+            key, doc = pairs[index]
+            if not key.startswith(query):
+                return
+            yield doc
+
+    def _sorted(self):
+        if self._sorted_names is None:
+            self._sorted_names = sorted((name, doc) for doc, name in enumerate(self.names)
+                                        if name is not None)
+            self._sorted_codes = sorted((code, doc) for code, docs in self.codes.items() for doc in docs)
+        return self._sorted_names, self._sorted_codes
+
+    def name_candidates(self, query):
+        if len(query) < NGRAM:
+            return self.prefixes.get(query, set())
+        postings = sorted((self.postings.get(gram, set()) for gram in ngrams(query)), key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def search(self, text, limit=50, category_id=None):
+        """Ranked ``ProductEntry`` list for ``text``"""
+        query = normalize(text)
+        if not query:
+            return []
+        names, categories = self.names, self.categories
+        wanted = (lambda doc: names[doc] is not None and
+                  (not category_id or categories[doc] == category_id))
+
+        sorted_names, codes = self._sorted()
+        exact = sorted(doc for doc in self.codes.get(query, ()) if wanted(doc))
+        ranked = list(exact)
+        seen = set(ranked)
+        # Awalan nama langsung dari daftar terurut nama: berhenti di ``limit``
+        # tanpa menyaring semua hit (ribuan untuk satu-dua huruf)
+        for doc in self._starting_with(sorted_names, query):
+            if len(ranked) >= limit:
+                break
+            if doc not in seen and wanted(doc):
+                seen.add(doc)
+                ranked.append(doc)
+        words, others = [], []
+        if len(ranked) < limit:
+            # Heap, bukan sorted(): kandidat n-gram bisa ribuan, padahal
+            # pemindaian biasanya berhenti setelah ``limit`` hit
+            candidates = list(self.name_candidates(query))
+            heapq.heapify(candidates)
+            while candidates:
+                doc = heapq.heappop(candidates)
+                if doc in seen or not wanted(doc):
+                    continue
+                name = names[doc]
+                position = name.find(query)
+                if position > 0 and name[position - 1] == ' ':
+                    words.append(doc)
+                    if len(ranked) + len(words) >= limit:
+                        break
+                elif position > 0:
+                    others.append(doc)
+            ranked += words + others
+        if len(ranked) < limit:
+            seen.update(ranked)
+            for doc in self._starting_with(codes, query):
+                if doc not in seen and wanted(doc):
+                    seen.add(doc)
+                    ranked.append(doc)
+                    if len(ranked) >= limit:
+                        break
+        return [self.entry(doc) for doc in ranked[:limit]]
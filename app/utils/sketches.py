@@ -0,0 +1,165 @@
+import hashlib
+import math
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters (Metwally et al.) with ``capacity`` counters.
+
+    Every item whose true weight exceeds ``total / capacity`` is guaranteed
+    to be tracked, and for a tracked item
+    ``count - error <= true weight <= count``.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counters = {}  # item -> [count, error]
+        self.total = 0
+
+    def add(self, item, weight=1):
+        self.total += weight
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+        else:
+            # Ganti counter terkecil; bobotnya menjadi batas error item baru
+            victim = min(self.counters, key=lambda key: self.counters[key][0])
+            floor = self.counters.pop(victim)[0]
+            self.counters[item] = [floor + weight, floor]
+
+    def floor(self):
+        """Weight any untracked item may have had (0 until the sketch is full)"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def merge(self, other):
+        """Fold ``other`` in (e.g. daily windows into a month).
+
+        An item missing from a full sketch may still have occurred there up
+        to that sketch's floor, so the floor is added to both its count and
+        its error; the guarantees above then hold for the merged stream.
+        """
+        own_floor, other_floor = self.floor(), other.floor()
+        merged = {}
+        for item in self.counters.keys() | other.counters.keys():
+            count, error = self.counters.get(item, (own_floor, own_floor))
+            other_count, other_error = other.counters.get(item, (other_floor, other_floor))
+            merged[item] = [count + other_count, error + other_error]
+        kept = sorted(merged.items(), key=lambda kv: kv[1][0], reverse=True)[:self.capacity]
+        self.counters = dict(kept)
+        self.total += other.total
+
+    def top(self, n):
+        """``[(item, count, error)]`` for the ``n`` largest counters"""
+        ranked = sorted(self.counters.items(), key=lambda kv: kv[1][0], reverse=True)[:n]
+        return [(item, count, error) for item, (count, error) in ranked]
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with ``2 ** precision`` registers.
+
+    Standard error is about ``1.04 / sqrt(2 ** precision)`` (1.6% at the
+    default precision 12, in 4 KiB), the same scale Redis ``PFCOUNT`` uses.
+    """
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    def add(self, value):
+        hashed = _hash64(value)
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        for index, rank in enumerate(other.registers):
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size ** 2 / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            # Koreksi rentang kecil: linear counting
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+
+def window_covered(since, window):
+    """Whether a sketch fed since ``since`` holds all of ``window``.
+
+    Both are local times as ``YYYYMMDD`` or ``YYYYMMDDHH`` strings. A day
+    window starts at hour 00, so a day is only covered when recording
+    started at or before its first hour (``since`` ``'2026101715'`` does
+    not cover ``'20261017'``).
+    """
+    if since is None:
+        return False
+    return since <= window.ljust(len(since), '0')
+
+
+# Padanan Redis untuk SpaceSaving, dipakai RedisTopSellers (satu ZSET per window).
+# KEYS[1] = ZSET count per item; ARGV = capacity, ttl, lalu pasangan item, weight
+SPACE_SAVING_LUA = """
+local capacity = tonumber(ARGV[1])
+for i = 3, #ARGV, 2 do
+    local item, weight = ARGV[i], tonumber(ARGV[i + 1])
+    if redis.call('ZSCORE', KEYS[1], item) then
+        redis.call('ZINCRBY', KEYS[1], weight, item)
+    elseif redis.call('ZCARD', KEYS[1]) < capacity then
+        redis.call('ZADD', KEYS[1], weight, item)
+    else
+        local victim = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+        redis.call('ZREM', KEYS[1], victim[1])
+        redis.call('ZADD', KEYS[1], tonumber(victim[2]) + weight, item)
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+"""
+
+# Gabungan beberapa window seperti SpaceSaving.merge: item yang tidak ada di
+# window yang penuh dihitung sebesar floor window itu, jadi count tetap batas
+# atas bobot sebenarnya dan heavy hitter gabungan tidak hilang.
+# KEYS = ZSET per window; ARGV = capacity, n. Hasil: item, count, item, count...
+SPACE_SAVING_TOP_LUA = """
+local capacity, n = tonumber(ARGV[1]), tonumber(ARGV[2])
+local floors, total_floor = {}, 0
+for i, key in ipairs(KEYS) do
+    local floor = 0
+    if redis.call('ZCARD', key) >= capacity then
+        floor = tonumber(redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')[2])
+    end
+    floors[i] = floor
+    total_floor = total_floor + floor
+end
+local counts = {}
+for i, key in ipairs(KEYS) do
+    local entries = redis.call('ZRANGE', key, 0, -1, 'WITHSCORES')
+    for j = 1, #entries, 2 do
+        local item = entries[j]
+        counts[item] = (counts[item] or total_floor) + tonumber(entries[j + 1]) - floors[i]
+    end
+end
+local ranked = {}
+for item, count in pairs(counts) do
+    ranked[#ranked + 1] = {item, count}
+end
+table.sort(ranked, function(a, b) return a[2] > b[2] or (a[2] == b[2] and a[1] < b[1]) end)
+local result = {}
+for i = 1, math.min(n, #ranked) do
+    result[#result + 1] = ranked[i][1]
+    result[#result + 1] = tostring(ranked[i][2])
+end
+return result
+"""
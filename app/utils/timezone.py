@@ -1,12 +1,62 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
-from flask import current_app
+from flask import current_app, g, has_request_context
+from flask_login import current_user
+from sqlalchemy import func
 
-def get_local_timezone():
+def get_default_timezone():
     """Get the configured timezone for the application"""
     timezone_name = current_app.config.get('TIMEZONE', 'Asia/Jakarta')
     return pytz.timezone(timezone_name)
 
+def get_tenant_timezone(tenant):
+    """Timezone setting of a tenant, falling back to the application default"""
+    timezone_name = getattr(tenant, 'timezone', None)
+    if timezone_name:
+        try:
+            return pytz.timezone(timezone_name)
+        except pytz.UnknownTimeZoneError:
+            pass
+    return get_default_timezone()
+
+def get_local_timezone():
+    """Timezone of the signed-in user's tenant (cached per request), or the
+    application default outside a request"""
+    if not has_request_context():
+        return get_default_timezone()
+    if 'local_timezone' not in g:
+        tenant = current_user.tenant if current_user and current_user.is_authenticated else None
+        g.local_timezone = get_tenant_timezone(tenant)
+    return g.local_timezone
+
+def utc_offset_minutes(tz, at=None):
+    """UTC offset of ``tz`` in minutes at ``at`` (naive UTC, default now)"""
+    at = pytz.utc.localize(at or datetime.utcnow())
+    return int(at.astimezone(tz).utcoffset().total_seconds() // 60)
+
+def local_date_expr(column, tz=None):
+    """SQL expression bucketing a naive-UTC datetime column by local date.
+
+    PostgreSQL converts with ``AT TIME ZONE`` (DST-correct per row); SQLite
+    has no timezone database, so the tenant's current UTC offset is added
+    instead, which is exact for fixed-offset zones such as Asia/Jakarta.
+    """
+    tz = tz or get_local_timezone()
+    if _dialect_name() == 'postgresql':
+        return func.date(func.timezone(tz.zone, func.timezone('UTC', column)))
+    return func.date(column, f'{utc_offset_minutes(tz):+d} minutes')
+
+def local_hour_expr(column, tz=None):
+    """Like ``local_date_expr`` but truncated to the local hour"""
+    tz = tz or get_local_timezone()
+    if _dialect_name() == 'postgresql':
+        return func.date_trunc('hour', func.timezone(tz.zone, func.timezone('UTC', column)))
+    return func.strftime('%Y-%m-%d %H:00:00', column, f'{utc_offset_minutes(tz):+d} minutes')
+
+def _dialect_name():
+    from app import db
+    return db.engine.dialect.name
+
 def utc_to_local(utc_dt):
     """Convert UTC datetime to local timezone"""
     if utc_dt is None:
@@ -19,6 +69,13 @@ def utc_to_local(utc_dt):
     local_tz = get_local_timezone()
     return utc_dt.astimezone(local_tz)
 
+def local_day_bounds_utc(day, tz=None):
+    """Naive-UTC ``[start, end)`` covering the local calendar ``day``"""
+    tz = tz or get_local_timezone()
+    start = tz.localize(datetime.combine(day, datetime.min.time()))
+    end = tz.normalize(start + timedelta(days=1))
+    return start.astimezone(pytz.utc).replace(tzinfo=None), end.astimezone(pytz.utc).replace(tzinfo=None)
+
 def local_to_utc(local_dt):
     """Convert local datetime to UTC"""
     if local_dt is None:
@@ -0,0 +1,121 @@
+"""Memory-mapped catalog snapshot: size, write time, lookups, sharing.
+
+Writes a ``--products`` catalog with ``write_catalog``, then maps it in
+``--workers`` forked processes and reports each worker's private memory
+growth after reading every record, next to the growth of holding the
+same products as Python dicts. The same is measured for a search index
+built on the snapshot (record numbers) and one holding decoded entries.
+
+    python benchmarks/catalog_file.py --products 50000 --workers 4
+"""
+import argparse
+import gc
+import importlib.util
+import os
+import random
+import tempfile
+import time
+
+
+
+def _load(name):
+    # Dimuat langsung supaya skrip tidak butuh Flask
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'utils', f'{name}.py')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+catalog_file = _load('catalog_file')
+search_index = _load('search_index')
+
+
+def private_kib():
+    # Halaman file yang di-mmap dihitung di Shared_*, bukan Private_*
+    total = 0
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                total += int(line.split()[1])
+    return total
+
+
+def make_products(count, seed):
+    rng = random.Random(seed)
+    for number in range(count):
+        yield {
+            'id': f'{number:08d}-0000-4000-8000-000000000000',
+            'name': f'Produk {rng.choice(["Indomie", "Aqua", "Teh Botol", "Kopi"])} {number}',
+            'sku': f'SKU-{number:06d}',
+            'barcode': f'899{number:010d}',
+            'price': round(rng.uniform(1000, 100000), -2),
+            'image_url': None,
+            'category_id': f'cat-{number % 20}',
+            'category_name': f'Kategori {number % 20}',
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    products = list(make_products(args.products, 7))
+    path = os.path.join(tempfile.mkdtemp(), 'tenant.catalog')
+    started = time.perf_counter()
+    catalog_file.write_catalog(path, 1, products)
+    print(f'write: {args.products} products in {(time.perf_counter() - started) * 1000:.0f} ms, '
+          f'{os.path.getsize(path) / 1024 / 1024:.1f} MiB on disk')
+
+    catalog = catalog_file.CatalogFile(path)
+    codes = [product['barcode'] for product in products]
+    started = time.perf_counter()
+    for code in codes[:10000]:
+        assert catalog.lookup(code) is not None
+    print(f'lookup: {(time.perf_counter() - started) / 10000 * 1e6:.1f} us per barcode')
+    started = time.perf_counter()
+    list(catalog.records(0, 50))
+    print(f'first 50 records: {(time.perf_counter() - started) * 1000:.3f} ms')
+    catalog.close()
+
+    def entries_index():
+        return search_index.SearchIndex(search_index.ProductEntry.from_record(record)
+                                        for record in catalog_file.CatalogFile(path).records())
+
+    def touch(data):
+        if isinstance(data, list):
+            return sum(len(product['name']) for product in data)
+        if isinstance(data, search_index.SearchIndex):
+            return sum(len(data.search(query)) for query in ('indomie', 'kopi', 'teh', 'aqua'))
+        return sum(len(record['name']) for record in data.records())
+
+    for label, load in (('mmap', lambda: catalog_file.CatalogFile(path)),
+                        ('dicts', lambda: [dict(product) for product in make_products(args.products, 7)]),
+                        ('index on mmap', lambda: search_index.SearchIndex(catalog=catalog_file.CatalogFile(path))),
+                        ('index of entries', entries_index)):
+        children = []
+        for _ in range(args.workers):
+            read, write = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read)
+                before = private_kib()
+                data = load()
+                gc.collect()
+                touch(data)
+                os.write(write, str(private_kib() - before).encode())
+                os._exit(0)
+            os.close(write)
+            children.append((pid, read))
+        growth = []
+        for pid, read in children:
+            growth.append(int(os.read(read, 64) or 0))
+            os.waitpid(pid, 0)
+        print(f'{label:>16}: private memory growth per worker '
+              + ', '.join(f'{kib / 1024:.1f}' for kib in growth) + ' MiB')
+
+
+if __name__ == '__main__':
+    main()
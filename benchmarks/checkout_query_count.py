@@ -0,0 +1,87 @@
+"""Statement count of ``POST /sales/process-sale`` against basket size.
+
+Checks that a checkout issues the same number of SQL statements for a
+1-line and a 30-line basket (set-based writes, receipt built from the
+objects already in memory), and fails if the count grows with the basket.
+
+    python benchmarks/checkout_query_count.py --lines 30
+
+Without DATABASE_URL a temporary SQLite file is used.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=30)
+    args = parser.parse_args()
+
+    if not os.environ.get('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'checkout.db')
+
+    import config
+    config.TestingConfig.SQLALCHEMY_DATABASE_URI = os.environ['DATABASE_URL']
+    # Blok besar: alokasi nomor struk tidak boleh jatuh di tengah pengukuran
+    config.TestingConfig.RECEIPT_BLOCK_SIZE = 1000
+
+    from sqlalchemy import event
+    from app import create_app, db
+    from app.models import Product, Tenant, User
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        suffix = time.time_ns()
+        tenant = Tenant(name='Query Count Check', email=f'check-{suffix}@example.com')
+        db.session.add(tenant)
+        db.session.flush()
+        user = User(username=f'cashier-{suffix}', email=f'cashier-{suffix}@example.com',
+                    role='admin', tenant_id=tenant.id)
+        db.session.add(user)
+        products = [Product(name=f'Product {i}', price=1000 + i, stock_quantity=10000,
+                            sku=f'QC-{suffix}-{i}', tenant_id=tenant.id)
+                    for i in range(args.lines)]
+        db.session.add_all(products)
+        db.session.commit()
+        user_id = user.id
+        product_ids = [product.id for product in products]
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *rest: statements.append(statement))
+
+    # Sesi di-set langsung tanpa login; proteksi "strong" akan membuangnya
+    # karena tidak ada identifier ``_id`` yang cocok
+    app.login_manager.session_protection = None
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = user_id
+        session['_fresh'] = True
+
+    def checkout(lines):
+        items = [{'product_id': product_id, 'quantity': 1} for product_id in product_ids[:lines]]
+        total = sum(1000 + i for i in range(lines))
+        del statements[:]
+        response = client.post('/sales/process-sale', json={
+            'items': items, 'total_amount': total, 'payment_method': 'cash'
+        })
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert response.get_json()['success'], response.get_json()
+        return len(statements)
+
+    # Pemanasan: cache principal/tenant dan blok nomor struk terisi
+    checkout(1)
+    single = checkout(1)
+    basket = checkout(args.lines)
+    print(f'1-line basket: {single} statements, {args.lines}-line basket: {basket} statements')
+    assert single == basket, f'checkout statement count grows with the basket ({single} -> {basket})'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Insert throughput and primary-key index size per id strategy.
+
+Compares today's random uuid4 stored as String(36) with time-ordered uuid7
+(as String(36), and as native uuid on PostgreSQL). Each strategy inserts
+into its own copy of a sales-shaped table, in batches, like a busy day of
+checkouts.
+
+    python benchmarks/id_strategies.py --rows 200000
+    DATABASE_URL=postgresql://... python benchmarks/id_strategies.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.ids import uuid4, uuid7
+
+
+def make_table(metadata, name, id_type):
+    return sa.Table(
+        name, metadata,
+        sa.Column('id', id_type, primary_key=True),
+        sa.Column('tenant_id', sa.String(36), nullable=False),
+        sa.Column('total_amount', sa.Float, nullable=False),
+        sa.Column('created_at', sa.DateTime, nullable=False),
+    )
+
+
+def index_size(engine, table):
+    with engine.connect() as conn:
+        if engine.dialect.name == 'postgresql':
+            return conn.execute(sa.text(
+                "SELECT pg_relation_size(indexrelid) FROM pg_index "
+                "WHERE indrelid = CAST(:t AS regclass) AND indisprimary"
+            ), {'t': table.name}).scalar()
+        try:
+            return conn.execute(sa.text(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name LIKE :n"
+            ), {'n': f'sqlite_autoindex_{table.name}%'}).scalar()
+        except sa.exc.OperationalError:
+            return None  # SQLite built without dbstat
+
+
+def run(engine, table, generate, rows, batch):
+    tenant_id = str(uuid4())
+    now = sa.func.now()
+    inserted = 0
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        while inserted < rows:
+            size = min(batch, rows - inserted)
+            conn.execute(table.insert().values(created_at=now), [
+                {'id': str(generate()), 'tenant_id': tenant_id, 'total_amount': 10.0}
+                for _ in range(size)
+            ])
+            inserted += size
+    return rows / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch', type=int, default=500)
+    args = parser.parse_args()
+
+    url = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'ids.db')
+    engine = sa.create_engine(url)
+    metadata = sa.MetaData()
+
+    strategies = [
+        ('uuid4_str', sa.String(36), uuid4),
+        ('uuid7_str', sa.String(36), uuid7),
+    ]
+    if engine.dialect.name == 'postgresql':
+        strategies.append(('uuid7_native', postgresql.UUID(as_uuid=False), uuid7))
+
+    tables = {name: make_table(metadata, f'bench_ids_{name}', id_type) for name, id_type, _ in strategies}
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    try:
+        print(f"{'strategy':<14}{'rows/s':>12}{'pk index bytes':>18}")
+        for name, _, generate in strategies:
+            rate = run(engine, tables[name], generate, args.rows, args.batch)
+            size = index_size(engine, tables[name])
+            print(f"{name:<14}{rate:>12,.0f}{(size if size is not None else 'n/a'):>18}")
+    finally:
+        metadata.drop_all(engine)
+
+
+if __name__ == '__main__':
+    main()
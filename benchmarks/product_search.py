@@ -0,0 +1,103 @@
+"""POS product search: in-memory trigram index vs LIKE '%q%'.
+
+Generates a catalog of ``--products`` products, loads it into SQLite and
+into ``SearchIndex``, then times the typical POS lookups (word fragments,
+SKU and barcode scans, one- and two-letter keystrokes) both ways. LIKE on
+SQLite is case-insensitive for ASCII and, like ILIKE on PostgreSQL without
+pg_trgm, cannot use an index for a leading wildcard.
+
+    python benchmarks/product_search.py --products 50000
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sqlite3
+import statistics
+import time
+
+# Dimuat langsung supaya skrip tidak butuh Flask
+_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'utils', 'search_index.py')
+_spec = importlib.util.spec_from_file_location('search_index', _path)
+search_index = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(search_index)
+
+BRANDS = ['Indomie', 'Aqua', 'Teh Botol', 'Sosro', 'Chitato', 'Beng Beng', 'Kopi Kapal Api', 'Sari Roti',
+          'Ultra Milk', 'Pocari Sweat', 'Gudang Garam', 'Rinso', 'Lifebuoy', 'Pepsodent', 'Baygon']
+KINDS = ['Goreng', 'Kuah', 'Original', 'Coklat', 'Keju', 'Pedas', 'Manis', 'Susu', 'Mini', 'Jumbo', 'Sachet']
+SIZES = ['100ml', '250ml', '600ml', '1L', '40g', '85g', '200g', '1kg', 'Pack 5', 'Dus 40']
+
+
+def make_catalog(count, seed):
+    rng = random.Random(seed)
+    for number in range(count):
+        yield (
+            f'p{number}',
+            f'{rng.choice(BRANDS)} {rng.choice(KINDS)} {rng.choice(SIZES)} {number % 997}',
+            f'SKU-{number:06d}',
+            f'899{rng.randrange(10 ** 9, 10 ** 10)}',
+            round(rng.uniform(1000, 100000), -2),
+        )
+
+
+def timed(function, queries, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            function(query)
+            samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    catalog = list(make_catalog(args.products, args.seed))
+
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE products (id TEXT PRIMARY KEY, name TEXT, sku TEXT, barcode TEXT, price REAL)')
+    conn.executemany('INSERT INTO products VALUES (?, ?, ?, ?, ?)', catalog)
+
+    started = time.perf_counter()
+    index = search_index.SearchIndex(
+        search_index.ProductEntry(product_id, name, sku, barcode, price)
+        for product_id, name, sku, barcode, price in catalog
+    )
+    build_ms = (time.perf_counter() - started) * 1000
+    index.search('warm-up', 1)
+    print(f'index: {len(index)} products built in {build_ms:.0f} ms')
+
+    rng = random.Random(args.seed)
+    queries = ['indo', 'kopi', 'goreng', 'teh botol', 'ultra milk coklat', 'keju 85', 'i', 'su',
+               catalog[rng.randrange(len(catalog))][2], catalog[rng.randrange(len(catalog))][3],
+               catalog[rng.randrange(len(catalog))][3][:6], 'zzz-no-match']
+
+    def like(query):
+        pattern = f'%{query}%'
+        return conn.execute(
+            'SELECT id, name, sku, barcode, price FROM products '
+            'WHERE name LIKE ? OR sku LIKE ? OR barcode LIKE ? LIMIT 50',
+            (pattern, pattern, pattern)
+        ).fetchall()
+
+    print(f'{"query":<22}{"LIKE ms":>10}{"index ms":>10}{"hits":>7}')
+    for query in queries:
+        like_mean, _, _ = timed(like, [query], args.repeat)
+        index_mean, _, _ = timed(lambda q: index.search(q, 50), [query], args.repeat)
+        print(f'{query[:21]:<22}{like_mean:>10.3f}{index_mean:>10.3f}{len(index.search(query, 50)):>7}')
+
+    like_stats = timed(like, queries, args.repeat)
+    index_stats = timed(lambda q: index.search(q, 50), queries, args.repeat)
+    print('\nall queries (mean / p50 / p99 ms):')
+    print(f'  LIKE  {like_stats[0]:.3f} / {like_stats[1]:.3f} / {like_stats[2]:.3f}')
+    print(f'  index {index_stats[0]:.3f} / {index_stats[1]:.3f} / {index_stats[2]:.3f}')
+
+
+if __name__ == '__main__':
+    main()
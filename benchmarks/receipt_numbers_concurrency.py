@@ -0,0 +1,82 @@
+"""Concurrency check for the hi-lo receipt number allocator.
+
+Starts several worker processes (the same way gunicorn forks workers), each
+allocating receipt numbers for the same tenant against a shared database, and
+fails if any number is handed out twice.
+
+    DATABASE_URL=postgresql://... python benchmarks/receipt_numbers_concurrency.py --workers 8 --count 500
+
+Without DATABASE_URL a temporary SQLite file is used.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def worker(count, tenant_id, queue):
+    from app import create_app
+    from app.services.receipt_number_service import receipt_numbers
+
+    app = create_app('testing')
+    with app.app_context():
+        numbers = [receipt_numbers.next_receipt_number(tenant_id) for _ in range(count)]
+    queue.put(numbers)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--block-size', type=int, default=20)
+    args = parser.parse_args()
+
+    if not os.environ.get('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'receipts.db')
+    os.environ['RECEIPT_BLOCK_SIZE'] = str(args.block_size)
+
+    import config
+    config.TestingConfig.SQLALCHEMY_DATABASE_URI = os.environ['DATABASE_URL']
+    config.TestingConfig.RECEIPT_BLOCK_SIZE = args.block_size
+    if os.environ['DATABASE_URL'].startswith('sqlite'):
+        config.TestingConfig.SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
+
+    from app import create_app, db
+    from app.models import Tenant
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        tenant = Tenant(name='Concurrency Check', email=f'check-{time.time()}@example.com')
+        db.session.add(tenant)
+        db.session.commit()
+        tenant_id = tenant.id
+
+    queue = multiprocessing.Queue()
+    started = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=worker, args=(args.count, tenant_id, queue))
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    numbers = [number for result in results for number in result]
+    duplicates = len(numbers) - len(set(numbers))
+    print(f"{len(numbers)} receipt numbers from {args.workers} workers in {elapsed:.2f}s, "
+          f"{duplicates} duplicates, highest {max(numbers)}")
+    for result in results:
+        assert result == sorted(result), 'numbers must be ordered within a worker'
+    assert duplicates == 0, 'duplicate receipt numbers allocated'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""Error bounds of the top-seller sketches against exact counts.
+
+Feeds a Zipf-distributed stream of product sales (a few best sellers and a
+long tail, like a real shop) through ``SpaceSaving`` and ``HyperLogLog``,
+both whole and split into daily windows merged afterwards, and checks:
+
+* every tracked item satisfies ``count - error <= true <= count``;
+* every item with true weight above ``total / capacity`` is tracked;
+* the top-N order matches the exact top-N for the clear heavy hitters;
+* the HyperLogLog estimate is within 3 standard errors;
+* ``window_covered`` does not count a day whose recording started mid-day.
+
+With Redis reachable at ``--redis-url`` (default ``$REDIS_URL``) the same
+daily windows are also fed through ``SPACE_SAVING_LUA`` and merged with
+``SPACE_SAVING_TOP_LUA``, and every merged count must be an upper bound
+with no heavy hitter missing.
+
+    python benchmarks/sketch_error_bounds.py --events 500000 --products 5000
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+
+# Dimuat langsung supaya skrip tidak butuh Flask
+_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'utils', 'sketches.py')
+_spec = importlib.util.spec_from_file_location('sketches', _path)
+sketches = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sketches)
+
+
+def zipf_stream(events, products, skew, seed):
+    rng = random.Random(seed)
+    weights = [1 / (rank ** skew) for rank in range(1, products + 1)]
+    items = [f'product-{rank}' for rank in range(1, products + 1)]
+    for item in rng.choices(items, weights=weights, k=events):
+        yield item, rng.randint(1, 3)
+
+
+def check_space_saving(sketch, exact, label):
+    failures = 0
+    for item, count, error in sketch.top(sketch.capacity):
+        true = exact.get(item, 0)
+        if not count - error <= true <= count:
+            failures += 1
+            print(f'  [{label}] bound violated for {item}: count={count} error={error} true={true}')
+    threshold = sketch.total / sketch.capacity
+    missing = [item for item, true in exact.items() if true > threshold and item not in sketch.counters]
+    for item in missing:
+        print(f'  [{label}] heavy hitter {item} ({exact[item]} > {threshold:.0f}) not tracked')
+    max_error = max((error for _, _, error in sketch.top(sketch.capacity)), default=0)
+    print(f'{label}: {len(sketch.counters)} counters, max error {max_error} '
+          f'({max_error / sketch.total:.4%} of {sketch.total}), '
+          f'{failures} bound violations, {len(missing)} missed heavy hitters')
+    return failures + len(missing)
+
+
+def check_redis(url, stream, days, capacity, exact):
+    try:
+        import redis
+        client = redis.from_url(url)
+        client.ping()
+    except Exception as e:
+        print(f'Redis merge: skipped ({e})')
+        return 0
+
+    prefix = f'sketch-bench:{os.getpid()}'
+    keys = [f'{prefix}:{day}' for day in range(days)]
+    record = client.register_script(sketches.SPACE_SAVING_LUA)
+    top = client.register_script(sketches.SPACE_SAVING_TOP_LUA)
+    try:
+        pipe = client.pipeline(transaction=False)
+        for start in range(0, len(stream), 100):
+            # Satu panggilan per "keranjang" seperti checkout
+            batch = stream[start:start + 100]
+            args = [capacity, 3600]
+            for _, item, quantity in batch:
+                args.extend([item, quantity])
+            record(keys=[keys[batch[0][0]]], args=args, client=pipe)
+            if start % 10000 == 0:
+                pipe.execute()
+        pipe.execute()
+        ranked = top(keys=keys, args=[capacity, capacity])
+    finally:
+        client.delete(*keys)
+
+    merged = {item.decode(): float(count) for item, count in zip(ranked[::2], ranked[1::2])}
+    failures = 0
+    for item, count in merged.items():
+        if count < exact.get(item, 0):
+            failures += 1
+            print(f'  [redis] {item}: merged count {count:.0f} below true {exact[item]}')
+    threshold = sum(exact.values()) / capacity
+    missing = [item for item, true in exact.items() if true > threshold and item not in merged]
+    for item in missing:
+        print(f'  [redis] heavy hitter {item} ({exact[item]} > {threshold:.0f}) not in merged top')
+    exact_top = sorted(exact, key=exact.get, reverse=True)[:10]
+    print(f'Redis merge of {days} windows: {failures} counts below true, '
+          f'{len(missing)} missed heavy hitters, top-10 overlap {len(set(exact_top) & set(list(merged)[:10]))}/10')
+    return failures + len(missing)
+
+
+def check_coverage():
+    cases = [
+        # (since, window, expected)
+        ('2026101715', '20261017', False),   # live-since di tengah hari: hari ini belum lengkap
+        ('2026101715', '20261018', True),
+        ('2026101700', '20261017', True),
+        ('20261017', '20261017', True),      # seed: satu hari penuh
+        ('20261017', '20261016', False),
+        ('2026101715', '2026101715', True),  # window per jam
+        ('2026101715', '2026101714', False),
+        (None, '20261017', False),
+    ]
+    failures = 0
+    for since, window, expected in cases:
+        if sketches.window_covered(since, window) != expected:
+            failures += 1
+            print(f'  [coverage] since={since} window={window}: expected {expected}')
+    print(f'window coverage: {len(cases) - failures}/{len(cases)} cases ok')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--capacity', type=int, default=200)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--redis-url', default=os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+    args = parser.parse_args()
+
+    exact = {}
+    whole = sketches.SpaceSaving(args.capacity)
+    daily = [sketches.SpaceSaving(args.capacity) for _ in range(args.days)]
+    stream = []
+    started = time.perf_counter()
+    for index, (item, quantity) in enumerate(zipf_stream(args.events, args.products, args.skew, args.seed)):
+        day = index * args.days // args.events
+        exact[item] = exact.get(item, 0) + quantity
+        whole.add(item, quantity)
+        daily[day].add(item, quantity)
+        stream.append((day, item, quantity))
+    elapsed = time.perf_counter() - started
+    print(f'{args.events} events into {args.products} products in {elapsed:.2f}s')
+
+    merged = sketches.SpaceSaving(args.capacity)
+    for window in daily:
+        merged.merge(window)
+
+    failures = check_space_saving(whole, exact, 'single window')
+    failures += check_space_saving(merged, exact, f'{args.days} merged daily windows')
+
+    exact_top = sorted(exact, key=exact.get, reverse=True)[:10]
+    sketch_top = [item for item, _, _ in merged.top(10)]
+    print(f'top-10 overlap: {len(set(exact_top) & set(sketch_top))}/10')
+
+    failures += check_coverage()
+    failures += check_redis(args.redis_url, stream, args.days, args.capacity, exact)
+
+    rng = random.Random(args.seed)
+    hll = sketches.HyperLogLog()
+    windows = [sketches.HyperLogLog() for _ in range(args.days)]
+    distinct = set()
+    for index in range(args.events):
+        customer = f'customer-{rng.randrange(args.customers)}'
+        distinct.add(customer)
+        hll.add(customer)
+        windows[index * args.days // args.events].add(customer)
+    union = sketches.HyperLogLog()
+    for window in windows:
+        union.merge(window)
+    standard_error = 1.04 / (hll.size ** 0.5)
+    for label, estimate in (('single', hll.count()), ('merged', union.count())):
+        relative = abs(estimate - len(distinct)) / len(distinct)
+        ok = relative <= 3 * standard_error
+        failures += 0 if ok else 1
+        print(f'HyperLogLog {label}: estimate {estimate} vs {len(distinct)} distinct, '
+              f'error {relative:.2%} (3σ = {3 * standard_error:.2%}) {"ok" if ok else "FAIL"}')
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
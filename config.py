@@ -10,6 +10,7 @@ class Config:
     # Database
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    ID_STRATEGY = os.environ.get('ID_STRATEGY', 'uuid7')  # uuid7 (time-ordered) atau uuid4
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_recycle': 300,
         'pool_pre_ping': True,
@@ -51,6 +52,29 @@ class Config:
     APP_NAME = os.environ.get('APP_NAME', 'T-POS Enterprise')
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'static/uploads')
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH') or 16 * 1024 * 1024)
+    RECEIPT_BLOCK_SIZE = int(os.environ.get('RECEIPT_BLOCK_SIZE') or 50)  # Nomor struk per blok hi-lo per worker
+    STOCK_LEDGER_MODE = os.environ.get('STOCK_LEDGER_MODE', 'immediate')  # immediate atau deferred (butuh compactor)
+    SYNC_MAX_BATCH = int(os.environ.get('SYNC_MAX_BATCH') or 500)  # Max penjualan offline per request sync
+    LIVE_STREAM_LIFETIME = int(os.environ.get('LIVE_STREAM_LIFETIME') or 300)  # Detik per koneksi SSE sebelum klien reconnect
+    LIVE_STREAM_MAX = int(os.environ.get('LIVE_STREAM_MAX') or 8)  # Koneksi SSE bersamaan per worker; harus di bawah --threads
+    TOP_SELLERS_SKETCH = os.environ.get('TOP_SELLERS_SKETCH', 'true').lower() == 'true'  # Top produk dari sketch, bukan GROUP BY
+    TOP_SELLERS_CAPACITY = int(os.environ.get('TOP_SELLERS_CAPACITY') or 200)  # Counter Space-Saving per window
+    TENANT_CACHE_TTL = int(os.environ.get('TENANT_CACHE_TTL') or 30)  # Detik di cache per proses
+    TENANT_CACHE_REDIS_TTL = int(os.environ.get('TENANT_CACHE_REDIS_TTL') or 300)  # Detik di Redis
+    TENANT_CACHE_SIZE = int(os.environ.get('TENANT_CACHE_SIZE') or 1024)
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL') or 300)  # Detik snapshot user login di cache
+    PRODUCT_INDEX_MAX_AGE = int(os.environ.get('PRODUCT_INDEX_MAX_AGE') or 3600)  # Detik sebelum index produk dibangun ulang
+    BARCODE_BATCH_LIMIT = int(os.environ.get('BARCODE_BATCH_LIMIT') or 200)  # Maks kode per request batch barcode
+    CUSTOMER_RECENT_SIZE = int(os.environ.get('CUSTOMER_RECENT_SIZE') or 20)  # Customer terakhir/sering per tenant untuk POS
+    CATALOG_SNAPSHOT_DIR = os.environ.get('CATALOG_SNAPSHOT_DIR', '/tmp/pos-catalog')  # File katalog mmap, dipakai bersama semua worker
+    REPORT_PAGE_SIZE = int(os.environ.get('REPORT_PAGE_SIZE') or 100)  # Baris per halaman laporan penjualan (?all=1 mengalirkan semuanya)
+    EXPORT_DIR = os.environ.get('EXPORT_DIR', '/tmp/pos-exports')  # Hasil export background, harus bisa dibaca semua worker
+    EXPORT_SYNC_ROWS = int(os.environ.get('EXPORT_SYNC_ROWS') or 20000)  # Di atas ini export jalan sebagai job background
+    EXPORT_TTL = int(os.environ.get('EXPORT_TTL') or 3600)  # Detik status & file export disimpan
+    PDF_RENDER_PROCESSES = int(os.environ.get('PDF_RENDER_PROCESSES') or 2)  # Proses render PDF laporan per worker
+    RECEIPT_CACHE_DIR = os.environ.get('RECEIPT_CACHE_DIR', '/tmp/pos-receipts')  # Artefak struk di disk jika Redis tidak ada
+    RECEIPT_CACHE_MAX_BYTES = int(os.environ.get('RECEIPT_CACHE_MAX_BYTES') or 256 * 1024 * 1024)  # Batas disk sebelum eviction LRU
+    RECEIPT_CACHE_TTL = int(os.environ.get('RECEIPT_CACHE_TTL') or 30 * 86400)  # Detik artefak struk di Redis
     
     # Timezone Configuration
     TIMEZONE = os.environ.get('TIMEZONE', 'Asia/Jakarta')  # Default timezone Indonesia
@@ -0,0 +1,37 @@
+"""unique product barcode per tenant
+
+Revision ID: 3c6f0b8d2a47
+Revises: 7a4d9c2e1b83
+Create Date: 2026-10-17 19:02:14.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c6f0b8d2a47'
+down_revision = '7a4d9c2e1b83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    # Barcode kosong dari form disimpan sebagai '' -> jadikan NULL
+    conn.execute(sa.text("UPDATE products SET barcode = NULL WHERE TRIM(barcode) = ''"))
+    duplicates = conn.execute(sa.text(
+        "SELECT tenant_id, barcode, COUNT(*) FROM products "
+        "WHERE barcode IS NOT NULL GROUP BY tenant_id, barcode HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        listing = ', '.join(f'{barcode} (tenant {tenant_id}, {count}x)' for tenant_id, barcode, count in duplicates[:20])
+        raise RuntimeError(f'Duplicate product barcodes must be fixed before upgrading: {listing}')
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_products_tenant_barcode', ['tenant_id', 'barcode'])
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_products_tenant_barcode', type_='unique')
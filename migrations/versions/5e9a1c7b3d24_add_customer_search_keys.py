@@ -0,0 +1,59 @@
+"""add customer search keys
+
+Revision ID: 5e9a1c7b3d24
+Revises: d47e2a9c5f18
+Create Date: 2026-10-17 20:26:09.731842
+
+"""
+import re
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9a1c7b3d24'
+down_revision = 'd47e2a9c5f18'
+branch_labels = None
+depends_on = None
+
+
+def _name_key(name):
+    return ' '.join((name or '').lower().split())[:100] or None
+
+
+def _phone_key(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    if digits.startswith('62'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = digits[1:]
+    return digits[:20] or None
+
+
+def upgrade():
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('name_key', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('phone_key', sa.String(length=20), nullable=True))
+        batch_op.create_index('ix_customers_tenant_name_key', ['tenant_id', 'name_key', 'id'], unique=False)
+        batch_op.create_index('ix_customers_tenant_phone_key', ['tenant_id', 'phone_key', 'id'], unique=False)
+
+    # Isi key untuk customer yang sudah ada
+    conn = op.get_bind()
+    customers = sa.table('customers', sa.column('id'), sa.column('name'), sa.column('phone'),
+                         sa.column('name_key'), sa.column('phone_key'))
+    rows = conn.execute(sa.select(customers.c.id, customers.c.name, customers.c.phone)).fetchall()
+    update = customers.update().where(customers.c.id == sa.bindparam('customer_id')).values(
+        name_key=sa.bindparam('new_name_key'), phone_key=sa.bindparam('new_phone_key'))
+    for start in range(0, len(rows), 1000):
+        conn.execute(update, [
+            {'customer_id': row.id, 'new_name_key': _name_key(row.name), 'new_phone_key': _phone_key(row.phone)}
+            for row in rows[start:start + 1000]
+        ])
+
+
+def downgrade():
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.drop_index('ix_customers_tenant_phone_key')
+        batch_op.drop_index('ix_customers_tenant_name_key')
+        batch_op.drop_column('phone_key')
+        batch_op.drop_column('name_key')
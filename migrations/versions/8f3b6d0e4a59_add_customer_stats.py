@@ -0,0 +1,43 @@
+"""add customer stats
+
+Revision ID: 8f3b6d0e4a59
+Revises: 5e9a1c7b3d24
+Create Date: 2026-10-17 21:03:40.285517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3b6d0e4a59'
+down_revision = '5e9a1c7b3d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_spent', sa.Float(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('sales_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('first_sale_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('last_sale_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_customers_tenant_total_spent', ['tenant_id', 'total_spent'], unique=False)
+
+    # Backfill dari tabel sales (sama dengan `flask customers recompute-stats`)
+    op.execute("""
+        UPDATE customers SET
+            total_spent = (SELECT COALESCE(SUM(total_amount), 0) FROM sales WHERE sales.customer_id = customers.id),
+            sales_count = (SELECT COUNT(*) FROM sales WHERE sales.customer_id = customers.id),
+            first_sale_at = (SELECT MIN(created_at) FROM sales WHERE sales.customer_id = customers.id),
+            last_sale_at = (SELECT MAX(created_at) FROM sales WHERE sales.customer_id = customers.id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.drop_index('ix_customers_tenant_total_spent')
+        batch_op.drop_column('last_sale_at')
+        batch_op.drop_column('first_sale_at')
+        batch_op.drop_column('sales_count')
+        batch_op.drop_column('total_spent')
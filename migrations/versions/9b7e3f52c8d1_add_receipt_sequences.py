@@ -0,0 +1,43 @@
+"""add receipt sequences
+
+Revision ID: 9b7e3f52c8d1
+Revises: 4f1c2d9a7b3e
+Create Date: 2026-10-17 11:03:27.584102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b7e3f52c8d1'
+down_revision = '4f1c2d9a7b3e'
+branch_labels = None
+depends_on = None
+
+# Nama constraint unik receipt_number dari migrasi first_init (tanpa nama)
+naming_convention = {
+    'uq': '%(table_name)s_%(column_0_name)s_key',
+}
+
+
+def upgrade():
+    op.create_table('receipt_sequences',
+    sa.Column('tenant_id', sa.String(length=36), nullable=False),
+    sa.Column('day', sa.String(length=8), nullable=False),
+    sa.Column('next_value', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+    sa.PrimaryKeyConstraint('tenant_id', 'day')
+    )
+    # Nomor struk sekarang berurutan per tenant, jadi unik per tenant
+    with op.batch_alter_table('sales', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('sales_receipt_number_key', type_='unique')
+        batch_op.create_unique_constraint('uq_sales_tenant_receipt_number', ['tenant_id', 'receipt_number'])
+
+
+def downgrade():
+    with op.batch_alter_table('sales', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('uq_sales_tenant_receipt_number', type_='unique')
+        batch_op.create_unique_constraint('sales_receipt_number_key', ['receipt_number'])
+
+    op.drop_table('receipt_sequences')
@@ -0,0 +1,54 @@
+"""native uuid ids for sales and sale_items
+
+Revision ID: c3a8e1f07d64
+Revises: 9b7e3f52c8d1
+Create Date: 2026-10-17 13:40:09.117532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a8e1f07d64'
+down_revision = '9b7e3f52c8d1'
+branch_labels = None
+depends_on = None
+
+# (table, column) yang disimpan sebagai GUID di models.py
+UUID_COLUMNS = [
+    ('sales', 'id'),
+    ('sale_items', 'id'),
+    ('sale_items', 'sale_id'),
+]
+
+
+def upgrade():
+    # Hanya PostgreSQL yang punya tipe uuid native; database lain tetap
+    # memakai String(36). Id lama (uuid4) tetap valid, id baru adalah uuid7.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_constraint('sale_items_sale_id_fkey', 'sale_items', type_='foreignkey')
+    for table, column in UUID_COLUMNS:
+        op.alter_column(table, column,
+               existing_type=sa.String(length=36),
+               type_=postgresql.UUID(as_uuid=False),
+               existing_nullable=False,
+               postgresql_using=f'{column}::uuid')
+    op.create_foreign_key('sale_items_sale_id_fkey', 'sale_items', 'sales', ['sale_id'], ['id'])
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_constraint('sale_items_sale_id_fkey', 'sale_items', type_='foreignkey')
+    for table, column in UUID_COLUMNS:
+        op.alter_column(table, column,
+               existing_type=postgresql.UUID(as_uuid=False),
+               type_=sa.String(length=36),
+               existing_nullable=False,
+               postgresql_using=f'{column}::text')
+    op.create_foreign_key('sale_items_sale_id_fkey', 'sale_items', 'sales', ['sale_id'], ['id'])